@@ -16,11 +16,12 @@ from starlette.requests import Request
 from fastapi.security.utils import get_authorization_scheme_param
 
 from conf.config import local_configs
+from common.enums import ExportFormatEnum
 from common.types import JwtPayload
 from common.utils import get_client_ip
 from common.encrypt import Jwt, SignAuth
 from common.fastapi import AuthorizedRequest
-from common.schemas import Pager, CURDPager
+from common.schemas import Pager, CURDPager, CURDCursorPager, CURDExportPager
 from common.responses import ResponseCodeEnum
 from common.exceptions import ApiException
 from common.constant.messages import (
@@ -38,7 +39,10 @@ from common.constant.messages import (
     AuthorizationHeaderTypeErrorMsg,
 )
 from storages.relational.models import Account
-from storages.relational.curd.account import get_permissions
+from storages.relational.curd.account import (
+    get_account_snapshot,
+    get_cached_permissions,
+)
 
 
 class TheBearer(HTTPBearer):
@@ -85,6 +89,21 @@ def pure_get_pager(
     return Pager(limit=size, offset=(page - 1) * size)
 
 
+def check_order_by(
+    model: Model,
+    order_by: set[str],
+    allowed_fields: Optional[set[str]] = None,
+) -> None:
+    allowed_fields = allowed_fields or set(model._meta.db_fields)
+    for field in order_by:
+        if field.startswith("-"):
+            field = field[1:]  # noqa
+        if field not in allowed_fields:
+            raise ApiException(
+                ObjectNotExistMsgTemplate % f"排序字段 {field} ",
+            )
+
+
 def paginate(
     model: Model,
     search_fields: Optional[set],
@@ -116,13 +135,7 @@ def paginate(
     ) -> CURDPager:
         if max_limit:
             size = min(size, max_limit)
-        for field in order_by:
-            if field.startswith("-"):
-                field = field[1:]  # noqa
-            if field not in model._meta.db_fields:
-                raise ApiException(
-                    ObjectNotExistMsgTemplate % f"排序字段 {field} ",
-                )
+        check_order_by(model, order_by)
         if selected_fields:
             selected_fields.add("id")
         return CURDPager(
@@ -136,6 +149,112 @@ def paginate(
     return get_pager
 
 
+def cursor_paginate(
+    model: Model,
+    search_fields: Optional[set],
+    list_schema: BaseModel,
+    max_limit: Optional[int],
+) -> Callable[
+    [Optional[str], PositiveInt, str, set[str], Optional[set[str]]],
+    CURDCursorPager,
+]:
+    """游标翻页, 排序字段必须同时是数据库字段和列表字段, 以便从结果中生成游标."""
+    cursor_fields = set(model._meta.db_fields) & set(
+        list_schema.__fields__.keys(),
+    )
+
+    def get_pager(
+        cursor: Optional[str] = Query(
+            None,
+            description="翻页游标, 取上一次响应的 next_cursor 或 prev_cursor",
+        ),
+        size: PositiveInt = Query(default=10, example=10, description="每页数量"),
+        search: str = Query(
+            None,
+            description=f"搜索关键字, 匹配字段: {', '.join(search_fields)}",
+        ),
+        order_by: set[str] = Query(
+            default=set(),
+            example="-id",
+            description=(
+                "排序字段, 多个字段用英文逗号分隔. 升序保持原字段名, 降序增加前缀-."
+                f"可选字段: {', '.join(cursor_fields)}"
+            ),
+        ),
+        selected_fields: Optional[set[str]] = Query(
+            default=set(),
+            description=f"返回字段, 多个字段用英文逗号分隔. 可选字段: {', '.join(list_schema.__fields__.keys())}",
+        ),
+    ) -> CURDCursorPager:
+        if max_limit:
+            size = min(size, max_limit)
+        check_order_by(model, order_by, cursor_fields)
+        if selected_fields:
+            selected_fields.add("id")
+            selected_fields.update(field.lstrip("-") for field in order_by)
+        return CURDCursorPager(
+            limit=size,
+            order_by=order_by or set(),
+            search=search,
+            selected_fields=selected_fields,
+            cursor=cursor,
+        )
+
+    return get_pager
+
+
+def export_paginate(
+    model: Model,
+    search_fields: Optional[set],
+    list_schema: BaseModel,
+    chunk_size: int,
+) -> Callable[
+    [ExportFormatEnum, str, set[str], Optional[set[str]]],
+    CURDExportPager,
+]:
+    """导出参数, 排序字段约束同 cursor_paginate."""
+    cursor_fields = set(model._meta.db_fields) & set(
+        list_schema.__fields__.keys(),
+    )
+
+    def get_pager(
+        export_format: ExportFormatEnum = Query(
+            default=ExportFormatEnum.ndjson,
+            alias="format",
+            description=f"导出格式, {ExportFormatEnum.dict}",
+        ),
+        search: str = Query(
+            None,
+            description=f"搜索关键字, 匹配字段: {', '.join(search_fields)}",
+        ),
+        order_by: set[str] = Query(
+            default=set(),
+            example="-id",
+            description=(
+                "排序字段, 多个字段用英文逗号分隔. 升序保持原字段名, 降序增加前缀-."
+                f"可选字段: {', '.join(cursor_fields)}"
+            ),
+        ),
+        selected_fields: Optional[set[str]] = Query(
+            default=set(),
+            description=f"返回字段, 多个字段用英文逗号分隔. 可选字段: {', '.join(list_schema.__fields__.keys())}",
+        ),
+    ) -> CURDExportPager:
+        check_order_by(model, order_by, cursor_fields)
+        if selected_fields:
+            selected_fields.add("id")
+            selected_fields.update(field.lstrip("-") for field in order_by)
+        return CURDExportPager(
+            limit=chunk_size,
+            order_by=order_by or set(),
+            search=search,
+            selected_fields=selected_fields,
+            export_format=export_format.value,
+        )
+
+    return get_pager
+
+
 async def token_required(
     request: AuthorizedRequest,
     token: Annotated[HTTPAuthorizationCredentials, Depends(auth_schema)],
@@ -165,9 +284,14 @@ async def token_required(
             message=AuthorizationHeaderInvalidMsg,
         ) from e
 
-    account: Optional[Account] = (
-        await Account.filter(id=account_id).prefetch_related("roles").first()
-    )
+    if local_configs.CACHE.ACCOUNT_SNAPSHOT_ENABLED:
+        account: Optional[Account] = await get_account_snapshot(account_id)
+    else:
+        account: Optional[Account] = (
+            await Account.filter(id=account_id)
+            .prefetch_related("roles")
+            .first()
+        )
     if not account:
         raise ApiException(
             code=ResponseCodeEnum.unauthorized.value,
@@ -209,7 +333,11 @@ async def api_permission_check(
 ) -> Account:
     # router = request.scope["router"]
     # endpoint = request.scope["endpoint"]
-    role = await account.roles.filter(id=x_role_id).first()
+    # roles 已在 token_required 中 prefetch, 直接在内存中匹配
+    role = next(
+        (role for role in account.roles if str(role.id) == x_role_id),
+        None,
+    )
     if not role:
         raise ApiException(
             code=ResponseCodeEnum.forbidden.value,
@@ -217,7 +345,7 @@ async def api_permission_check(
         )
     request.scope["role"] = role
 
-    permissions = await get_permissions(account, role)
+    permissions = await get_cached_permissions(account, role)
 
     method = request.method
     path = request.scope["path"]
@@ -1,25 +1,55 @@
+import io
+import csv
+import base64
+import asyncio
+import hashlib
+from enum import Enum
 from typing import Any, Union, Generic, TypeVar, Callable, Optional
 from collections import defaultdict
 from dataclasses import asdict, dataclass
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence, Awaitable, AsyncIterator
 
+import ujson
+from loguru import logger
+from pypika import Table
 from fastapi import Body, Depends, Request, APIRouter, HTTPException
 from pydantic import BaseModel, create_model
+from tortoise import timezone
 from fastapi.types import DecoratedCallable
+from tortoise.fields import Field
 from tortoise.models import Model
+from fastapi.encoders import jsonable_encoder
 from tortoise.queryset import QuerySet
+from starlette.responses import StreamingResponse
 from tortoise.exceptions import IntegrityError
 from tortoise.expressions import Q
-from tortoise.transactions import atomic
+from tortoise.transactions import atomic, in_transaction
+from tortoise.backends.base.client import BaseDBAsyncClient
 
+from conf.config import local_configs
+from common.cache import LRUCache, get_cache_version, bump_cache_version
+from common.enums import ExportFormatEnum
 from common.fastapi import RespSchemaAPIRouter
-from common.schemas import CURDPager
-from common.pydantic import sub_fields_model
+from common.schemas import (
+    CURDPager,
+    BulkResult,
+    CURDCursorPager,
+    CURDExportPager,
+)
+from common.pydantic import (
+    DateTimeFormatConfig,
+    sub_fields_model,
+    get_derived_model,
+)
 from common.responses import Resp, PageResp, generate_page_info
-from apis.dependencies import paginate
+from apis.dependencies import paginate, cursor_paginate, export_paginate
 from common.exceptions import ApiException
+from storages.redis.keys import RedisCacheKey
+from apis.http.curd.search import SearchBackend, ContainsSearchBackend
 from common.constant.messages import (
+    ObjectInvalidMsgTemplate,
     ObjectNotExistMsgTemplate,
+    ObjectDuplicateMsgTemplate,
     ObjectAlreadyExistMsgTemplate,
 )
 
@@ -32,6 +62,18 @@ def schema_factory(
     name: str = "Create",
 ) -> type[T]:
     """Is used to create a CreateSchema which does not contain pk."""
+    fields = frozenset(schema_cls.__fields__.keys()) - {pk_field_name}
+    return get_derived_model(
+        ("schema_factory", schema_cls, fields, name),
+        lambda: _create_schema(schema_cls, pk_field_name, name),
+    )
+
+
+def _create_schema(
+    schema_cls: type[T],
+    pk_field_name: str,
+    name: str,
+) -> type[T]:
     fields = {
         f.name: (f.type_, ...)
         for f in schema_cls.__fields__.values()
@@ -44,6 +86,10 @@ def schema_factory(
 
 
 PAGINATION = dict[str, Optional[int]]
+# offset: OFFSET/LIMIT 翻页; cursor: 基于 (排序字段, id) 的游标翻页
+PAGINATION_MODES = ["offset", "cursor"]
+# exact: count(*); approximate: 执行计划估算行数; none: 不统计总数
+COUNT_MODES = ["exact", "approximate", "none"]
 
 
 def pagination_factory(
@@ -51,59 +97,357 @@ def pagination_factory(
     search_fields: set[str],
     list_schema: BaseModel,
     max_limit: Optional[int] = None,
+    pagination_mode: str = "offset",
 ) -> CURDPager:
     """Created the pagination dependency to be used in the router."""
+    if pagination_mode == "cursor":
+        return Depends(
+            cursor_paginate(db_model, search_fields, list_schema, max_limit),
+        )
     return Depends(paginate(db_model, search_fields, list_schema, max_limit))
 
 
-DEPENDENCIES = Optional[Sequence[Depends]]
+EXPORT_MEDIA_TYPES = {
+    ExportFormatEnum.ndjson.value: "application/x-ndjson",
+    ExportFormatEnum.csv.value: "text/csv; charset=utf-8",
+}
+
+
+def cursor_ordering(order_by: set[str]) -> list[str]:
+    """游标翻页的排序字段, 以 id 兜底保证顺序唯一."""
+    ordering = sorted(order_by)
+    if not {"id", "-id"} & order_by:
+        ordering.append("id")
+    return ordering
+
+
+def reverse_ordering(ordering: list[str]) -> list[str]:
+    return [f[1:] if f.startswith("-") else f"-{f}" for f in ordering]
+
+
+def _cursor_value(field: Field, value: object) -> object:
+    """按数据库中的值编码, Enum 等类型不能直接 str."""
+    if value is None:
+        return None
+    value = field.to_db_value(value, field.model)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def encode_cursor(
+    direction: str,
+    ordering: list[str],
+    values: list,
+    db_model: type[Model],
+) -> str:
+    fields_map = db_model._meta.fields_map
+    values = [
+        _cursor_value(fields_map[f.lstrip("-")], v)
+        for f, v in zip(ordering, values)
+    ]
+    payload = ujson.dumps([direction, ordering, values])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(
+    cursor: str,
+    ordering: list[str],
+    db_model: type[Model],
+) -> tuple[str, list]:
+    try:
+        direction, cursor_ordering_, values = ujson.loads(
+            base64.urlsafe_b64decode(cursor.encode()),
+        )
+        assert direction in ("next", "prev")
+        assert cursor_ordering_ == ordering and len(values) == len(ordering)
+        fields_map = db_model._meta.fields_map
+        values = [
+            fields_map[f.lstrip("-")].to_python_value(v)
+            for f, v in zip(ordering, values)
+        ]
+    except Exception as e:
+        raise ApiException(ObjectInvalidMsgTemplate % "翻页游标") from e
+    return direction, values
 
 
-async def update_create_data_clean(
-    data: dict,
-    model: Model,
-) -> tuple[dict, dict]:
+# 升序排列时 NULL 排在最后的数据库, MySQL/SQLite 中 NULL 排在最前
+NULLS_LAST_DIALECTS = {"postgres", "oracle"}
+
+
+def is_nulls_last(db_model: type[Model]) -> bool:
+    return db_model._meta.db.capabilities.dialect in NULLS_LAST_DIALECTS
+
+
+def _keyset_equal(field: str, value: object) -> Q:
+    if value is None:
+        return Q(**{f"{field}__isnull": True})
+    return Q(**{field: value})
+
+
+def _keyset_after(field: str, value: object, nulls_last: bool) -> Optional[Q]:
+    """排序中位于 value 之后的行, 按数据库的 NULL 排序规则处理 NULL."""
+    desc = field.startswith("-")
+    name = field.lstrip("-")
+    # 降序时 NULL 的位置与升序相反
+    null_after = nulls_last != desc
+    if value is None:
+        return None if null_after else Q(**{f"{name}__isnull": False})
+    q = Q(**{f"{name}__{'lt' if desc else 'gt'}": value})
+    if null_after:
+        q |= Q(**{f"{name}__isnull": True})
+    return q
+
+
+def keyset_q(
+    ordering: list[str],
+    values: list,
+    nulls_last: bool = False,
+) -> Q:
+    """(a, b) > (x, y) 展开为 a > x OR (a = x AND b > y), 降序字段取 <.
+
+    比较运算不会匹配 NULL, 值为 NULL 时改用 IS NULL/IS NOT NULL.
+    """
+    sub_q_exps = []
+    for i, field in enumerate(ordering):
+        after = _keyset_after(field, values[i], nulls_last)
+        if after is None:
+            continue
+        sub_q_exps.append(
+            Q(
+                *[
+                    _keyset_equal(f.lstrip("-"), v)
+                    for f, v in zip(ordering[:i], values[:i])
+                ],
+                after,
+            ),
+        )
+    return Q(*sub_q_exps, join_type=Q.OR)
+
+
+def plan_rows(dialect: str, plan: list) -> Optional[int]:
+    """从执行计划中取估算行数, 取不到时返回 None.
+
+    MySQL 为 EXPLAIN 首行 (驱动表) 的 rows * filtered, PostgreSQL 为
+    EXPLAIN (FORMAT JSON) 根节点的 Plan Rows.
+    """
+    if not plan:
+        return None
+    row = dict(plan[0])
+    if dialect == "mysql":
+        if row.get("rows") is None:
+            return None
+        filtered = float(row.get("filtered") or 100)
+        return int(int(row["rows"]) * filtered / 100)
+    if dialect == "postgres":
+        query_plan = row.get("QUERY PLAN")
+        if isinstance(query_plan, str):
+            query_plan = ujson.loads(query_plan)
+        try:
+            return int(query_plan[0]["Plan"]["Plan Rows"])
+        except (TypeError, LookupError, ValueError):
+            return None
+    return None
+
+
+async def approximate_count(queryset: QuerySet) -> int:
+    """按执行计划估算行数, 避免大表 count(*) 扫描.
+
+    只支持 MySQL 与 PostgreSQL, 其他数据库或估算失败时退回精确统计.
+    """
+    db = queryset.model._meta.db
+    dialect = db.capabilities.dialect
+    estimate = None
+    try:
+        if dialect == "mysql":
+            # EXPLAIN FORMAT=JSON 中没有 rows 列, 使用表格格式
+            plan = await db.execute_query_dict(f"EXPLAIN {queryset.sql()}")
+            estimate = plan_rows(dialect, plan)
+        elif dialect == "postgres":
+            estimate = plan_rows(dialect, await queryset.explain())
+    except Exception as exc:
+        logger.warning(f"approximate count failed, use count(*): {exc}")
+    if estimate is None:
+        return await queryset.count()
+    return max(estimate, 0)
+
+
+def _unwrap_enums(objs: list[Model], fields: list[str]) -> None:
+    """bulk_update 不经过 to_db_value, pypika 会把枚举渲染为不带引号的值."""
+    for obj in objs:
+        for field in fields:
+            value = getattr(obj, field)
+            if isinstance(value, Enum):
+                setattr(obj, field, value.value)
+
+
+DEPENDENCIES = Optional[Sequence[Depends]]
+INVALIDATORS = Optional[Sequence[Callable[[], Awaitable[None]]]]
+
+
+def _missing_message(
+    model: type[Model],
+    to_field: str,
+    missing: Iterable[str],
+) -> str:
+    return (
+        ObjectNotExistMsgTemplate
+        % f"{to_field}为{', '.join(sorted(missing))}的{model._meta.table_description}"
+    )
+
+
+async def get_related_objects(
+    model: type[Model],
+    values: Iterable,
+    to_field: str = "id",
+) -> dict[str, Model]:
+    """一次 to_field__in 查询批量获取关联对象, 有缺失时报错并列出全部缺失值.
+
+    返回以 str(to_field 值) 为 key 的对象字典.
+    """
+    values = {str(v) for v in values}
+    if not values:
+        return {}
+    objs = await model.filter(**{f"{to_field}__in": list(values)})
+    found = {str(getattr(obj, to_field)): obj for obj in objs}
+    missing = values - found.keys()
+    if missing:
+        raise ApiException(_missing_message(model, to_field, missing))
+    return found
+
+
+async def bulk_update_create_data_clean(
+    items: list[dict],
+    model: type[Model],
+) -> list[Union[tuple[dict, dict], ApiException]]:
+    """批量清洗数据, 每个关联模型只查询一次.
+
+    按 items 顺序返回 (cleaned_data, m2m_fields_data), 关联对象缺失的项返回 ApiException.
+    """
     fields_map = model._meta.fields_map
     fk_fields = [f"{i}_id" for i in model._meta.fk_fields]
     m2m_fields = model._meta.m2m_fields
 
-    cleaned_data = {}
-    m2m_fields_data = defaultdict(list)
-
-    for key in data:
-        if key not in fields_map:
-            continue
+    def related_key(key: str) -> tuple[type[Model], str]:
         if key in fk_fields:
-            if data[key]:
-                field = fields_map[key.split("_id")[0]]
-                obj = await field.related_model.get_or_none(
-                    **{field.to_field: data[key]},
-                )
-                if not obj:
-                    raise ApiException(
-                        ObjectNotExistMsgTemplate % field.description,
-                    )
-            cleaned_data[key] = data[key]
-            continue
+            field = fields_map[key.split("_id")[0]]
+            return field.related_model, field.to_field
+        return fields_map[key].related_model, "id"
 
+    def related_values_of(data: dict, key: str) -> list[str]:
+        if key not in fields_map or not data[key]:
+            return []
+        if key in fk_fields:
+            return [str(data[key])]
         if key in m2m_fields:
-            if not data[key]:
+            return [str(related_id) for related_id in data[key]]
+        return []
+
+    # (关联模型, 关联字段) -> 待校验的值
+    related_values = defaultdict(set)
+    for data in items:
+        for key in data:
+            values = related_values_of(data, key)
+            if values:
+                related_values[related_key(key)].update(values)
+
+    related_objects = {}
+    for (related_model, to_field), values in related_values.items():
+        objs = await related_model.filter(
+            **{f"{to_field}__in": list(values)},
+        )
+        related_objects[(related_model, to_field)] = {
+            str(getattr(obj, to_field)): obj for obj in objs
+        }
+
+    results = []
+    for data in items:
+        cleaned_data = {}
+        m2m_fields_data = defaultdict(list)
+        missing = defaultdict(list)
+        for key in data:
+            if key not in fields_map:
                 continue
-            field = fields_map[key]
-            model = field.related_model
-            for related_id in data[key]:
-                obj = await model.get_or_none(id=related_id)
-                if not obj:
-                    raise ApiException(
-                        ObjectNotExistMsgTemplate
-                        % f"id为{related_id}的{model._meta.table_description}",
-                    )
-                m2m_fields_data[key].append(obj)
-            continue
+            values = related_values_of(data, key)
+            if values:
+                found = related_objects[related_key(key)]
+                for value in values:
+                    if value not in found:
+                        missing[related_key(key)].append(value)
+                    elif key in m2m_fields:
+                        m2m_fields_data[key].append(found[value])
+            if key not in m2m_fields:
+                cleaned_data[key] = data[key]
+        if missing:
+            results.append(
+                ApiException(
+                    "; ".join(
+                        _missing_message(*relation, values)
+                        for relation, values in missing.items()
+                    ),
+                ),
+            )
+        else:
+            results.append((cleaned_data, m2m_fields_data))
+    return results
 
-        cleaned_data[key] = data[key]
 
-    return cleaned_data, m2m_fields_data
+async def update_create_data_clean(
+    data: dict,
+    model: Model,
+) -> tuple[dict, dict]:
+    result = (await bulk_update_create_data_clean([data], model))[0]
+    if isinstance(result, ApiException):
+        raise result
+    return result
+
+
+async def bulk_add_m2m(
+    model: type[Model],
+    field_name: str,
+    m2m_data: list[tuple[Model, list[Model]]],
+    connection: BaseDBAsyncClient,
+) -> None:
+    """批量写入多对多关系: 一次查询已有关系, 一条 INSERT 写入新增关系."""
+    field = model._meta.fields_map[field_name]
+    pk_db_value = model._meta.pk.to_db_value
+    related_pk_db_value = field.related_model._meta.pk.to_db_value
+    # str(pair) -> pair, 按字符串比较已有关系
+    pairs = {}
+    for obj, related_objs in m2m_data:
+        for related in related_objs:
+            pair = (
+                pk_db_value(obj.pk, obj),
+                related_pk_db_value(related.pk, related),
+            )
+            pairs[tuple(map(str, pair))] = pair
+    if not pairs:
+        return
+    through_table = Table(field.through)
+    existing = await connection.execute_query_dict(
+        connection.query_class.from_(through_table)
+        .where(
+            through_table[field.backward_key].isin(
+                list({pair[0] for pair in pairs.values()}),
+            ),
+        )
+        .select(field.backward_key, field.forward_key)
+        .get_sql(),
+    )
+    for row in existing:
+        pairs.pop(
+            (str(row[field.backward_key]), str(row[field.forward_key])),
+            None,
+        )
+    if not pairs:
+        return
+    query = connection.query_class.into(through_table).columns(
+        through_table[field.backward_key],
+        through_table[field.forward_key],
+    )
+    for pair in pairs.values():
+        query = query.insert(*pair)
+    await connection.execute_query(query.get_sql())
 
 
 @dataclass
@@ -132,6 +476,13 @@ class CURDGenerator(Generic[T], APIRouter):
     retrieve_schema: type[T]
     _base_path: str = "/"
     get_queryset: Callable[["CURDGenerator", Request], QuerySet]
+    invalidators: list[Callable[[], Awaitable[None]]]
+    pagination_mode: str
+    count_mode: str
+    count_cache_ttl: Optional[float]
+    upsert_key: Optional[str]
+    search_backend: SearchBackend
+    bulk_chunk_size: int
 
     def __init__(
         self,
@@ -144,15 +495,27 @@ class CURDGenerator(Generic[T], APIRouter):
         retrieve_schema: Optional[type[T]] = None,
         filter_schema: Optional[type[T]] = None,
         search_fields: Optional[list[str]] = None,
+        search_backend: Optional[SearchBackend] = None,
         prefix: Optional[str] = None,
         tags: Optional[list[str]] = None,
         max_paginate_limit: Optional[int] = None,
+        pagination_mode: str = "offset",
+        count_mode: str = "exact",
+        count_cache_ttl: Optional[float] = None,
         get_all_route: Union[bool, DEPENDENCIES] = True,
         get_one_route: Union[bool, DEPENDENCIES] = True,
         create_route: Union[bool, DEPENDENCIES] = True,
         update_route: Union[bool, DEPENDENCIES] = True,
         delete_one_route: Union[bool, DEPENDENCIES] = True,
         delete_all_route: Union[bool, DEPENDENCIES] = True,
+        bulk_create_route: Union[bool, DEPENDENCIES] = False,
+        bulk_update_route: Union[bool, DEPENDENCIES] = False,
+        bulk_upsert_route: Union[bool, DEPENDENCIES] = False,
+        upsert_key: Optional[str] = None,
+        bulk_chunk_size: int = 500,
+        export_route: Union[bool, DEPENDENCIES] = False,
+        export_chunk_size: int = 1000,
+        invalidators: INVALIDATORS = None,
         **kwargs,
     ) -> None:
         self.db_model = db_model
@@ -160,13 +523,39 @@ class CURDGenerator(Generic[T], APIRouter):
         self.get_queryset = get_queryset or default_get_queryset
         self.db_model_label = self.db_model.Meta.table_description
         self._pk: str = db_model.describe()["pk_field"]["db_column"]
+        self._db_fields: set[str] = set(db_model._meta.fields_db_projection)
 
         self.schema = schema
+        assert (
+            pagination_mode in PAGINATION_MODES
+        ), f"invalid pagination mode: {pagination_mode}"
+        assert count_mode in COUNT_MODES, f"invalid count mode: {count_mode}"
+        self.pagination_mode = pagination_mode
+        self.count_mode = count_mode
+        # 列表总数缓存, key 为过滤条件 SQL 的摘要, 经生成的路由写入时失效
+        self.count_cache_ttl = count_cache_ttl
+        self._count_lru = LRUCache(
+            maxsize=local_configs.CACHE.COUNT_LRU_SIZE,
+            ttl=count_cache_ttl,
+        )
+        self._count_version_key = RedisCacheKey.CountVersionKey.format(
+            table=db_model._meta.db_table,
+        )
         self.pagination: CURDPager = pagination_factory(
             db_model,
             search_fields=set(search_fields or []),
             list_schema=self.schema,
             max_limit=max_paginate_limit,
+            pagination_mode=pagination_mode,
+        )
+        # 导出按游标分片读取, limit 为每个分片的大小
+        self.export_pagination: CURDExportPager = Depends(
+            export_paginate(
+                db_model,
+                search_fields=set(search_fields or []),
+                list_schema=self.schema,
+                chunk_size=export_chunk_size,
+            ),
         )
         self._pk: str = self._pk if hasattr(self, "_pk") else "id"
         self.create_schema = (
@@ -192,6 +581,26 @@ class CURDGenerator(Generic[T], APIRouter):
         )
         self.filter_schema = filter_schema or default_filter()
         self.search_fields = set(search_fields or [])
+        # 默认 icontains, 可选全文索引或进程内 n-gram 索引
+        self.search_backend = search_backend or ContainsSearchBackend()
+        self.search_backend.bind(self)
+        self.bulk_update_schema = get_derived_model(
+            ("bulk_update", self.update_schema, frozenset(["id"])),
+            lambda: create_model(
+                __model_name=self.update_schema.__name__ + "Bulk",
+                __base__=self.update_schema,
+                id=(str, ...),
+            ),
+        )
+        assert not bulk_upsert_route or (
+            upsert_key and upsert_key in self.create_schema.__fields__
+        ), "upsert_key must be a field of create_schema"
+        # 批量写入的唯一键, 如 code/username
+        self.upsert_key = upsert_key
+        # 每个分片在一个事务中提交
+        self.bulk_chunk_size = bulk_chunk_size
+        # 写操作(事务提交后)触发, 用于失效依赖该模型数据的缓存
+        self.invalidators = list(invalidators or [])
 
         prefix = str(prefix if prefix else self.schema.__name__).lower()
         prefix = self._base_path + prefix.strip("/")
@@ -234,6 +643,46 @@ class CURDGenerator(Generic[T], APIRouter):
                 dependencies=delete_all_route,
             )
 
+        if export_route:
+            self._add_api_route(
+                "/export",
+                self._export(),
+                methods=["GET"],
+                response_class=StreamingResponse,
+                summary=f"导出{self.db_model_label}",
+                dependencies=export_route,
+            )
+
+        if bulk_create_route:
+            self._add_api_route(
+                "/bulk",
+                self._bulk_create(),
+                methods=["POST"],
+                response_model=Resp[BulkResult],
+                summary=f"批量创建{self.db_model_label}",
+                dependencies=bulk_create_route,
+            )
+
+        if bulk_update_route:
+            self._add_api_route(
+                "/bulk",
+                self._bulk_update(),
+                methods=["PUT"],
+                response_model=Resp[BulkResult],
+                summary=f"批量更新{self.db_model_label}",
+                dependencies=bulk_update_route,
+            )
+
+        if bulk_upsert_route:
+            self._add_api_route(
+                "/bulk/upsert",
+                self._bulk_upsert(),
+                methods=["POST"],
+                response_model=Resp[BulkResult],
+                summary=f"批量创建或更新{self.db_model_label}",
+                dependencies=bulk_upsert_route,
+            )
+
         if get_one_route:
             self._add_api_route(
                 "/{item_id}",
@@ -347,63 +796,286 @@ class CURDGenerator(Generic[T], APIRouter):
             ):
                 self.routes.remove(route)
 
+    async def _invalidate(self) -> None:
+        if self.count_cache_ttl:
+            await bump_cache_version(self._count_version_key)
+            self._count_lru.clear()
+        await self.search_backend.on_write()
+        for invalidator in self.invalidators:
+            await invalidator()
+
+    async def _count(self, queryset: QuerySet) -> Optional[int]:
+        if self.count_mode == "none":
+            return None
+        if not self.count_cache_ttl:
+            return await self._count_from_db(queryset)
+        version = await get_cache_version(self._count_version_key)
+        key = (version, hashlib.md5(queryset.sql().encode()).hexdigest())
+        total = self._count_lru.get(key)
+        if total is None:
+            total = await self._count_from_db(queryset)
+            self._count_lru.set(key, total)
+        return total
+
+    async def _count_from_db(self, queryset: QuerySet) -> int:
+        if self.count_mode == "approximate":
+            return await approximate_count(queryset)
+        return await queryset.count()
+
+    async def _cursor_page(
+        self,
+        queryset: QuerySet,
+        list_schema: type[BaseModel],
+        pagination: CURDCursorPager,
+        total_capped: bool = False,
+    ) -> PageResp:
+        ordering = cursor_ordering(pagination.order_by)
+        direction = "next"
+        if pagination.cursor:
+            direction, values = decode_cursor(
+                pagination.cursor,
+                ordering,
+                self.db_model,
+            )
+            query_ordering = (
+                ordering if direction == "next" else reverse_ordering(ordering)
+            )
+            page_queryset = queryset.filter(
+                keyset_q(query_ordering, values, is_nulls_last(self.db_model)),
+            )
+        else:
+            query_ordering = ordering
+            page_queryset = queryset
+
+        # 多取一条判断是否还有下一页; 总数与分页数据并发查询
+        data, total = await asyncio.gather(
+            self._fetch(
+                page_queryset.order_by(*query_ordering).limit(
+                    pagination.limit + 1,
+                ),
+                list_schema,
+                pagination.selected_fields,
+            ),
+            self._count(queryset),
+        )
+        has_more = len(data) > pagination.limit
+        data = data[: pagination.limit]
+        if direction == "prev":
+            data.reverse()
+
+        def cursor_of(item: BaseModel, cursor_direction: str) -> str:
+            return encode_cursor(
+                cursor_direction,
+                ordering,
+                [getattr(item, f.lstrip("-")) for f in ordering],
+                self.db_model,
+            )
+
+        next_cursor = prev_cursor = None
+        if data:
+            if has_more or direction == "prev":
+                next_cursor = cursor_of(data[-1], "next")
+            if (direction == "next" and pagination.cursor) or (
+                direction == "prev" and has_more
+            ):
+                prev_cursor = cursor_of(data[0], "prev")
+        return PageResp[list_schema](
+            data=data,
+            page_info=generate_page_info(
+                total,
+                pagination,
+                next_cursor=next_cursor,
+                prev_cursor=prev_cursor,
+                total_capped=total_capped,
+            ),
+        )
+
+    async def _filter_queryset(
+        self,
+        request: Request,
+        filter_: T,
+        search: Optional[str],
+    ) -> tuple[QuerySet, bool]:
+        """返回 (queryset, 搜索是否只保留了部分匹配)."""
+        exclude_fields = getattr(filter_, "exclude_fields", [])
+
+        extra_args = getattr(filter_, "extra_args", [])
+        extra_kwargs = getattr(filter_, "extra_kwargs", {})
+
+        filter_dict = asdict(
+            filter_,
+            dict_factory=lambda x: {
+                k: v
+                for (k, v) in x
+                if v is not None and k not in exclude_fields
+            },
+        )
+
+        filter_dict.update(extra_kwargs)
+
+        queryset: QuerySet[self.db_model] = await self.get_queryset(
+            self,
+            request,
+        )
+
+        queryset = queryset.filter(*extra_args).filter(**filter_dict)
+
+        if search is not None and self.search_fields:
+            return await self.search_backend.filter(queryset, search)
+        return queryset, False
+
+    def _list_schema(
+        self,
+        selected_fields: Optional[set[str]],
+    ) -> type[BaseModel]:
+        if selected_fields:
+            return sub_fields_model(self.schema, selected_fields)
+        return self.schema
+
+    async def _fetch(
+        self,
+        queryset: QuerySet,
+        list_schema: type[BaseModel],
+        selected_fields: Optional[set[str]],
+    ) -> list[BaseModel]:
+        """选择的响应字段均为数据库列时只查询这些列, 由行数据直接构造响应模型.
+
+        只查询 list_schema 中的字段, 响应模型排除的列(如密码)不会被带出;
+        包含关联或计算字段时退回完整查询.
+        """
+        fields = list(list_schema.__fields__)
+        if selected_fields and set(fields) <= self._db_fields:
+            return [
+                list_schema.construct(**dict(zip(fields, row)))
+                for row in await queryset.values_list(*fields)
+            ]
+        return await list_schema.from_queryset(queryset)
+
     def _get_all(self, *args, **kwargs) -> Callable[..., Any]:
         async def route(
             request: Request,
             filter_: self.filter_schema = Depends(),
             pagination: CURDPager = self.pagination,
         ) -> PageResp[self.schema]:
-            exclude_fields = getattr(filter_, "exclude_fields", [])
-
-            extra_args = getattr(filter_, "extra_args", [])
-            extra_kwargs = getattr(filter_, "extra_kwargs", {})
-
-            filter_dict = asdict(
+            queryset, total_capped = await self._filter_queryset(
+                request,
                 filter_,
-                dict_factory=lambda x: {
-                    k: v
-                    for (k, v) in x
-                    if v is not None and k not in exclude_fields
-                },
+                pagination.search,
             )
+            list_schema = self._list_schema(pagination.selected_fields)
+
+            if self.pagination_mode == "cursor":
+                return await self._cursor_page(
+                    queryset,
+                    list_schema,
+                    pagination,
+                    total_capped,
+                )
 
-            filter_dict.update(extra_kwargs)
-
-            queryset: QuerySet[self.db_model] = await self.get_queryset(
-                self,
-                request,
+            # 总数与分页数据在不同连接上并发查询
+            data, total = await asyncio.gather(
+                self._fetch(
+                    queryset.order_by(*pagination.order_by)
+                    .offset(pagination.offset)
+                    .limit(pagination.limit),
+                    list_schema,
+                    pagination.selected_fields,
+                ),
+                self._count(queryset),
             )
-
-            queryset = (
-                queryset.filter(*extra_args)
-                .filter(**filter_dict)
-                .order_by(*pagination.order_by)
+            return PageResp[list_schema](
+                data=data,
+                page_info=generate_page_info(
+                    total,
+                    pagination,
+                    total_capped=total_capped,
+                ),
             )
 
-            search = pagination.search
-            if search is not None and self.search_fields:
-                sub_q_exps = []
-                for search_field in self.search_fields:
-                    sub_q_exps.append(
-                        Q(**{f"{search_field}__icontains": search}),
-                    )
-                q_expression = Q(*sub_q_exps, join_type=Q.OR)
-                queryset = queryset.filter(q_expression)
+        return route
 
-            list_schema = self.schema
-            if pagination.selected_fields:
-                list_schema = sub_fields_model(
-                    self.schema,
-                    pagination.selected_fields,
+    async def _iter_chunks(
+        self,
+        queryset: QuerySet,
+        list_schema: type[BaseModel],
+        pagination: CURDCursorPager,
+    ) -> AsyncIterator[list[BaseModel]]:
+        """按 (排序字段, id) 游标分片读取, 内存中最多保留一个分片."""
+        ordering = cursor_ordering(pagination.order_by)
+        values = None
+        while True:
+            chunk_queryset = queryset
+            if values is not None:
+                chunk_queryset = queryset.filter(
+                    keyset_q(ordering, values, is_nulls_last(self.db_model)),
                 )
+            data = await self._fetch(
+                chunk_queryset.order_by(*ordering).limit(pagination.limit),
+                list_schema,
+                pagination.selected_fields,
+            )
+            if data:
+                yield data
+            if len(data) < pagination.limit:
+                return
+            values = [getattr(data[-1], f.lstrip("-")) for f in ordering]
 
-            data = await list_schema.from_queryset(
-                queryset.offset(pagination.offset).limit(pagination.limit),
+    async def _iter_export(
+        self,
+        queryset: QuerySet,
+        list_schema: type[BaseModel],
+        pagination: CURDExportPager,
+    ) -> AsyncIterator[str]:
+        fields = list(list_schema.__fields__.keys())
+        csv_format = pagination.export_format == ExportFormatEnum.csv.value
+        if csv_format:
+            yield ",".join(fields) + "\r\n"
+        chunks = self._iter_chunks(queryset, list_schema, pagination)
+        async for chunk in chunks:
+            rows = jsonable_encoder(
+                chunk,
+                custom_encoder=DateTimeFormatConfig.json_encoders,
             )
-            total = await queryset.count()
-            return PageResp[list_schema](
-                data=data,
-                page_info=generate_page_info(total, pagination),
+            if not csv_format:
+                yield "".join(
+                    ujson.dumps(row, ensure_ascii=False) + "\n" for row in rows
+                )
+                continue
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(
+                    [
+                        ujson.dumps(row[f], ensure_ascii=False)
+                        if isinstance(row[f], (dict, list))
+                        else row[f]
+                        for f in fields
+                    ],
+                )
+            yield buffer.getvalue()
+
+    def _export(self, *args, **kwargs) -> Callable[..., Any]:
+        async def route(
+            request: Request,
+            filter_: self.filter_schema = Depends(),
+            pagination: CURDExportPager = self.export_pagination,
+        ) -> StreamingResponse:
+            queryset, _ = await self._filter_queryset(
+                request,
+                filter_,
+                pagination.search,
+            )
+            list_schema = self._list_schema(pagination.selected_fields)
+            export_format = pagination.export_format
+            filename = (
+                f"{self.prefix.strip('/').replace('/', '_')}.{export_format}"
+            )
+            return StreamingResponse(
+                self._iter_export(queryset, list_schema, pagination),
+                media_type=EXPORT_MEDIA_TYPES[export_format],
+                headers={
+                    "Content-Disposition": f'attachment; filename="{filename}"',
+                },
             )
 
         return route
@@ -427,7 +1099,7 @@ class CURDGenerator(Generic[T], APIRouter):
 
     def _create(self, *args, **kwargs) -> Callable[..., Any]:
         @atomic("default")
-        async def route(request: Request, model: self.create_schema) -> Resp[self.retrieve_schema]:  # type: ignore
+        async def create(model: self.create_schema) -> Model:  # type: ignore
             data, m2m_data = await update_create_data_clean(
                 model.dict(),
                 self.db_model,
@@ -445,7 +1117,11 @@ class CURDGenerator(Generic[T], APIRouter):
             for k, v in m2m_data.items():
                 if v:
                     await getattr(obj, k).add(*v)
+            return obj
 
+        async def route(request: Request, model: self.create_schema) -> Resp[self.retrieve_schema]:  # type: ignore
+            obj = await create(model)
+            await self._invalidate()
             return Resp[self.retrieve_schema](
                 data=await self.retrieve_schema.from_tortoise_orm(obj),
             )
@@ -454,16 +1130,16 @@ class CURDGenerator(Generic[T], APIRouter):
 
     def _update(self, *args, **kwargs) -> Callable[..., Any]:
         @atomic("default")
-        async def route(
+        async def update(
             request: Request,
             id: str,
             model: self.update_schema,
-        ) -> Resp[self.retrieve_schema]:
+        ) -> Optional[Model]:
             obj = await (await self.get_queryset(self, request)).get_or_none(
                 id=id,
             )
             if not obj:
-                return Resp.fail(ObjectNotExistMsgTemplate % "对象")
+                return None
             data, m2m_data = await update_create_data_clean(
                 model.dict(exclude_unset=True),
                 self.db_model,
@@ -482,6 +1158,17 @@ class CURDGenerator(Generic[T], APIRouter):
                 for k, v in m2m_data.items():
                     await getattr(obj, k).add(*v)
             await obj.refresh_from_db()
+            return obj
+
+        async def route(
+            request: Request,
+            id: str,
+            model: self.update_schema,
+        ) -> Resp[self.retrieve_schema]:
+            obj = await update(request, id, model)
+            if not obj:
+                return Resp.fail(ObjectNotExistMsgTemplate % "对象")
+            await self._invalidate()
             return Resp[self.retrieve_schema](data=obj)
 
         return route
@@ -491,6 +1178,7 @@ class CURDGenerator(Generic[T], APIRouter):
             await (await self.get_queryset(self, request)).filter(
                 id=id,
             ).delete()
+            await self._invalidate()
             return Resp()
 
         return route
@@ -503,16 +1191,202 @@ class CURDGenerator(Generic[T], APIRouter):
             await (await self.get_queryset(self, request)).filter(
                 id__in=ids,
             ).delete()
+            await self._invalidate()
             return Resp()
 
         return route
 
+    async def _bulk_write(
+        self,
+        items: list[tuple[int, dict, Optional[Model]]],
+        result: BulkResult,
+    ) -> None:
+        """在一个事务中写入一个分片.
+
+        items 为 (下标, 数据, 已有对象), 已有对象为空时新建, 否则更新.
+        校验失败的项单独记录错误; 数据库写入失败时整个分片回滚并记录错误.
+        """
+        cleaned = await bulk_update_create_data_clean(
+            [data for _, data, _ in items],
+            self.db_model,
+        )
+        auto_now_fields = [
+            name
+            for name, field in self.db_model._meta.fields_map.items()
+            if getattr(field, "auto_now", False)
+        ]
+        now = timezone.now()
+        to_create = []
+        to_update = defaultdict(list)
+        m2m_data = defaultdict(list)
+        indexes = []
+        for (index, _, existing), item in zip(items, cleaned):
+            if isinstance(item, ApiException):
+                result.add_error(index, item.message)
+                continue
+            data, m2m = item
+            if existing is None:
+                obj = self.db_model(**data)
+                to_create.append(obj)
+            else:
+                obj = existing
+                if data:
+                    obj.update_from_dict(data)
+                    # bulk_update 不会像 save 一样刷新 auto_now 字段
+                    for name in auto_now_fields:
+                        setattr(obj, name, now)
+                    # bulk_update 要求同一批对象更新相同的字段
+                    to_update[tuple(sorted(data))].append(obj)
+            for field_name, related_objs in m2m.items():
+                m2m_data[field_name].append((obj, related_objs))
+            indexes.append(index)
+        if not indexes:
+            return
+
+        try:
+            async with in_transaction("default") as connection:
+                if to_create:
+                    await self.db_model.bulk_create(
+                        to_create,
+                        using_db=connection,
+                    )
+                for fields, objs in to_update.items():
+                    update_fields = [*fields, *auto_now_fields]
+                    _unwrap_enums(objs, update_fields)
+                    await self.db_model.bulk_update(
+                        objs,
+                        fields=update_fields,
+                        using_db=connection,
+                    )
+                for field_name, data in m2m_data.items():
+                    await bulk_add_m2m(
+                        self.db_model,
+                        field_name,
+                        data,
+                        connection,
+                    )
+        except IntegrityError:
+            for index in indexes:
+                result.add_error(
+                    index,
+                    ObjectAlreadyExistMsgTemplate % self.db_model_label,
+                )
+            return
+        result.succeeded += len(indexes)
+
+    def _chunks(self, models: list) -> list[tuple[int, list]]:
+        return [
+            (offset, models[offset : offset + self.bulk_chunk_size])
+            for offset in range(0, len(models), self.bulk_chunk_size)
+        ]
+
+    def _bulk_create(self, *args, **kwargs) -> Callable[..., Any]:
+        async def route(
+            request: Request,
+            models: list[self.create_schema],  # type: ignore
+        ) -> Resp[BulkResult]:
+            result = BulkResult(total=len(models))
+            for offset, chunk in self._chunks(models):
+                await self._bulk_write(
+                    [
+                        (offset + i, model.dict(), None)
+                        for i, model in enumerate(chunk)
+                    ],
+                    result,
+                )
+            if result.succeeded:
+                await self._invalidate()
+            return Resp[BulkResult](data=result)
+
+        return route
+
+    def _bulk_update(self, *args, **kwargs) -> Callable[..., Any]:
+        async def route(
+            request: Request,
+            models: list[self.bulk_update_schema],  # type: ignore
+        ) -> Resp[BulkResult]:
+            result = BulkResult(total=len(models))
+            queryset = await self.get_queryset(self, request)
+            for offset, chunk in self._chunks(models):
+                objs = {
+                    str(obj.id): obj
+                    for obj in await queryset.filter(
+                        id__in=[model.id for model in chunk],
+                    )
+                }
+                items = []
+                for i, model in enumerate(chunk):
+                    obj = objs.get(str(model.id))
+                    if not obj:
+                        result.add_error(
+                            offset + i,
+                            ObjectNotExistMsgTemplate
+                            % f"id为{model.id}的{self.db_model_label}",
+                        )
+                        continue
+                    items.append(
+                        (
+                            offset + i,
+                            model.dict(exclude_unset=True, exclude={"id"}),
+                            obj,
+                        ),
+                    )
+                await self._bulk_write(items, result)
+            if result.succeeded:
+                await self._invalidate()
+            return Resp[BulkResult](data=result)
+
+        return route
+
+    def _bulk_upsert(self, *args, **kwargs) -> Callable[..., Any]:
+        async def route(
+            request: Request,
+            models: list[self.create_schema],  # type: ignore
+        ) -> Resp[BulkResult]:
+            result = BulkResult(total=len(models))
+            queryset = await self.get_queryset(self, request)
+            key = self.upsert_key
+            # 整个请求内唯一键重复的项报错, 不区分是否在同一分片
+            seen = set()
+            for offset, chunk in self._chunks(models):
+                objs = {
+                    str(getattr(obj, key)): obj
+                    for obj in await queryset.filter(
+                        **{
+                            f"{key}__in": [
+                                getattr(model, key) for model in chunk
+                            ],
+                        },
+                    )
+                }
+                items = []
+                for i, model in enumerate(chunk):
+                    value = str(getattr(model, key))
+                    if value in seen:
+                        result.add_error(
+                            offset + i,
+                            ObjectDuplicateMsgTemplate % f"{key}: {value}",
+                        )
+                        continue
+                    seen.add(value)
+                    items.append((offset + i, model.dict(), objs.get(value)))
+                await self._bulk_write(items, result)
+            if result.succeeded:
+                await self._invalidate()
+            return Resp[BulkResult](data=result)
+
+        return route
+
     @staticmethod
     def get_routes() -> list[str]:
         return [
             "get_all",
             "create",
             "delete_all",
+            "export",
+            "bulk_create",
+            "bulk_update",
+            "bulk_upsert",
             "get_one",
             "update",
             "delete_one",
@@ -0,0 +1,279 @@
+"""CURDGenerator 的搜索后端.
+
+每个 CURDGenerator 持有自己的后端实例, 不要在多个 generator 间共享.
+"""
+from __future__ import annotations
+
+import time
+import asyncio
+from typing import TYPE_CHECKING
+from collections import defaultdict
+
+from loguru import logger
+from tortoise.models import Model
+from tortoise.queryset import QuerySet
+from tortoise.expressions import Q
+
+from common.cache import get_cache_version, bump_cache_version
+from storages.redis.keys import RedisCacheKey
+
+if TYPE_CHECKING:  # pragma: no cover
+    from apis.http.curd import CURDGenerator
+
+# 已声明的全文索引 (表名, 字段), 用于生成迁移文件
+FULLTEXT_INDEXES: dict[str, tuple[str, ...]] = {}
+
+
+class SearchBackend:
+    db_model: type[Model]
+    search_fields: tuple[str, ...]
+
+    def bind(self, generator: CURDGenerator) -> None:
+        self.db_model = generator.db_model
+        self.search_fields = tuple(sorted(generator.search_fields))
+
+    async def filter(
+        self,
+        queryset: QuerySet,
+        search: str,
+    ) -> tuple[QuerySet, bool]:
+        """返回 (过滤后的 queryset, 是否只保留了部分匹配)."""
+        raise NotImplementedError
+
+    async def on_write(self) -> None:
+        """generator 写操作提交后调用."""
+
+
+class ContainsSearchBackend(SearchBackend):
+    """各字段 icontains 取并集, 即 LIKE '%x%', 无法使用索引."""
+
+    async def filter(
+        self,
+        queryset: QuerySet,
+        search: str,
+    ) -> tuple[QuerySet, bool]:
+        q = Q(
+            *[
+                Q(**{f"{search_field}__icontains": search})
+                for search_field in self.search_fields
+            ],
+            join_type=Q.OR,
+        )
+        return queryset.filter(q), False
+
+
+class FullTextSearchBackend(ContainsSearchBackend):
+    """MySQL FULLTEXT(ngram) / Postgres tsvector 全文检索.
+
+    先按相关度取出最多 max_matches 个匹配的 id, 再与其他过滤条件组合.
+    匹配超过 max_matches 时总数只统计这部分, 响应中 total_capped 为 True.
+    索引由 `python manage.py db fulltext-migrate` 生成的迁移文件创建.
+    其他数据库 (如 SQLite) 退回 icontains 搜索.
+    """
+
+    max_matches: int
+
+    def __init__(self, max_matches: int = 10000) -> None:
+        self.max_matches = max_matches
+
+    def bind(self, generator: CURDGenerator) -> None:
+        super().bind(generator)
+        FULLTEXT_INDEXES[self.db_model._meta.db_table] = self.search_fields
+
+    @staticmethod
+    def index_name(table: str) -> str:
+        return f"ftx_{table}"
+
+    @classmethod
+    def migration_sql(
+        cls,
+        table: str,
+        fields: tuple[str, ...],
+        dialect: str,
+    ) -> tuple[str, str]:
+        """返回 (upgrade, downgrade) SQL."""
+        index_name = cls.index_name(table)
+        if dialect == "mysql":
+            columns = ", ".join(f"`{f}`" for f in fields)
+            return (
+                f"ALTER TABLE `{table}` ADD FULLTEXT INDEX `{index_name}` ({columns}) WITH PARSER ngram;",  # noqa
+                f"ALTER TABLE `{table}` DROP INDEX `{index_name}`;",
+            )
+        return (
+            f'CREATE INDEX "{index_name}" ON "{table}" USING GIN ({cls._tsvector(fields)});',  # noqa
+            f'DROP INDEX IF EXISTS "{index_name}";',
+        )
+
+    @staticmethod
+    def _tsvector(fields: tuple[str, ...]) -> str:
+        document = " || ' ' || ".join(f"coalesce(\"{f}\", '')" for f in fields)
+        return f"to_tsvector('simple', {document})"
+
+    async def filter(
+        self,
+        queryset: QuerySet,
+        search: str,
+    ) -> tuple[QuerySet, bool]:
+        connection = self.db_model._meta.db
+        dialect = connection.capabilities.dialect
+        if dialect not in ("mysql", "postgres"):
+            return await super().filter(queryset, search)
+        table = self.db_model._meta.db_table
+        pk = self.db_model._meta.db_pk_column
+        if dialect == "mysql":
+            columns = ", ".join(f"`{f}`" for f in self.search_fields)
+            match = f"MATCH({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+            sql = f"SELECT `{pk}` FROM `{table}` WHERE {match} ORDER BY {match} DESC LIMIT {int(self.max_matches)}"  # noqa
+            params = [search, search]
+        else:
+            query = "plainto_tsquery('simple', $1)"
+            vector = self._tsvector(self.search_fields)
+            sql = f'SELECT "{pk}" FROM "{table}" WHERE {vector} @@ {query} ORDER BY ts_rank({vector}, {query}) DESC LIMIT {int(self.max_matches)}'  # noqa
+            params = [search]
+        _, rows = await connection.execute_query(sql, params)
+        ids = [row[pk] for row in rows]
+        return queryset.filter(pk__in=ids), len(ids) >= self.max_matches
+
+
+class NgramSearchBackend(ContainsSearchBackend):
+    """进程内 n-gram 倒排索引, 适用于小表.
+
+    首次搜索时按主键分批加载全表的搜索字段建立索引; generator 写操作后版本号自增,
+    各 worker 在下一次搜索时重建, 两次重建至少间隔 rebuild_interval 秒, 期间
+    使用旧索引 (新写入的行可能搜索不到). 不经过 generator 的写入需自行调用
+    invalidate. 表的行数超过 max_rows 时不建立索引, 退回 icontains 搜索.
+    匹配超过 max_matches 时只保留主键最小的 max_matches 个, total_capped 为 True.
+    """
+
+    n: int
+    max_rows: int
+    batch_size: int
+    max_matches: int
+    rebuild_interval: float
+
+    def __init__(
+        self,
+        n: int = 2,
+        max_rows: int = 50000,
+        batch_size: int = 5000,
+        max_matches: int = 10000,
+        rebuild_interval: float = 30,
+    ) -> None:
+        assert n >= 1, "n must >= 1"
+        assert batch_size >= 1, "batch_size must >= 1"
+        self.n = n
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.max_matches = max_matches
+        self.rebuild_interval = rebuild_interval
+        self._version: int | None = None
+        self._built_at = 0.0
+        self._texts: dict[str, list[str]] | None = {}
+        self._index: dict[str, set[str]] = defaultdict(set)
+        self._lock = asyncio.Lock()
+
+    @property
+    def version_key(self) -> str:
+        return RedisCacheKey.SearchIndexVersionKey.format(
+            table=self.db_model._meta.db_table,
+        )
+
+    def ngrams(self, text: str) -> set[str]:
+        text = text.lower()
+        if len(text) <= self.n:
+            return {text} if text else set()
+        return {text[i : i + self.n] for i in range(len(text) - self.n + 1)}
+
+    async def _build(self) -> None:
+        table = self.db_model._meta.db_table
+        if await self.db_model.all().count() > self.max_rows:
+            logger.error(
+                f"NgramSearchBackend disabled for {table}: "
+                f"more than {self.max_rows} rows, using icontains",
+            )
+            self._texts, self._index = None, defaultdict(set)
+            return
+        pk_attr = self.db_model._meta.pk_attr
+        texts = {}
+        index = defaultdict(set)
+        last_pk = None
+        while True:
+            queryset = self.db_model.all()
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            rows = (
+                await queryset.order_by(pk_attr)
+                .limit(self.batch_size)
+                .values_list(pk_attr, *self.search_fields)
+            )
+            for row_pk, *values in rows:
+                pk = str(row_pk)
+                texts[pk] = [str(v).lower() for v in values if v is not None]
+                for value in texts[pk]:
+                    for gram in self.ngrams(value):
+                        index[gram].add(pk)
+            if len(rows) < self.batch_size:
+                break
+            last_pk = rows[-1][0]
+        self._texts, self._index = texts, index
+
+    def _fresh(self, version: int) -> bool:
+        if version == self._version:
+            return True
+        # 频繁写入时按间隔重建, 避免每次写入都全表加载
+        built = self._version is not None
+        return (
+            built and time.monotonic() - self._built_at < self.rebuild_interval
+        )
+
+    async def _ensure_index(self) -> None:
+        version = await get_cache_version(self.version_key)
+        if self._fresh(version):
+            return
+        async with self._lock:
+            if not self._fresh(version):
+                await self._build()
+                self._version = version
+                self._built_at = time.monotonic()
+
+    def search_ids(self, search: str) -> set[str]:
+        search = search.lower()
+        if len(search) < self.n:
+            candidates = self._texts.keys()
+        else:
+            postings = sorted(
+                (self._index.get(gram, set()) for gram in self.ngrams(search)),
+                key=len,
+            )
+            candidates = set.intersection(*postings) if postings else set()
+        # n-gram 交集可能误命中, 用原文校验
+        return {
+            pk
+            for pk in candidates
+            if any(search in value for value in self._texts[pk])
+        }
+
+    async def filter(
+        self,
+        queryset: QuerySet,
+        search: str,
+    ) -> tuple[QuerySet, bool]:
+        await self._ensure_index()
+        if self._texts is None:
+            return await super().filter(queryset, search)
+        ids = self.search_ids(search)
+        capped = len(ids) > self.max_matches
+        if capped:
+            ids = sorted(ids, key=self._pk_key)[: self.max_matches]
+        return queryset.filter(pk__in=list(ids)), capped
+
+    @staticmethod
+    def _pk_key(pk: str) -> tuple[int, int | str]:
+        # 索引中主键为字符串, 整数主键按数值排序
+        return (0, int(pk)) if pk.isdigit() else (1, pk)
+
+    async def invalidate(self) -> None:
+        await bump_cache_version(self.version_key)
+
+    async def on_write(self) -> None:
+        await self.invalidate()
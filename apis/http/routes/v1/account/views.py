@@ -8,6 +8,10 @@ from common.responses import Resp
 from apis.dependencies import api_permission_check
 from common.constant.tags import TagsEnum
 from common.constant.messages import ObjectNotExistMsgTemplate
+from storages.relational.curd.account import (
+    invalidate_account_snapshot,
+    invalidate_permission_cache,
+)
 from storages.relational.curd.resource import get_resource_tree
 from storages.relational.pydantic.role import (
     RoleList,
@@ -68,6 +72,7 @@ router.include_router(
         retrieve_schema=AccountDetail,
         search_fields=["username", "nickname"],
         tags=[TagsEnum.account],
+        invalidators=[invalidate_account_snapshot],
     ),
 )
 
@@ -81,6 +86,10 @@ router.include_router(
         retrieve_schema=RoleDetail,
         search_fields=["label"],
         tags=[TagsEnum.role],
+        invalidators=[
+            invalidate_permission_cache,
+            invalidate_account_snapshot,
+        ],
     ),
 )
 
@@ -107,6 +116,10 @@ router.include_router(
         retrieve_schema=PermissionDetail,
         search_fields=["label"],
         tags=[TagsEnum.permission],
+        invalidators=[
+            invalidate_permission_cache,
+            invalidate_account_snapshot,
+        ],
     ),
 )
 
@@ -124,6 +137,7 @@ router.include_router(
             "label",
         ],
         tags=[TagsEnum.resource],
+        invalidators=[invalidate_permission_cache],
     ),
 )
 
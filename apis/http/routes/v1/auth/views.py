@@ -5,10 +5,12 @@ from tortoise.exceptions import IntegrityError
 from tortoise.contrib.pydantic import pydantic_model_creator
 
 from common.utils import datetime_now
+from apis.http.curd import get_related_objects
 from common.encrypt import PasswordUtil
 from common.fastapi import RespSchemaAPIRouter
 from common.responses import Resp, SimpleSuccess
 from apis.dependencies import token_required
+from common.exceptions import ApiException
 from common.constant.messages import (
     ObjectNotExistMsgTemplate,
     UsernameOrPasswordErrorMsg,
@@ -100,12 +102,11 @@ async def logout() -> SimpleSuccess:
 async def register(register_in: AccountCreate) -> Resp[AccountDetail]:
     data = register_in.dict()
     role_ids = data.pop("roles")
-    roles = []
-    for role_id in role_ids:
-        role = await Role.get_or_none(id=role_id)
-        if not role:
-            return Resp.fail(ObjectNotExistMsgTemplate % "角色")
-        roles.append(role)
+    try:
+        roles = list((await get_related_objects(Role, role_ids)).values())
+    except ApiException as e:
+        # 与逐个查询时一样返回 Resp.fail, message 中列出全部缺失的角色 id
+        return Resp.fail(e.message)
     try:
         account = await Account.create(**data)
         await account.roles.add(*roles)
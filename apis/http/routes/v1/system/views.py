@@ -0,0 +1,39 @@
+from typing import Optional
+
+from fastapi import Query, Depends, APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from common.fastapi import RespSchemaAPIRouter
+from common.profiling import get_aggregator, collect_collapsed
+from apis.dependencies import api_permission_check
+
+router = APIRouter(
+    dependencies=[Depends(api_permission_check)],
+    route_class=RespSchemaAPIRouter,
+)
+
+
+@router.get(
+    "/profiling/stacks",
+    summary="采样剖析调用栈",
+    description=(
+        "持续采样汇总的 collapsed stack 文件, 可用 flamegraph.pl/speedscope 生成火焰图"
+    ),
+    response_class=PlainTextResponse,
+)
+async def profiling_stacks(
+    route: Optional[str] = Query(
+        default=None,
+        description="路由模板, 如 /v1/account/account/{pk}",
+    ),
+) -> PlainTextResponse:
+    # 当前进程的汇总在事件循环线程中复制, 读写文件放到线程池中执行
+    stacks = get_aggregator().snapshot()
+    content = await run_in_threadpool(collect_collapsed, route, stacks)
+    return PlainTextResponse(
+        content,
+        headers={
+            "Content-Disposition": 'attachment; filename="profile.folded"',
+        },
+    )
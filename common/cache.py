@@ -0,0 +1,109 @@
+import time
+from typing import Generic, TypeVar, Optional
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from conf.config import local_configs
+from storages.redis import AsyncRedisUtil
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class LRUCache(Generic[V]):
+    """进程内 LRU 缓存, 支持 TTL.
+
+    仅在单个 worker 的事件循环内使用, 不做线程同步.
+    """
+
+    maxsize: int
+    ttl: Optional[float]
+    hits: int
+    misses: int
+    _data: OrderedDict[Hashable, tuple[V, Optional[float]]]
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+    ) -> None:
+        assert maxsize > 0, "maxsize must be positive"
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def _lookup(self, key: Hashable) -> object:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return _MISSING
+        value, expired_at = item
+        if expired_at is not None and expired_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(
+        self,
+        key: Hashable,
+        value: V,
+        ttl: Optional[float] = None,
+    ) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expired_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expired_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+# 缓存版本号: 自增后, key 中带旧版本号的缓存自然失效
+_version_lru: LRUCache[int] = LRUCache(
+    maxsize=local_configs.CACHE.VERSION_LRU_SIZE,
+    ttl=local_configs.CACHE.VERSION_TTL,
+)
+
+
+async def get_cache_version(key: str) -> int:
+    version = _version_lru.get(key)
+    if version is None:
+        version = int(await AsyncRedisUtil.get(key, default=0))
+        _version_lru.set(key, version)
+    return version
+
+
+async def bump_cache_version(key: str) -> int:
+    version = int(await AsyncRedisUtil.incrby(key))
+    _version_lru.set(key, version)
+    return version
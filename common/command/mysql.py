@@ -1,10 +1,12 @@
 import shlex
+import pathlib
 import subprocess
 from functools import partial
 
 import typer
 
 from conf.config import local_configs
+from common.utils import datetime_now
 
 db_typer = typer.Typer(short_help="MySQL相关")
 
@@ -85,3 +87,44 @@ def db_history() -> None:
 @db_typer.command("downgrade", short_help="回退版本")
 def db_downgrade() -> None:
     shell("aerich downgrade")
+
+
+@db_typer.command("fulltext-migrate", short_help="生成全文索引迁移文件")
+def db_fulltext_migrations(
+    name: str = typer.Option(default="fulltext", help="迁移文件备注"),
+    app: str = typer.Option(default="master", help="aerich app"),
+) -> None:
+    """为使用 FullTextSearchBackend 的 CURDGenerator 声明的 search_fields 生成索引迁移."""
+    # 导入路由以注册全部 CURDGenerator
+    import apis.http.routes.v1  # noqa
+    from apis.http.curd.search import FULLTEXT_INDEXES, FullTextSearchBackend
+
+    if not FULLTEXT_INDEXES:
+        typer.echo("No FullTextSearchBackend declared")
+        return
+    upgrades, downgrades = [], []
+    for table, fields in sorted(FULLTEXT_INDEXES.items()):
+        upgrade, downgrade = FullTextSearchBackend.migration_sql(
+            table,
+            fields,
+            local_configs.RELATIONAL.TYPE,
+        )
+        upgrades.append(upgrade)
+        downgrades.append(downgrade)
+
+    location = pathlib.Path("storages/relational/migrate/versions") / app
+    version = len(list(location.glob("[0-9]*_*.py")))
+    filename = (
+        location
+        / f"{version}_{datetime_now().strftime('%Y%m%d%H%M%S')}_{name}.py"
+    )
+    upgrade_sql = "\n        ".join(upgrades)
+    downgrade_sql = "\n        ".join(downgrades)
+    filename.write_text(
+        "from tortoise import BaseDBAsyncClient\n\n\n"
+        "async def upgrade(db: BaseDBAsyncClient) -> str:\n"
+        f'    return """\n        {upgrade_sql}"""\n\n\n'
+        "async def downgrade(db: BaseDBAsyncClient) -> str:\n"
+        f'    return """\n        {downgrade_sql}"""\n',
+    )
+    typer.echo(f"Generated {filename}")
@@ -3,7 +3,6 @@ import uuid
 from typing import Any, Union, Optional
 from contextvars import ContextVar
 
-from loguru import logger
 from starlette.types import Message
 from starlette_context import context
 from starlette.requests import Request, HTTPConnection
@@ -17,6 +16,7 @@ from common.enums import (
     InfoLoggerNameEnum,
     ResponseHeaderKeyEnum,
 )
+from common.loguru import json_log
 
 request_id_var: ContextVar[str] = ContextVar(
     ContextKeyEnum.request_id.value,
@@ -108,7 +108,4 @@ class RequestProcessInfoPlugin(Plugin):
             data = context.get(ContextKeyEnum.response_data.value)
             info_dict["response_data"] = data
 
-        logger.bind(
-            name=InfoLoggerNameEnum.info_request_logger.value,
-            json=True,
-        ).info(info_dict)
+        json_log(info_dict, name=InfoLoggerNameEnum.info_request_logger.value)
@@ -58,3 +58,11 @@ class ContextKeyEnum(StrEnumMore):
     # custom
     response_code = ("response_code", "响应code")
     response_data = ("response_data", "响应数据")  #  只记录code != 0 的
+
+
+@unique
+class ExportFormatEnum(StrEnumMore):
+    """导出格式."""
+
+    ndjson = ("ndjson", "每行一个JSON对象")
+    csv = ("csv", "CSV")
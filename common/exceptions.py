@@ -1,12 +1,12 @@
 from typing import Optional
 
 import ujson
-from loguru import logger
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from starlette.requests import Request
 from starlette.exceptions import HTTPException
 
+from common.loguru import json_log
 from common.responses import AesResponse, ResponseCodeEnum
 from common.constant.messages import ValidationErrorMsgTemplates
 
@@ -71,7 +71,7 @@ async def validation_exception_handler(
     exc: RequestValidationError,
 ) -> AesResponse:
     """参数校验错误."""
-    logger.bind(json=True, name="validation_exception_handler").info(exc.body)
+    json_log(exc.body, name="validation_exception_handler")
     # try:
     #     error = exc.raw_errors[0]
     #     error_exc = error.exc
@@ -18,7 +18,9 @@ from fastapi.routing import (
     _prepare_response_content,
 )
 from pydantic.fields import Undefined, ModelField
+from starlette.types import Scope
 from fastapi.encoders import SetIntStr, DictIntStrAny
+from starlette.routing import Match
 from starlette.routing import Mount as Mount  # noqa
 from starlette.routing import BaseRoute
 from fastapi.exceptions import RequestValidationError
@@ -31,9 +33,22 @@ from fastapi.dependencies.utils import solve_dependencies
 from fastapi.dependencies.models import Dependant
 from sentry_sdk.integrations.redis import RedisIntegration
 
-from conf.config import LocalConfig
-from common.responses import Resp, PageResp, AesResponse
+from conf.config import LocalConfig, local_configs
+from common.responses import (
+    Resp,
+    PageResp,
+    AesResponse,
+    FastAesResponse,
+    MsgPackAesResponse,
+)
 from common.exceptions import setup_exception_handlers
+from common.serializer import FAST_SERIALIZE_ATTR, to_jsonable
+from common.negotiation import (
+    THREADPOOL_COMPRESS_MIN_SIZE,
+    accepts_msgpack,
+    select_encoding,
+    compress_response,
+)
 
 
 class AuthorizedRequest(Request):
@@ -217,9 +232,16 @@ class RespSchemaAPIRouter(APIRoute):
                 },
             )
 
+    def matches(self, scope: Scope) -> tuple[Match, Scope]:
+        match, child_scope = super().matches(scope)
+        if match != Match.NONE:
+            # 供 MetricsMiddleware 取路由模板
+            child_scope["route"] = self
+        return match, child_scope
+
     def get_route_handler(self) -> Callable:
         # 兼容 Resp instance 直接返回，避免重复校验响应体
-        # 也可以扩展 MsgPack
+        # AesResponse 按 Accept 协商 MsgPack, 按 Accept-Encoding 压缩较大的响应体
 
         def _get_request_handler(
             dependant: Dependant,
@@ -254,6 +276,23 @@ class RespSchemaAPIRouter(APIRoute):
                 actual_response_class: type[Response] = response_class.value
             else:
                 actual_response_class = response_class
+            fast_serialize = getattr(
+                dependant.call,
+                FAST_SERIALIZE_ATTR,
+                local_configs.PROJECT.FAST_SERIALIZE,
+            ) and not (
+                response_model_include
+                or response_model_exclude
+                or not response_model_by_alias
+                or response_model_exclude_unset
+                or response_model_exclude_defaults
+                or response_model_exclude_none
+            )
+            msgpack_negotiation = (
+                local_configs.PROJECT.MSGPACK_NEGOTIATION
+                and issubclass(actual_response_class, AesResponse)
+            )
+            compress_min_size = local_configs.PROJECT.COMPRESS_MIN_SIZE
 
             async def app(request: Request) -> Response:
                 request = AuthorizedRequest(request)
@@ -344,8 +383,16 @@ class RespSchemaAPIRouter(APIRoute):
                     response_args["status_code"] = current_status_code
                 if sub_response.status_code:
                     response_args["status_code"] = sub_response.status_code
+                response_cls = actual_response_class
                 if isinstance(raw_response, Response):
                     content = raw_response.body
+                elif fast_serialize and isinstance(raw_response, Resp):
+                    content = to_jsonable(
+                        raw_response,
+                        raw_response.Config.json_encoders,
+                    )
+                    if actual_response_class is AesResponse:
+                        response_cls = FastAesResponse
                 else:
                     content = await serialize_response(
                         field=response_field,
@@ -358,12 +405,37 @@ class RespSchemaAPIRouter(APIRoute):
                         exclude_none=response_model_exclude_none,
                         is_coroutine=is_coroutine,
                     )
-                response = actual_response_class(content, **response_args)
+                if msgpack_negotiation and accepts_msgpack(
+                    request.headers.get("accept"),
+                ):
+                    response_cls = MsgPackAesResponse
+                response = response_cls(content, **response_args)
+                if msgpack_negotiation:
+                    response.headers.add_vary_header("Accept")
                 if not is_body_allowed_for_status_code(
                     response.status_code,
                 ):
                     response.body = b""
                 response.headers.raw.extend(sub_response.headers.raw)
+                if (
+                    compress_min_size is not None
+                    and len(response.body) >= compress_min_size
+                    and "content-encoding" not in response.headers
+                ):
+                    encoding = select_encoding(
+                        request.headers.get("accept-encoding"),
+                    )
+                    if (
+                        encoding
+                        and len(response.body) >= THREADPOOL_COMPRESS_MIN_SIZE
+                    ):
+                        await run_in_threadpool(
+                            compress_response,
+                            response,
+                            encoding,
+                        )
+                    elif encoding:
+                        compress_response(response, encoding)
                 return response
 
             return app
@@ -0,0 +1,31 @@
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+# 每个 client 独享一个连接池, 单个合作方一个 client 时 max_connections 即其连接上限
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=30,
+)
+
+
+def stateless_cookies() -> httpx.Cookies:
+    """不保存响应 Set-Cookie, 避免长连接 client 在调用间共享 cookie."""
+    return httpx.Cookies(
+        CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    )
+
+
+def create_async_client(
+    limits: httpx.Limits = DEFAULT_LIMITS,
+    http2: bool = False,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """长连接 client, http2 需要安装 h2: pip install httpx[http2]."""
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=http2,
+        cookies=stateless_cookies(),
+        **kwargs,
+    )
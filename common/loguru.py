@@ -1,12 +1,18 @@
-import ast
+import os
 import sys
+import time
+import random
+import select
 import logging
+import threading
 import traceback
 from enum import Enum
 from types import FrameType
-from typing import cast
+from typing import Optional, cast
 from itertools import chain
+from collections import deque
 
+import ujson
 from loguru import logger
 from gunicorn import glogging
 from rich.console import Console
@@ -16,6 +22,7 @@ from common.types import Map, StrEnumMore
 
 # from common.responses import ResponseCodeEnum
 from common.decorators import extend_enum
+from extensions.cpp.eval import fast_literal_eval
 
 # from starlette.concurrency import iterate_in_threadpool
 
@@ -145,26 +152,57 @@ def setup_loguru_logging_intercept(
         # mod_logger.propagate = False
 
 
+PAYLOAD_KEY = "payload"
+
+
+def json_log(
+    payload: object,
+    level: str = "INFO",
+    depth: int = 0,
+    **extra: object,
+) -> None:
+    """结构化日志, payload 原样作为 message 输出, 不经过 str() 和 literal_eval.
+
+    json_log({"uri": "/"}, name="request")
+    """
+    logger.opt(depth=depth + 1).bind(
+        json=True,
+        **extra,
+        **{PAYLOAD_KEY: payload},
+    ).log(level, "")
+
+
 def serialize(record: dict) -> dict:
     """Serialize the JSON log."""
     log = {}
     name = record["name"]
+    extra = record["extra"]
     log["level"] = record["level"].name
     log["time"] = record["time"].strftime("%Y-%m-%d %H:%M:%S %Z %z")
     log["message"] = record["message"]
-    if record["extra"].get("json"):
-        # logger.bind(json=True).info()
-        # dict/list or python object string convert
-        log["message"] = ast.literal_eval(log["message"])
+    if PAYLOAD_KEY in extra:
+        log["message"] = extra[PAYLOAD_KEY]
+    elif extra.get("json"):
+        # 兼容 logger.bind(json=True).info(obj), 需要把 str(obj) 解析回来
+        log["message"] = fast_literal_eval(log["message"])
     location = name
     log["name"] = location
     if record["function"]:
         location = f'{location}:{record["function"]}'
     log["location"] = f'{location}:{record["line"]}'
-    log.update(record.get("extra", {}))
+    log.update((k, v) for k, v in extra.items() if k != PAYLOAD_KEY)
     return log
 
 
+def dumps(log: dict) -> str:
+    return ujson.dumps(
+        log,
+        ensure_ascii=False,
+        escape_forward_slashes=False,
+        default=str,
+    )
+
+
 def json_sink(message: Map) -> None:  # from loguru import Message
     serialized = serialize(message.record)
     if not serialized:
@@ -189,6 +227,144 @@ def json_sink(message: Map) -> None:  # from loguru import Message
         print(serialized)
 
 
+class BatchedJsonSink:
+    """有界队列 + 后台线程批量写入的 JSON 日志 sink.
+
+    调用线程只把 record 转为 dict 并入队, JSON 编码和写入在后台线程中完成.
+    队列超过高水位后, WARNING 以下的日志按 overflow 丢弃或按 sample_ratio 采样;
+    队列满时全部丢弃. 丢弃数量会在下一批写入时以一条 WARNING 日志输出.
+    每次写入不超过 PIPE_BUF 且按行切分, 多个 worker 共用 stdout 时不会交错.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        queue_size: int = 10000,
+        batch_size: int = 512,
+        flush_interval: float = 0.2,
+        high_watermark: float = 0.8,
+        overflow: str = "sample",
+        sample_ratio: float = 0.1,
+    ) -> None:
+        assert overflow in ("drop", "sample"), f"invalid overflow: {overflow}"
+        self.path = path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.high_watermark = int(queue_size * high_watermark)
+        self.overflow = overflow
+        self.sample_ratio = sample_ratio
+        self.dropped = 0
+        # write 与后台线程的 drain 都会修改 dropped
+        self._dropped_lock = threading.Lock()
+        self._pid: Optional[int] = None
+
+    def _start(self) -> None:
+        # fork 后子进程中没有后台线程, 需重新创建
+        self._pid = os.getpid()
+        self._queue: deque[dict] = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._fd: Optional[int] = None
+        if self.path:
+            self._fd = os.open(
+                self.path,
+                os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                0o644,
+            )
+        self._thread = threading.Thread(
+            target=self._run,
+            name="json-log-sink",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def write(self, message: Map) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        record = message.record
+        size = len(self._queue)
+        if (
+            size >= self.high_watermark
+            and record["level"].no < logging.WARNING
+            and (
+                self.overflow == "drop" or random.random() >= self.sample_ratio
+            )
+        ) or size >= self.queue_size:
+            with self._dropped_lock:
+                self.dropped += 1
+            return
+        self._queue.append(serialize(record))
+        if size + 1 >= self.batch_size:
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.drain()
+
+    def drain(self) -> None:
+        lines = []
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            lines.append(
+                dumps(
+                    {
+                        "level": LogLevelEnum.WARNING.label,
+                        "time": time.strftime("%Y-%m-%d %H:%M:%S %Z %z"),
+                        "message": f"{dropped} log records dropped",
+                        "name": __name__,
+                        "dropped": dropped,
+                    },
+                ),
+            )
+        while self._queue:
+            log = self._queue.popleft()
+            try:
+                lines.append(dumps(log))
+            except Exception as e:
+                lines.append(dumps({**log, "message": repr(log["message"])}))
+                sys.stderr.write(f"Serialize log failed: {repr(e)}\n")
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines: list[str]) -> None:
+        chunk: list[bytes] = []
+        chunk_size = 0
+        for line in lines:
+            data = f"{line}\n".encode()
+            if chunk and chunk_size + len(data) > select.PIPE_BUF:
+                self._write_bytes(b"".join(chunk))
+                chunk, chunk_size = [], 0
+            chunk.append(data)
+            chunk_size += len(data)
+        if chunk:
+            self._write_bytes(b"".join(chunk))
+
+    def _write_bytes(self, data: bytes) -> None:
+        if self._fd is None:
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
+            return
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view) :]
+
+    def stop(self) -> None:
+        """logger.remove() 及进程退出时调用, 写完队列中剩余的日志."""
+        if self._pid != os.getpid():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.drain()
+        if self._fd is not None:
+            os.close(self._fd)
+        self._pid = None
+
+
 class GunicornLogger(glogging.Logger):
     def __init__(self, cfg: any) -> None:
         super().__init__(cfg)
@@ -223,16 +399,34 @@ def init_loguru() -> None:
     #     backtrace=True,
     #     diagnose=True,
     # )
-    logger.add(
-        sink=json_sink,
-        format="{message}",  # 日志显示格式
-        level=LOG_LEVEL,  # 日志级别
-        enqueue=True,  # 默认是线程安全的，enqueue=True使得多进程安全
-        serialize=True,
-        backtrace=True,
-        diagnose=True,
-        colorize=True,
-    )
+    if EnvironmentEnum.development.value == local_configs.PROJECT.ENVIRONMENT:
+        logger.add(
+            sink=json_sink,
+            format="{message}",  # 日志显示格式
+            level=LOG_LEVEL,  # 日志级别
+            enqueue=True,  # 默认是线程安全的，enqueue=True使得多进程安全
+            backtrace=True,
+            diagnose=True,
+            colorize=True,
+        )
+    else:
+        # 自带队列和后台线程, 不再使用 enqueue (每条日志都要 pickle)
+        config = local_configs.LOGGING
+        logger.add(
+            sink=BatchedJsonSink(
+                path=config.FILE,
+                queue_size=config.QUEUE_SIZE,
+                batch_size=config.BATCH_SIZE,
+                flush_interval=config.FLUSH_INTERVAL,
+                high_watermark=config.HIGH_WATERMARK,
+                overflow=config.OVERFLOW,
+                sample_ratio=config.SAMPLE_RATIO,
+            ),
+            format="{message}",  # 日志显示格式
+            level=LOG_LEVEL,  # 日志级别
+            backtrace=True,
+            diagnose=True,
+        )
 
     UVICORN_LOGGING_MODULES = (
         LoggerNameEnum.root.value,
@@ -0,0 +1,323 @@
+"""进程内指标: 固定分桶直方图, 以 Prometheus 文本格式输出.
+
+配置 METRICS.MULTIPROCESS_DIR 时, 每个 worker 写自己的 mmap 文件
+metrics_<pid>.db, 输出时汇总目录下全部文件; worker 退出后其数据并入
+archive.db. 未配置时只统计当前进程.
+
+文件格式: 头部 8 字节为已使用的字节数, 之后依次为
+[key 长度 u32][值个数 u32][key, 补齐到 8 字节][float64 * 值个数].
+"""
+from __future__ import annotations
+
+import os
+import json
+import mmap
+import fcntl
+import struct
+from bisect import bisect_left
+from contextlib import contextmanager
+from collections.abc import Iterator, Sequence
+
+from conf.config import local_configs
+
+HEADER = struct.Struct("<Q")
+ENTRY_HEADER = struct.Struct("<II")
+INITIAL_SIZE = 64 * 1024
+ARCHIVE_FILE = "archive.db"
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+LOCK_FILE = ".lock"
+
+# 请求耗时分桶, 单位秒
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _padded(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+class MetricsStore:
+    """一个进程的指标值, 按 key 分配连续的 float64 槽位."""
+
+    path: str | None
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self._slots: dict[tuple, int] = {}
+        self._offsets: dict[str, int] = {}
+        if path:
+            # 文件与 mmap 在 store 的整个生命周期内保持打开, 由 close 关闭
+            self._file = open(path, "a+b")  # noqa: SIM115
+            size = max(os.fstat(self._file.fileno()).st_size, INITIAL_SIZE)
+            self._file.truncate(size)
+            self._buf = mmap.mmap(self._file.fileno(), size)
+        else:
+            self._file = None
+            self._buf = bytearray(INITIAL_SIZE)
+        self._used = HEADER.unpack_from(self._buf, 0)[0] or HEADER.size
+        HEADER.pack_into(self._buf, 0, self._used)
+        self._values = memoryview(self._buf).cast("d")
+        for key, offset, _ in self._scan(self._buf, self._used):
+            self._offsets[key] = offset
+
+    @staticmethod
+    def _scan(data: bytes, used: int) -> Iterator[tuple[str, int, int]]:
+        """遍历条目, 返回 (key, 值起始下标, 值个数)."""
+        pos = HEADER.size
+        while pos < used:
+            key_size, count = ENTRY_HEADER.unpack_from(data, pos)
+            pos += ENTRY_HEADER.size
+            key = bytes(data[pos : pos + key_size]).decode()
+            pos += _padded(key_size + ENTRY_HEADER.size) - ENTRY_HEADER.size
+            yield key, pos // 8, count
+            pos += count * 8
+
+    def _grow(self, size: int) -> None:
+        self._values.release()
+        if self._file is not None:
+            self._buf.close()
+            self._file.truncate(size)
+            self._buf = mmap.mmap(self._file.fileno(), size)
+        else:
+            buf = bytearray(size)
+            buf[: len(self._buf)] = self._buf
+            self._buf = buf
+        self._values = memoryview(self._buf).cast("d")
+
+    def _allocate(self, key: str, count: int) -> int:
+        encoded = key.encode()
+        head = _padded(ENTRY_HEADER.size + len(encoded))
+        size = head + count * 8
+        if self._used + size > len(self._buf):
+            self._grow(max(len(self._buf) * 2, self._used + size))
+        pos = self._used
+        ENTRY_HEADER.pack_into(self._buf, pos, len(encoded), count)
+        self._buf[
+            pos + ENTRY_HEADER.size : pos + ENTRY_HEADER.size + len(encoded)
+        ] = encoded
+        # 条目写完后再更新头部, 读取方不会看到半个条目
+        self._used += size
+        HEADER.pack_into(self._buf, 0, self._used)
+        return (pos + head) // 8
+
+    def slot(self, name: str, labelvalues: tuple, count: int) -> int:
+        """返回 (name, labelvalues) 的第一个槽位下标, 不存在时分配."""
+        cache_key = (name, labelvalues)
+        index = self._slots.get(cache_key)
+        if index is None:
+            key = json.dumps([name, labelvalues])
+            index = self._offsets.get(key)
+            if index is None:
+                index = self._offsets[key] = self._allocate(key, count)
+            self._slots[cache_key] = index
+        return index
+
+    def add(self, index: int, amount: float) -> None:
+        self._values[index] += amount
+
+    def entries(self) -> Iterator[tuple[str, list[float]]]:
+        for key, start, count in self._scan(self._buf, self._used):
+            yield key, list(self._values[start : start + count])
+
+    @classmethod
+    def read(cls, path: str) -> Iterator[tuple[str, list[float]]]:
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            return
+        used = min(HEADER.unpack_from(data, 0)[0], len(data))
+        values = memoryview(data[: used // 8 * 8]).cast("d")
+        for key, start, count in cls._scan(data, used):
+            yield key, list(values[start : start + count])
+
+    def close(self) -> None:
+        self._values.release()
+        if self._file is not None:
+            self._buf.close()
+            self._file.close()
+
+
+_store: MetricsStore | None = None
+_store_pid: int | None = None
+
+
+def multiprocess_dir() -> str | None:
+    return local_configs.METRICS.MULTIPROCESS_DIR
+
+
+def get_store() -> MetricsStore:
+    """当前进程的 store, fork 后在子进程中重新创建."""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        directory = multiprocess_dir()
+        path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"metrics_{pid}.db")
+        _store, _store_pid = MetricsStore(path), pid
+    return _store
+
+
+class Histogram:
+    """固定分桶直方图, 每个标签组合占 len(buckets) + 2 个槽位:
+    各桶计数 (非累计), +Inf 桶计数, 总和.
+    """
+
+    name: str
+    documentation: str
+    labelnames: tuple[str, ...]
+    buckets: tuple[float, ...]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        assert name not in REGISTRY, f"Duplicated metric: {name}"
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        REGISTRY[name] = self
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        store = get_store()
+        start = store.slot(self.name, labelvalues, len(self.buckets) + 2)
+        store.add(start + bisect_left(self.buckets, value), 1)
+        store.add(start + len(self.buckets) + 1, value)
+
+
+REGISTRY: dict[str, Histogram] = {}
+
+
+@contextmanager
+def _locked(directory: str, operation: int) -> Iterator[None]:
+    with open(os.path.join(directory, LOCK_FILE), "a") as f:
+        fcntl.flock(f, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def collect() -> dict[tuple[str, tuple], list[float]]:
+    """汇总全部 worker 的指标值."""
+    directory = multiprocess_dir()
+    if not directory:
+        entries = list(get_store().entries())
+    else:
+        get_store()
+        entries = []
+        with _locked(directory, fcntl.LOCK_SH):
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(".db"):
+                    path = os.path.join(directory, filename)
+                    entries.extend(MetricsStore.read(path))
+    result: dict[tuple[str, tuple], list[float]] = {}
+    for key, values in entries:
+        name, labelvalues = json.loads(key)
+        total = result.setdefault(
+            (name, tuple(labelvalues)),
+            [0.0] * len(values),
+        )
+        for i, value in enumerate(values):
+            total[i] += value
+    return result
+
+
+def _escape(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def generate_latest() -> str:
+    """Prometheus 文本格式 (version 0.0.4)."""
+    series: dict[str, list[tuple[tuple, list[float]]]] = {}
+    for (name, labelvalues), values in sorted(collect().items()):
+        series.setdefault(name, []).append((labelvalues, values))
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} histogram")
+        for labelvalues, values in series.get(name, []):
+            labels = _labels(metric.labelnames, labelvalues)
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0.0
+            for bound, count in zip(
+                [*map(_number, metric.buckets), "+Inf"],
+                values,
+            ):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{prefix}le="{bound}"}} '
+                    f"{_number(cumulative)}",
+                )
+            lines.append(f"{name}_sum{{{labels}}} {_number(values[-1])}")
+            lines.append(f"{name}_count{{{labels}}} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def mark_process_dead(pid: int) -> None:
+    """将已退出 worker 的数据并入 archive.db, 在 gunicorn child_exit 中调用."""
+    directory = multiprocess_dir()
+    if not directory:
+        return
+    path = os.path.join(directory, f"metrics_{pid}.db")
+    if not os.path.exists(path):
+        return
+    with _locked(directory, fcntl.LOCK_EX):
+        archive = MetricsStore(os.path.join(directory, ARCHIVE_FILE))
+        try:
+            for key, values in MetricsStore.read(path):
+                name, labelvalues = json.loads(key)
+                start = archive.slot(name, tuple(labelvalues), len(values))
+                for i, value in enumerate(values):
+                    archive.add(start + i, value)
+        finally:
+            archive.close()
+        os.remove(path)
+
+
+def clear_multiprocess_dir() -> None:
+    """服务启动前清理上一次运行留下的文件, 在 gunicorn on_starting 中调用."""
+    directory = multiprocess_dir()
+    if not directory or not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        if filename.endswith(".db"):
+            os.remove(os.path.join(directory, filename))
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP 请求耗时",
+    ("method", "route", "status", "code"),
+)
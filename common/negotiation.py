@@ -0,0 +1,105 @@
+"""响应内容协商: Accept 选择 JSON/MsgPack, Accept-Encoding 选择压缩算法.
+
+brotli/zstandard 为可选依赖, 未安装时不参与协商.
+"""
+from __future__ import annotations
+
+import gzip
+from typing import Callable
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+MEDIA_TYPE_JSON = "application/json"
+MEDIA_TYPE_MSGPACK = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MEDIA_TYPE_MSGPACK, "application/x-msgpack")
+
+# 动态响应优先考虑压缩速度
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# 不小于该字节数的响应体在线程池中压缩, 避免阻塞事件循环
+THREADPOOL_COMPRESS_MIN_SIZE = 64 * 1024
+
+# 按优先级排列, q 值相同时取靠前的
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(
+        data,
+        quality=BROTLI_QUALITY,
+    )
+COMPRESSORS["gzip"] = lambda data: gzip.compress(
+    data,
+    compresslevel=GZIP_LEVEL,
+)
+
+
+def parse_quality_values(header: str | None) -> dict[str, float]:
+    """解析 Accept/Accept-Encoding, 返回 {值: q}."""
+    result: dict[str, float] = {}
+    for part in (header or "").split(","):
+        value, _, params = part.partition(";")
+        value = value.strip().lower()
+        if not value:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, raw = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        result[value] = max(q, result.get(value, 0.0))
+    return result
+
+
+def accepts_msgpack(accept: str | None) -> bool:
+    """客户端对 msgpack 的偏好不低于 JSON 时返回 True.
+
+    未显式声明 application/json 时, JSON 的 q 取 application/* 或 */*.
+    """
+    qualities = parse_quality_values(accept)
+    msgpack_q = max(qualities.get(t, 0.0) for t in MSGPACK_MEDIA_TYPES)
+    if msgpack_q <= 0:
+        return False
+    if MEDIA_TYPE_JSON in qualities:
+        json_q = qualities[MEDIA_TYPE_JSON]
+    else:
+        json_q = max(
+            qualities.get("application/*", 0.0),
+            qualities.get("*/*", 0.0),
+        )
+    return msgpack_q >= json_q
+
+
+def select_encoding(accept_encoding: str | None) -> str | None:
+    """从已安装的压缩算法中选出 q 值最高的, 都不接受时返回 None."""
+    qualities = parse_quality_values(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in COMPRESSORS:
+        q = qualities.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_response(response: Response, encoding: str) -> None:
+    """原地压缩 response.body 并更新相关响应头."""
+    response.body = COMPRESSORS[encoding](response.body)
+    response.headers["content-length"] = str(len(response.body))
+    response.headers["content-encoding"] = encoding
+    response.headers.add_vary_header("Accept-Encoding")
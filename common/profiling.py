@@ -0,0 +1,197 @@
+"""持续低频采样的性能剖析, 按路由模板汇总为 collapsed stack 格式.
+
+输出可直接交给 flamegraph.pl / speedscope / inferno 生成火焰图, 每行为
+"路由模板;帧;帧;... 耗时(微秒)". 配置 PROFILING.SAMPLE_DIR 时各 worker
+定期把汇总写入 profile_<pid>.folded, 下载时合并全部文件.
+"""
+from __future__ import annotations
+
+import os
+import time
+import random
+import asyncio
+import threading
+from functools import lru_cache
+from collections import Counter
+
+from pyinstrument.session import Session
+
+from conf.config import BASE_DIR, local_configs
+
+TRUNCATED_FRAME = "[truncated]"
+FLUSH_INTERVAL = 10  # s
+
+
+def sample_rate(route: str) -> float:
+    """路由的采样比例, 未单独配置时使用 SAMPLE_RATE."""
+    config = local_configs.PROFILING
+    return config.ROUTE_SAMPLE_RATES.get(route, config.SAMPLE_RATE)
+
+
+def max_sample_rate() -> float:
+    """请求开始时尚不知道路由, 先按最大比例开启, 结束后再按路由比例取舍."""
+    config = local_configs.PROFILING
+    return max([config.SAMPLE_RATE, *config.ROUTE_SAMPLE_RATES.values()])
+
+
+def should_start() -> bool:
+    rate = max_sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def should_keep(route: str) -> bool:
+    return random.random() * max_sample_rate() < sample_rate(route)
+
+
+def _frame_name(identifier: str) -> str:
+    function, _, rest = identifier.partition("\x00")
+    path, _, rest = rest.partition("\x00")
+    line_no, *attributes = rest.split("\x01")
+    class_name = next((a[1:] for a in attributes if a[:1] == "c"), None)
+    path = (
+        os.path.relpath(path, BASE_DIR)
+        if path.startswith(str(BASE_DIR))
+        else "/".join(path.rsplit("/", 2)[-2:])
+    )
+    name = f"{class_name}.{function}" if class_name else function
+    # ";" 为 collapsed 格式的分隔符
+    return f"{name} ({path}:{line_no})".replace(";", ":")
+
+
+class StackAggregator:
+    """当前进程内按路由模板累计的调用栈耗时."""
+
+    max_stacks: int
+
+    def __init__(self, max_stacks: int) -> None:
+        self.max_stacks = max_stacks
+        self.stacks: Counter[str] = Counter()
+        self._names: dict[str, str] = {}
+        self._flushed_at = time.monotonic()
+        # 写文件在线程池中执行, 同一进程的写入需串行
+        self._write_lock = threading.Lock()
+
+    def _name(self, identifier: str) -> str:
+        name = self._names.get(identifier)
+        if name is None:
+            name = self._names[identifier] = _frame_name(identifier)
+        return name
+
+    def add(self, route: str, session: Session) -> None:
+        start_stack = session.start_call_stack
+        full = len(self.stacks) >= self.max_stacks
+        for call_stack, duration in session.frame_records:
+            # 去掉开启剖析之前的公共栈帧 (事件循环, 中间件)
+            skip = 0
+            for frame, start_frame in zip(call_stack, start_stack):
+                if frame.split("\x01")[0] != start_frame.split("\x01")[0]:
+                    break
+                skip += 1
+            frames = [route, *map(self._name, call_stack[skip:])]
+            stack = ";".join(frames)
+            if full and stack not in self.stacks:
+                stack = f"{route};{TRUNCATED_FRAME}"
+            self.stacks[stack] += max(int(duration * 1e6), 1)
+
+    def snapshot(self) -> Counter[str]:
+        """在事件循环线程中复制, 供其他线程读取."""
+        return Counter(self.stacks)
+
+    def flush_due(self) -> bool:
+        """距上次写入超过 FLUSH_INTERVAL 时返回 True, 并重新计时."""
+        now = time.monotonic()
+        if (
+            not local_configs.PROFILING.SAMPLE_DIR
+            or now - self._flushed_at < FLUSH_INTERVAL
+        ):
+            return False
+        self._flushed_at = now
+        return True
+
+    def write(self, stacks: Counter[str]) -> None:
+        directory = local_configs.PROFILING.SAMPLE_DIR
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"profile_{os.getpid()}.folded")
+        with self._write_lock:
+            # 先写临时文件再替换, 读取方不会读到半个文件
+            with open(f"{path}.tmp", "w") as f:
+                f.write(format_collapsed(stacks))
+            os.replace(f"{path}.tmp", path)
+
+
+@lru_cache(maxsize=1)
+def _aggregator_for(pid: int) -> StackAggregator:
+    return StackAggregator(local_configs.PROFILING.MAX_STACKS)
+
+
+def get_aggregator() -> StackAggregator:
+    """当前进程的汇总, fork 后在子进程中重新创建."""
+    return _aggregator_for(os.getpid())
+
+
+def record(route: str, session: Session) -> None:
+    """在事件循环中调用, 写文件放到线程池中执行."""
+    aggregator = get_aggregator()
+    aggregator.add(route, session)
+    if aggregator.flush_due():
+        asyncio.get_running_loop().run_in_executor(
+            None,
+            aggregator.write,
+            aggregator.snapshot(),
+        )
+
+
+def filter_route(stacks: Counter[str], route: str | None) -> Counter[str]:
+    if route is None:
+        return stacks
+    prefix = f"{route};"
+    return Counter({k: v for k, v in stacks.items() if k.startswith(prefix)})
+
+
+def format_collapsed(stacks: Counter[str]) -> str:
+    return "".join(
+        f"{stack} {weight}\n" for stack, weight in sorted(stacks.items())
+    )
+
+
+def read_collapsed(path: str) -> Counter[str]:
+    stacks: Counter[str] = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, weight = line.rstrip("\n").rpartition(" ")
+            if stack and weight.isdigit():
+                stacks[stack] += int(weight)
+    return stacks
+
+
+def clear_sample_dir() -> None:
+    """服务启动前清理上一次运行留下的文件, 在 gunicorn on_starting 中调用."""
+    directory = local_configs.PROFILING.SAMPLE_DIR
+    if not directory or not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        if filename.endswith((".folded", ".tmp")):
+            os.remove(os.path.join(directory, filename))
+
+
+def collect_collapsed(
+    route: str | None = None,
+    stacks: Counter[str] | None = None,
+) -> str:
+    """汇总全部 worker 的采样结果, 可只取单个路由模板.
+
+    在线程池中调用时, stacks 需为事件循环线程中 snapshot() 得到的当前进程汇总.
+    """
+    if stacks is None:
+        stacks = get_aggregator().snapshot()
+    directory = local_configs.PROFILING.SAMPLE_DIR
+    if not directory:
+        return format_collapsed(filter_route(stacks, route))
+    get_aggregator().write(stacks)
+    stacks = Counter()
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".folded"):
+            stacks.update(read_collapsed(os.path.join(directory, filename)))
+    return format_collapsed(filter_route(stacks, route))
@@ -1,11 +1,16 @@
 import inspect
-from typing import Callable
+from typing import Any, TypeVar, Callable
 from datetime import datetime
+from collections.abc import Hashable
 
 import pydantic
 
+from conf.config import local_configs
+from common.cache import LRUCache
 from common.utils import DATETIME_FORMAT_STRING, filter_dict
 
+ModelT = TypeVar("ModelT", bound=pydantic.BaseModel)
+
 
 def optional(*fields) -> Callable[[pydantic.BaseModel], pydantic.BaseModel]:
     """Decorator function used to modify a pydantic model's fields to all be optional.
@@ -37,9 +42,42 @@ class DateTimeFormatConfig:
     }
 
 
+# 派生模型缓存, 避免每次请求重复创建 pydantic 类
+derived_model_cache = LRUCache(
+    maxsize=local_configs.CACHE.DERIVED_MODEL_LRU_SIZE,
+)
+
+
+def get_derived_model(
+    key: Hashable,
+    factory: Callable[[], type[ModelT]],
+) -> type[ModelT]:
+    model = derived_model_cache.get(key)
+    if model is None:
+        model = factory()
+        derived_model_cache.set(key, model)
+    return model
+
+
+def derived_model_cache_stats() -> dict[str, Any]:
+    return derived_model_cache.stats
+
+
 def sub_fields_model(
     base_model: pydantic.BaseModel,
     fields: list[str],
+) -> pydantic.BaseModel:
+    # 只保留存在的字段, 任意的请求参数不会产生新的 key
+    fields = frozenset(f for f in fields if f in base_model.__fields__)
+    return get_derived_model(
+        ("sub_fields", base_model, fields),
+        lambda: _create_sub_fields_model(base_model, fields),
+    )
+
+
+def _create_sub_fields_model(
+    base_model: pydantic.BaseModel,
+    fields: frozenset[str],
 ) -> pydantic.BaseModel:
     class ToModel(base_model):
         pass
@@ -3,6 +3,7 @@ from typing import Generic, TypeVar, Optional
 from datetime import datetime
 from collections.abc import Sequence
 
+import msgpack
 from pydantic import Field, BaseModel
 from pydantic.generics import GenericModel
 from starlette_context import context
@@ -11,8 +12,10 @@ from starlette.responses import JSONResponse
 from common.enums import ResponseCodeEnum
 from common.utils import DATETIME_FORMAT_STRING, datetime_now
 from common.context import ContextKeyEnum
-from common.schemas import Pager
+from common.schemas import Pager, CURDCursorPager
 from common.pydantic import DateTimeFormatConfig
+from common.serializer import dumps
+from common.negotiation import MEDIA_TYPE_MSGPACK
 
 
 class AesResponse(JSONResponse):
@@ -51,9 +54,29 @@ class AesResponse(JSONResponse):
         content["trace_id"] = context.get(ContextKeyEnum.request_id.value)
         # if not get_settings().DEBUG:
         #     content = AESUtil(local_configs.AES.SECRET).encrypt_data(ujson.dumps(content))
+        return self.encode(content)
+
+    def encode(self, content: dict) -> bytes:
+        """编码已补全 response_time/trace_id 的响应体, 子类按格式覆盖."""
         return super().render(content)
 
 
+class FastAesResponse(AesResponse):
+    """content 已是 JSON 基本类型, 使用 ujson 编码."""
+
+    def encode(self, content: dict) -> bytes:
+        return dumps(content)
+
+
+class MsgPackAesResponse(AesResponse):
+    """与 AesResponse 结构相同, 以 MessagePack 编码, content 需为 JSON 基本类型."""
+
+    media_type = MEDIA_TYPE_MSGPACK
+
+    def encode(self, content: dict) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
 DataT = TypeVar("DataT")
 
 
@@ -100,12 +123,20 @@ class SimpleSuccess(Resp):
 
 
 class PageInfo(BaseModel):
-    """翻页相关信息."""
+    """翻页相关信息.
+
+    游标翻页时 page 为空; 不统计总数时 total_page/total_count 为空.
+    total_capped 为 True 时搜索只保留了部分匹配(如全文检索的 max_matches),
+    total_count 只统计这部分, 实际总数可能更多.
+    """
 
-    total_page: int
-    total_count: int
+    total_page: Optional[int] = None
+    total_count: Optional[int] = None
+    total_capped: bool = False
     size: int
-    page: int
+    page: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
 
 class PageResp(Resp, Generic[DataT]):
@@ -127,10 +158,24 @@ class PageResp(Resp, Generic[DataT]):
         )
 
 
-def generate_page_info(total_count: int, pager: Pager) -> PageInfo:
+def generate_page_info(
+    total_count: Optional[int],
+    pager: Pager,
+    next_cursor: Optional[str] = None,
+    prev_cursor: Optional[str] = None,
+    total_capped: bool = False,
+) -> PageInfo:
+    cursor_mode = isinstance(pager, CURDCursorPager)
     return PageInfo(
-        total_page=ceil(total_count / pager.limit),
+        total_page=(
+            ceil(total_count / pager.limit)
+            if total_count is not None
+            else None
+        ),
         total_count=total_count,
+        total_capped=total_capped,
         size=pager.limit,
-        page=pager.offset // pager.limit + 1,
+        page=None if cursor_mode else pager.offset // pager.limit + 1,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
     )
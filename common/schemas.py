@@ -12,3 +12,30 @@ class CURDPager(Pager):
     order_by: set[str] = set()
     search: Optional[str] = None
     selected_fields: Optional[set[str]] = None
+
+
+class CURDCursorPager(CURDPager):
+    # 游标翻页时 offset 不生效
+    cursor: Optional[str] = None
+
+
+class CURDExportPager(CURDCursorPager):
+    export_format: str = "ndjson"
+
+
+class BulkItemError(BaseModel):
+    index: int
+    message: str
+
+
+class BulkResult(BaseModel):
+    """批量写入结果, errors 中的 index 为请求列表中的下标."""
+
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    errors: list[BulkItemError] = []
+
+    def add_error(self, index: int, message: str) -> None:
+        self.failed += 1
+        self.errors.append(BulkItemError(index=index, message=message))
@@ -1,10 +1,31 @@
 import time
+from typing import Optional
 
 import httpx
 import ujson
 from loguru import logger
 
 from common.encrypt import SignAuth
+from common.http_client import create_async_client
+
+
+class _ClientHolder:
+    client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """延迟创建的长连接 client, 复用 TCP/TLS 连接."""
+    client = _ClientHolder.client
+    if client is None or client.is_closed:
+        client = _ClientHolder.client = create_async_client()
+    return client
+
+
+async def close_client() -> None:
+    client = _ClientHolder.client
+    if client is not None and not client.is_closed:
+        await client.aclose()
+    _ClientHolder.client = None
 
 
 async def request(
@@ -31,5 +52,4 @@ async def request(
     headers["x-sign"] = SignAuth(sign_key).generate_sign(sign_data_str)
     kwargs["headers"] = headers
 
-    async with httpx.AsyncClient() as client:
-        return await client.request(method=method, url=url, **kwargs)
+    return await get_client().request(method=method, url=url, **kwargs)
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, TypeVar, Callable
+from functools import partial
+from collections.abc import Hashable, Awaitable
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """合并相同 key 的并发调用, 同一时刻只执行一次, 其余调用共享结果(或异常)."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[T]],
+    ) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.calls += 1
+            # 任务归 SingleFlight 所有, 发起方被取消时其他等待方仍能拿到结果
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._done, key))
+        # shield: 某个等待方被取消时不影响任务和其他等待方
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 等待方都已取消时避免 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "inflight": len(self._inflight),
+        }
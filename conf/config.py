@@ -149,6 +149,61 @@ class Server(HostAndPort):
 class ProfilingConfig(BaseModel):
     SECRET: str
     INTERVAL: float = 0.001
+    # 持续采样: 按比例剖析请求, 按路由模板汇总调用栈, 0 表示关闭
+    SAMPLE_RATE: float = 0
+    # 按路由模板单独设置采样比例, 如 {"/v1/account/{pk}": 0.1}
+    ROUTE_SAMPLE_RATES: dict[str, float] = {}
+    SAMPLE_INTERVAL: float = 0.005  # s
+    # 多 worker 时各 worker 的汇总写入该目录, 下载时合并
+    SAMPLE_DIR: Optional[str] = None
+    # 每个进程最多保留的不同调用栈数, 超出的计入 [truncated]
+    MAX_STACKS: int = 20000
+
+    @property
+    def SAMPLING_ENABLED(self) -> bool:
+        return self.SAMPLE_RATE > 0 or any(
+            rate > 0 for rate in self.ROUTE_SAMPLE_RATES.values()
+        )
+
+
+class MetricsConfig(BaseModel):
+    ENABLED: bool = True
+    PATH: str = "/metrics"
+    # 多 worker 时各 worker 写入该目录下的 mmap 文件, /metrics 汇总输出
+    MULTIPROCESS_DIR: Optional[str] = None
+    # 设置后 /metrics 需携带 Authorization: Bearer <TOKEN>
+    # 为空时仅在 Development 环境挂载且不校验, 其他环境不挂载
+    TOKEN: Optional[str] = None
+
+
+class CacheConfig(BaseModel):
+    # 缓存版本号在进程内的缓存时间, 决定其他 worker 感知失效的最大延迟
+    VERSION_TTL: float = 1  # s
+    # 缓存版本号的进程内 LRU 容量, 每个开启列表总数缓存/搜索索引的表各占一个
+    VERSION_LRU_SIZE: int = 256
+    # 权限集合缓存: 进程内 LRU + redis hash
+    PERMISSION_LRU_SIZE: int = 4096
+    PERMISSION_TTL: int = 300  # s
+    # 账户快照缓存: token_required 不再查询数据库, 默认关闭
+    ACCOUNT_SNAPSHOT_ENABLED: bool = False
+    ACCOUNT_SNAPSHOT_LRU_SIZE: int = 4096
+    ACCOUNT_SNAPSHOT_TTL: int = 300  # s
+    # CURDGenerator 列表总数缓存的进程内 LRU 容量, TTL 由 count_cache_ttl 指定
+    COUNT_LRU_SIZE: int = 1024
+    # sub_fields_model/schema_factory 派生的 pydantic 模型缓存容量
+    DERIVED_MODEL_LRU_SIZE: int = 512
+
+
+class LoggingConfig(BaseModel):
+    # 非 development 环境使用批量写入的 JSON sink, FILE 为空时写 stdout
+    FILE: Optional[str] = None
+    QUEUE_SIZE: int = 10000
+    BATCH_SIZE: int = 512
+    FLUSH_INTERVAL: float = 0.2  # s
+    # 队列超过高水位后, WARNING 以下的日志按 OVERFLOW 策略处理
+    HIGH_WATERMARK: float = 0.8
+    OVERFLOW: Literal["drop", "sample"] = "sample"
+    SAMPLE_RATIO: float = 0.1
 
 
 class Project(BaseModel):
@@ -161,6 +216,13 @@ class Project(BaseModel):
     LOG_DIR: str = "logs/"
     SENTRY_DSN: Optional[str] = None
     SWAGGER_SERVERS: list[dict] = []
+    # Resp/PageResp 使用单次遍历 + ujson 序列化, 可按路由用 fast_serialize 覆盖
+    FAST_SERIALIZE: bool = False
+    # Accept 偏好 application/msgpack 时以 MessagePack 返回 AesResponse, 默认关闭
+    MSGPACK_NEGOTIATION: bool = False
+    # 响应体不小于该字节数时按 Accept-Encoding 压缩, None 表示不压缩(默认)
+    # 网关已压缩时保持关闭, 开启时建议 1024
+    COMPRESS_MIN_SIZE: Optional[int] = None
 
     @validator("ENVIRONMENT", allow_reuse=True)
     def check_if_environment_in(cls, v):  # noqa
@@ -225,6 +287,12 @@ class LocalConfig(BaseSettings):
 
     PROFILING: ProfilingConfig
 
+    CACHE: CacheConfig = CacheConfig()
+
+    METRICS: MetricsConfig = MetricsConfig()
+
+    LOGGING: LoggingConfig = LoggingConfig()
+
     RELATIONAL: Relational
 
     REDIS: Redis
@@ -1,20 +1,28 @@
+import hmac
 from contextlib import asynccontextmanager
 
 from loguru import logger
 from fastapi import FastAPI, APIRouter
 from tortoise import Tortoise
 from fastapi_cache import FastAPICache
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi_cache.backends.redis import RedisBackend
 
-from conf.config import LocalConfig, local_configs
-from common.loguru import init_loguru
+from third_apis import Third
+from conf.config import LocalConfig, EnvironmentEnum, local_configs
+from common.loguru import json_log, init_loguru
 from common.fastapi import RespSchemaAPIRouter, setup_sentry
+from common.metrics import CONTENT_TYPE_LATEST, generate_latest
 from storages.redis import AsyncRedisUtil, keys
 from common.responses import AesResponse
 from common.exceptions import setup_exception_handlers
 from common.constant.tags import TagsEnum
+from common.signed_request import close_client as close_signed_request_client
+from extensions.cpp.eval.literal_eval import native_available
 
 init_loguru()
 
@@ -86,9 +94,60 @@ def setup_static_app(main_app: FastAPI, current_settings: LocalConfig) -> None:
     )
 
 
+def setup_metrics_app(
+    main_app: FastAPI,
+    current_settings: LocalConfig,
+) -> None:
+    """Prometheus 指标输出
+    :param main_app:
+    :param current_settings:
+    :return:
+    """
+
+    path = current_settings.METRICS.PATH
+    token = current_settings.METRICS.TOKEN
+    if not token:
+        # 未设置 TOKEN 时只在开发环境暴露指标
+        if (
+            EnvironmentEnum.development.value
+            != current_settings.PROJECT.ENVIRONMENT
+        ):
+            logger.warning(
+                f"{path} is not mounted outside development "
+                "without METRICS.TOKEN",
+            )
+            return
+        logger.warning(
+            f"{path} is unauthenticated, "
+            "set METRICS.TOKEN to require a bearer token",
+        )
+
+    async def metrics(request: Request) -> PlainTextResponse:
+        if token and not hmac.compare_digest(
+            request.headers.get("Authorization", ""),
+            f"Bearer {token}",
+        ):
+            return PlainTextResponse(
+                "Unauthorized",
+                status_code=401,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        # 多 worker 时需读取全部 mmap 文件, 放到线程池中执行
+        content = await run_in_threadpool(generate_latest)
+        return PlainTextResponse(content, media_type=CONTENT_TYPE_LATEST)
+
+    main_app.add_route(
+        path,
+        metrics,
+        include_in_schema=False,
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> None:
     # 初始化及退出清理
+    # literal_eval 共享库首次使用时可能要编译, 在线程池中预热, 避免阻塞日志
+    await run_in_threadpool(native_available)
     # redis
     AsyncRedisUtil.init()
     # cache
@@ -102,6 +161,10 @@ async def lifespan(app: FastAPI) -> None:
 
     yield
 
+    # third api 连接池
+    await Third.close_all()
+    await close_signed_request_client()
+
     await Tortoise.close_connections()
     await FastAPICache.clear()
     await AsyncRedisUtil.close()
@@ -152,6 +215,8 @@ def create_app(current_settings: LocalConfig) -> FastAPI:
     # 挂载apps下的路由 以及 静态资源路由
     amount_apps(main_app)
     setup_static_app(main_app, current_settings)
+    if current_settings.METRICS.ENABLED:
+        setup_metrics_app(main_app, current_settings)
     # 初始化全局 middleware
     setup_middleware(main_app)
     # 初始化全局 error handling
@@ -163,7 +228,5 @@ def create_app(current_settings: LocalConfig) -> FastAPI:
     return main_app
 
 
-logger.bind(json=True).info(
-    {**local_configs.PROJECT.dict(), **local_configs.SERVER.dict()},
-)
+json_log({**local_configs.PROJECT.dict(), **local_configs.SERVER.dict()})
 app = create_app(current_settings=local_configs)
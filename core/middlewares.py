@@ -1,88 +1,208 @@
-from typing import Union
+import time
+from typing import Optional
+from collections.abc import Sequence
 
 from loguru import logger
 from pyinstrument import Profiler
+from starlette.types import Send, Scope, ASGIApp, Message, Receive
 from fastapi.responses import HTMLResponse
-from starlette_context import request_cycle_context
-from starlette.requests import Request, HTTPConnection
-from starlette.responses import Response
-from starlette.middleware.base import RequestResponseEndpoint
+from starlette_context import context, request_cycle_context
+from starlette.requests import HTTPConnection
 from starlette.middleware.cors import CORSMiddleware
 from starlette_context.plugins import Plugin
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from conf.config import local_configs
+from common.enums import ContextKeyEnum
 from common.context import (
     RequestIdPlugin,
     RequestProcessInfoPlugin,
     RequestStartTimestampPlugin,
 )
-from common.decorators import SingletonDecorator
-
-
-async def contex_middleware(
-    request: Request,
-    call_next: RequestResponseEndpoint,
-) -> Response:
-    @SingletonDecorator
-    class ContextMiddleware:
-        plugins: list[Plugin]
-
-        def __init__(self, plugins: list[Plugin]) -> None:
-            self.plugins = plugins
-
-        async def set_context(
-            self,
-            request: Union[Request, HTTPConnection],
-        ) -> dict:
-            return {
-                plugin.key: await plugin.process_request(request)
-                for plugin in self.plugins
-            }
-
-        async def enrich_response(self, response: Response) -> None:
-            for i in self.plugins:
-                await i.enrich_response(response)
-
-        async def __call__(
-            self,
-            request: Request,
-            call_next: RequestResponseEndpoint,
-        ) -> Response:
-            context = await self.set_context(request)
-            with request_cycle_context(context), logger.contextualize(
-                request_id=context.get(RequestIdPlugin.key),
-            ):
-                need_profile = request.query_params.get("profile", False)
-                secret = request.query_params.get("secret", "")
-                if need_profile and secret == local_configs.PROFILING.SECRET:
-                    profiler = Profiler(
-                        interval=local_configs.PROFILING.INTERVAL,
-                        async_mode="enabled",
-                    )
-                    profiler.start()
-                    await call_next(request)
-                    profiler.stop()
-                    return HTMLResponse(profiler.output_html())
-                response = await call_next(request)
-                await self.enrich_response(response)
-                return response
-
-    _context_middleware = ContextMiddleware(
-        plugins=[
+from common.metrics import REQUEST_DURATION
+from common.profiling import record, should_keep, should_start
+
+# 请求级 ?profile=1 剖析时写入 scope, 持续采样跳过该请求, 避免同时启动两个 Profiler
+PROFILING_SCOPE_KEY = "profiling"
+
+
+class ContextPureMiddleware:
+    """纯 ASGI 的上下文中间件.
+
+    每个请求只执行一次插件的 process_request, 在 http.response.start 时注入响应头;
+    不经过 BaseHTTPMiddleware, 没有额外的 task 切换, 也不缓冲流式响应.
+    """
+
+    plugins: Sequence[Plugin]
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        plugins: Optional[Sequence[Plugin]] = None,
+    ) -> None:
+        self.app = app
+        self.plugins = plugins or (
             RequestStartTimestampPlugin(),
             RequestIdPlugin(),
             RequestProcessInfoPlugin(),
-        ],
-    )
+        )
+
+    async def set_context(self, connection: HTTPConnection) -> dict:
+        return {
+            plugin.key: await plugin.process_request(connection)
+            for plugin in self.plugins
+        }
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        context = await self.set_context(connection)
+        with request_cycle_context(context), logger.contextualize(
+            request_id=context.get(RequestIdPlugin.key),
+        ):
+            need_profile = connection.query_params.get("profile", False)
+            secret = connection.query_params.get("secret", "")
+            if need_profile and secret == local_configs.PROFILING.SECRET:
+                await self.profile(scope, receive, send)
+                return
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    for plugin in self.plugins:
+                        await plugin.enrich_response(message)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+    async def profile(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """执行请求并以火焰图页面替代原响应."""
+
+        async def discard(message: Message) -> None:
+            ...
+
+        profiler = Profiler(
+            interval=local_configs.PROFILING.INTERVAL,
+            async_mode="enabled",
+        )
+        profiler.start()
+        await self.app({**scope, PROFILING_SCOPE_KEY: True}, receive, discard)
+        profiler.stop()
+        await HTMLResponse(profiler.output_html())(scope, receive, send)
+
+
+def route_template(scope: Scope, root_path: str) -> str:
+    """路由模板, 如 /user/account/{pk}; 未匹配到 APIRoute 时为挂载前缀 + /*."""
+    prefix = scope.get("root_path", "")[len(root_path) :]
+    route = scope.get("route")
+    return prefix + (route.path_format if route else "/*")
+
+
+class MetricsMiddleware:
+    """按路由模板、HTTP 状态码、业务响应码统计请求耗时.
+
+    需位于 ContextPureMiddleware 之内, 以读取 AesResponse 写入上下文的响应码.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            code = (
+                context.get(ContextKeyEnum.response_code.value)
+                if context.exists()
+                else None
+            )
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route_template(scope, root_path),
+                str(status_code),
+                "" if code is None else str(code),
+            )
+
+
+class SamplingProfilerMiddleware:
+    """按 PROFILING.SAMPLE_RATE / ROUTE_SAMPLE_RATES 持续采样剖析.
+
+    不改变响应; 调用栈按路由模板汇总, 通过 /v1/system/profiling/stacks 下载.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        if (
+            scope["type"] != "http"
+            or scope.get(PROFILING_SCOPE_KEY)
+            or not should_start()
+        ):
+            await self.app(scope, receive, send)
+            return
 
-    return await _context_middleware(request, call_next)
+        root_path = scope.get("root_path", "")
+        profiler = Profiler(
+            interval=local_configs.PROFILING.SAMPLE_INTERVAL,
+            async_mode="enabled",
+        )
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session = profiler.stop()
+            route = route_template(scope, root_path)
+            if should_keep(route):
+                record(route, session)
 
 
 roster = [
-    # >>>>> Middleware Func
-    contex_middleware,
     # >>>>> Middleware Class
+    [ContextPureMiddleware, {}],
+    *([[MetricsMiddleware, {}]] if local_configs.METRICS.ENABLED else []),
+    *(
+        [[SamplingProfilerMiddleware, {}]]
+        if local_configs.PROFILING.SAMPLING_ENABLED
+        else []
+    ),
     [
         CORSMiddleware,
         {
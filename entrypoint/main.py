@@ -10,6 +10,9 @@ import gunicorn.app.base  # noqa
 from aerich import Command  # noqa
 
 from conf.config import local_configs  # noqa
+from common.metrics import mark_process_dead, clear_multiprocess_dir  # noqa
+from common.profiling import clear_sample_dir  # noqa
+from extensions.cpp.eval.literal_eval import native_available  # noqa
 
 """FastAPI"""
 
@@ -59,6 +62,19 @@ def post_fork(server: any, worker: any) -> None:
     pass
 
 
+def on_starting(server: any) -> None:
+    # 清理上一次运行留下的指标、采样文件
+    clear_multiprocess_dir()
+    clear_sample_dir()
+    # 在 master 中编译/加载 literal_eval 共享库, worker fork 后直接复用
+    native_available()
+
+
+def child_exit(server: any, worker: any) -> None:
+    # worker 退出 (含 max_requests 重启) 后, 将其指标并入 archive
+    mark_process_dead(worker.pid)
+
+
 async def run_migrations() -> None:
     command = Command(
         tortoise_config=local_configs.RELATIONAL.tortoise_orm_config,
@@ -93,6 +109,8 @@ if __name__ == "__main__":
         "graceful_timeout": 120,
         "timeout": 180,
         "logger_class": "common.loguru.GunicornLogger",
+        "on_starting": on_starting,
+        "child_exit": child_exit,
         # "config": "entrypoint.gunicorn_conf.py",
         # "post_fork": "entrypoint.main.post_fork",
     }
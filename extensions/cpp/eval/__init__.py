@@ -1 +1,8 @@
-from extensions.cpp.eval.literal_eval import py_to_pickle  # noqa
+from extensions.cpp.eval.literal_eval import (  # noqa
+    py_to_pickle,
+    fast_literal_eval,
+    iter_literal_list,
+    iter_pickled_list,
+    py_to_pickle_many,
+    py_to_pickle_ranges,
+)
@@ -0,0 +1,177 @@
+"""首次使用时编译共享库, 按源码, 编译器与编译参数的哈希缓存.
+
+缓存目录默认为本目录下的 build/, 不可写时使用系统临时目录, 可由环境变量
+LITERAL_EVAL_BUILD_DIR 指定. 编译产物先跑一遍 literal_eval_test 的用例,
+通过后才放入缓存. 没有编译器或编译失败时退回预编译的 libliteraleval.so,
+都没有时返回 None, 由调用方退回 ast.literal_eval.
+"""
+import os
+import sys
+import fcntl
+import shutil
+import hashlib
+import logging
+import platform
+import tempfile
+import subprocess
+from typing import Optional
+from pathlib import Path
+
+from extensions.cpp.eval.base import BASE_DIR
+
+# 应用中标准库 logging 会转发给 loguru, 单独运行脚本时不依赖 loguru
+logger = logging.getLogger(__name__)
+
+SOURCE = BASE_DIR / "literal_eval.cpp"
+PREBUILT = BASE_DIR / "libliteraleval.so"
+PROJECT_DIR = BASE_DIR.parents[2]
+
+# 指定共享库路径时跳过编译, 校验编译产物时也通过它传给子进程
+LIB_ENV = "LITERAL_EVAL_LIB"
+BUILD_DIR_ENV = "LITERAL_EVAL_BUILD_DIR"
+MARCH_ENV = "LITERAL_EVAL_MARCH"
+
+CXXFLAGS = ["-std=c++11", "-O3", "-DLIB", "-shared", "-fPIC"]
+COMPILE_TIMEOUT = 120  # s
+VERIFY_TIMEOUT = 60  # s
+
+
+def find_compiler() -> Optional[str]:
+    for name in (os.environ.get("CXX"), "c++", "g++", "clang++"):
+        path = name and shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def build_dir() -> Optional[Path]:
+    configured = os.environ.get(BUILD_DIR_ENV)
+    if configured:
+        candidates = [Path(configured)]
+    else:
+        # 镜像中的源码目录可能只读
+        candidates = [
+            BASE_DIR / "build",
+            Path(tempfile.gettempdir()) / "literal_eval",
+        ]
+    for directory in candidates:
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(directory, os.W_OK):
+            return directory
+    return None
+
+
+def _cpu_flags() -> str:
+    """-march=native 的产物只能在指令集相同的 CPU 上运行."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith(("flags", "Features")):
+                    return line.strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def cache_key(compiler: str, flags: list[str]) -> str:
+    version = subprocess.run(
+        [compiler, "--version"],
+        capture_output=True,
+        check=True,
+        timeout=COMPILE_TIMEOUT,
+    ).stdout
+    parts = [SOURCE.read_bytes(), compiler.encode(), version]
+    parts += [" ".join(flags).encode(), platform.machine().encode()]
+    if "-march=native" in flags:
+        parts.append(_cpu_flags().encode())
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _flag_sets() -> list[list[str]]:
+    march = os.environ.get(MARCH_ENV, "native")
+    if not march:
+        return [CXXFLAGS]
+    # 部分编译器/平台不支持 -march, 失败时不带该参数再编译一次
+    return [[*CXXFLAGS, f"-march={march}"], CXXFLAGS]
+
+
+def verify(path: Path) -> None:
+    """在子进程中跑 literal_eval_test, 有问题的产物不会影响当前进程."""
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "extensions.cpp.eval.literal_eval_test",
+            "--fast",
+            "--native-only",
+        ],
+        cwd=PROJECT_DIR,
+        env={**os.environ, LIB_ENV: str(path)},
+        capture_output=True,
+        check=True,
+        timeout=VERIFY_TIMEOUT,
+    )
+
+
+def build(compiler: str, flags: list[str], directory: Path) -> Path:
+    target = directory / f"libliteraleval-{cache_key(compiler, flags)}.so"
+    if target.exists():
+        return target
+    with open(directory / ".lock", "w") as lock:
+        # 多个 worker 同时首次使用时只编译一次
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if target.exists():
+            return target
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            subprocess.run(
+                [compiler, *flags, str(SOURCE), "-o", str(tmp)],
+                capture_output=True,
+                check=True,
+                timeout=COMPILE_TIMEOUT,
+            )
+            verify(tmp)
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+    logger.info("literal_eval: built %s with %s", target.name, " ".join(flags))
+    return target
+
+
+def _prebuilt(reason: str) -> Optional[str]:
+    if PREBUILT.exists():
+        logger.warning("literal_eval: %s, using %s", reason, PREBUILT)
+        return str(PREBUILT)
+    logger.warning("literal_eval: %s, using ast.literal_eval", reason)
+    return None
+
+
+def ensure_lib() -> Optional[str]:
+    """返回可用的共享库路径, 需要时先编译."""
+    configured = os.environ.get(LIB_ENV)
+    if configured:
+        return configured
+    compiler = find_compiler()
+    if compiler is None:
+        return _prebuilt("no C++ compiler found")
+    directory = build_dir()
+    if directory is None:
+        return _prebuilt("no writable build directory")
+    error = ""
+    for flags in _flag_sets():
+        try:
+            return str(build(compiler, flags, directory))
+        except subprocess.CalledProcessError as exc:
+            output = (exc.stderr or b"").decode(errors="replace").strip()
+            error = output.splitlines()[-1] if output else str(exc)
+        except (OSError, subprocess.SubprocessError) as exc:
+            error = str(exc)
+    return _prebuilt(f"build failed ({error})")
@@ -5,6 +5,7 @@
 // python3 -c "import pickle; pickle.load(open('demo.pkl', 'rb'))"
 
 #include <assert.h>
+#include <errno.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
@@ -93,29 +94,29 @@ enum opcode {
   READONLY_BUFFER = '\x98'
 };
 
-static void _PyFloat_Pack8(double x, unsigned char *p, int le) {
-  typedef enum {
-    unset,
-    ieee_big_endian_format,
-    ieee_little_endian_format
-  } float_format_type;
-  static float_format_type double_format = unset;
+typedef enum {
+  unset,
+  ieee_big_endian_format,
+  ieee_little_endian_format
+} float_format_type;
 
+static float_format_type _detect_double_format() {
 #if __SIZEOF_DOUBLE__ == 8
-  if (double_format == unset) {
-    double x = 9006104071832581.0;
-    if (memcmp(&x, "\x43\x3f\xff\x01\x02\x03\x04\x05", 8) == 0)
-      double_format = ieee_big_endian_format;
-    else if (memcmp(&x, "\x05\x04\x03\x02\x01\xff\x3f\x43", 8) == 0)
-      double_format = ieee_little_endian_format;
-    else {
-      fprintf(stderr, "invalid double format");
-      abort();
-    }
-  }
+  double x = 9006104071832581.0;
+  if (memcmp(&x, "\x43\x3f\xff\x01\x02\x03\x04\x05", 8) == 0)
+    return ieee_big_endian_format;
+  else if (memcmp(&x, "\x05\x04\x03\x02\x01\xff\x3f\x43", 8) == 0)
+    return ieee_little_endian_format;
+  fprintf(stderr, "invalid double format");
+  abort();
 #else
 #error invalid __SIZEOF_DOUBLE__
 #endif
+}
+
+static void _PyFloat_Pack8(double x, unsigned char *p, int le) {
+  // initialized once, thread-safe since C++11 (batch calls run in threads)
+  static const float_format_type double_format = _detect_double_format();
 
   const unsigned char *s = (unsigned char *)&x;
   int i, incr = 1;
@@ -212,13 +213,17 @@ struct MemReader : Reader {
   const char *data;
   size_t size;
   size_t p;
+  bool hit_eof; // input might continue in the next chunk
 
-  MemReader(const char *data_, size_t size_) : data(data_), size(size_), p(0) {}
+  MemReader(const char *data_, size_t size_)
+      : data(data_), size(size_), p(0), hit_eof(false) {}
   virtual bool valid() { return true; }
   virtual size_t pos() { return p; }
   virtual int read_next_char() {
-    if (p >= size)
+    if (p >= size) {
+      hit_eof = true;
       return EOF;
+    }
     unsigned char c = (unsigned char)data[p];
     ++p;
     return c;
@@ -268,39 +273,46 @@ struct MemWriter : Writer {
   char *data;
   size_t size;
   size_t p;
+  size_t end; // total output length, also counted after overflowing
   bool got_error;
 
   MemWriter(char *data_, size_t size_)
-      : data(data_), size(size_), p(0), got_error(false) {}
+      : data(data_), size(size_), p(0), end(0), got_error(false) {}
   virtual bool valid() { return true; }
   virtual size_t pos() { return p; }
   virtual void seek(size_t pos) { p = pos; }
   virtual void write_char(char c) {
-    if (p >= size) {
-      _overflow_error(1);
-      return;
-    }
-    data[p] = c;
-    ++p;
+    if (p >= size)
+      got_error = true;
+    else
+      data[p] = c;
+    _advance(1);
   }
   virtual void write_data(const char *data_, size_t len_) {
-    if (p + len_ > size) {
-      _overflow_error(len_);
-      return;
-    }
-    memcpy(data + p, data_, len_);
-    p += len_;
+    if (p + len_ > size)
+      got_error = true;
+    else
+      memcpy(data + p, data_, len_);
+    _advance(len_);
   }
 
-  void _overflow_error(size_t more) {
-    fprintf(
-        stderr,
-        "MemWriter, overflowing to the buffer (pos %li, size %li, add %li)\n",
-        p, size, more);
-    got_error = true;
+  // overflowing keeps counting, so the caller can retry with exact size
+  void _advance(size_t len_) {
+    p += len_;
+    if (p > end)
+      end = p;
   }
 };
 
+// return codes of the library
+enum {
+  ITEM_OK = 0,
+  PARSE_ERROR = 1,
+  OUT_TOO_SMALL = 2,
+  LIST_END = 3,
+  NEED_MORE = 4
+};
+
 typedef std::pair<int, bool> ParseRes; // next char + parsed one item or not
 
 class Parser {
@@ -314,8 +326,11 @@ public:
 
 private:
   void parse_error(const char *ctx, char c) {
+#ifndef LIB
+    // the library reports errors by return code only
     fprintf(stderr, "parse error: %s: char '%c' in pos %li\n", ctx, c,
             reader->pos());
+#endif
     got_error = true;
   }
 
@@ -329,13 +344,48 @@ public:
   void full_pass() {
     start();
     ParseRes res = parse();
-    if (!res.second) {
+    // res.first is EOF unless there is trailing data after the item
+    if (!res.second || res.first >= 0) {
       parse_error("root", res.first);
       return;
     }
     end();
   }
 
+  // One item of a top-level list whose '[' is already consumed, written
+  // as a complete pickle. *consumed is the input belonging to this step.
+  int list_item_pass(size_t *consumed) {
+    start();
+    ParseRes res = parse();
+    int c = res.first;
+    if (got_error)
+      return PARSE_ERROR;
+    if (!res.second) {
+      if (c != ']') {
+        parse_error("list item", c);
+        return PARSE_ERROR;
+      }
+      // only whitespace may follow the closing ']'
+      while ((c = read_next_char()) >= 0)
+        if (!isspace(c)) {
+          parse_error("after list", c);
+          return PARSE_ERROR;
+        }
+      *consumed = reader->pos();
+      return LIST_END;
+    }
+    if (c == ',')
+      *consumed = reader->pos();
+    else if (c == ']')
+      *consumed = reader->pos() - 1; // seen again by the next call
+    else {
+      parse_error("list", c);
+      return PARSE_ERROR;
+    }
+    end();
+    return ITEM_OK;
+  }
+
   void start() {
     write_char(PROTO);
     write_char(protocol);
@@ -348,7 +398,10 @@ public:
     while (true) {
       ParseRes res = parse();
       int c = res.first;
-      if (c == ',')
+      if (c == ',' && !res.second) {
+        parse_error("list, separator without item", c);
+        return;
+      } else if (c == ',')
         continue;
       else if (c == ']')
         break;
@@ -385,6 +438,10 @@ public:
       c = res.first;
       if (res.second)
         ++count;
+      else if (c == ',' || c == ':') {
+        parse_error("dict|set, separator without item", c);
+        return;
+      }
       if (c == ',') {
         if (count == 1) {
           make_set();
@@ -408,7 +465,8 @@ public:
         }
         cur = Value;
       } else if (c == '}') {
-        if (count == 1) {
+        // {1} is a set, {1:} is an error left to the count check
+        if (count == 1 && cur == Key) {
           make_set();
           if (got_error)
             return;
@@ -445,6 +503,11 @@ public:
       if (escape_mode == Direct) {
         if (c == quote)
           break;
+        // an unescaped newline ends a single-quoted string literal
+        if (c == '\n' || c == '\r') {
+          parse_error("str, got newline", c);
+          return;
+        }
         if (c == '\\')
           escape_mode = EscapeInit;
         else
@@ -474,9 +537,13 @@ public:
             c_ = '\t';
           else if (c == 'n')
             c_ = '\n';
-          else if (c == '\\' || c == '"' || c == '\'' || c == '\n')
+          else if (c == '\\' || c == '"' || c == '\'')
             c_ = char(c);
-          else {
+          else if (c == '\n') {
+            // backslash-newline is a line continuation, produces nothing
+            escape_mode = Direct;
+            continue;
+          } else {
             parse_error("str escaped", c);
             return;
           }
@@ -532,7 +599,7 @@ public:
   int parse_num(char first) {
     int c;
     std::string buf;
-    bool is_float = false;
+    bool is_float = first == '.';
     buf.push_back(first);
 
     while (true) {
@@ -540,38 +607,62 @@ public:
       if (c < 0)
         break;
 
-      if ((c >= '0' && c <= '9') || c == '+' || c == '-' || c == '.') {
-        if (c == '.')
+      if ((c >= '0' && c <= '9') || c == '+' || c == '-' || c == '.' ||
+          c == 'e' || c == 'E') {
+        if (c == '.' || c == 'e' || c == 'E')
           is_float = true;
         buf.push_back(c);
       } else
         break;
     }
 
+    // no exceptions here, they cannot cross the C interface of the library
+    const char *start = buf.c_str();
+    char *end;
+    errno = 0;
     if (is_float) {
-      double val = std::stod(buf);
+      double val = strtod(start, &end);
+      if (end != start + buf.size() || errno == ERANGE) {
+        parse_error("float", first);
+        return c;
+      }
       char pdata[9];
       pdata[0] = BINFLOAT;
       _PyFloat_Pack8(val, (unsigned char *)&pdata[1], 0);
       write_data(pdata, sizeof(pdata));
     } else {
+      long long val = strtoll(start, &end, 10);
+      const char *digits = start + (*start == '+' || *start == '-');
+      if (end != start + buf.size() || errno == ERANGE ||
+          (digits[0] == '0' && digits[1] != '\0')) {
+        // out of range ints and leading zeros are left to the caller
+        parse_error("int", first);
+        return c;
+      }
       int len;
-      long val = std::stol(buf);
-      char pdata[8];
-      pdata[1] = (unsigned char)(val & 0xff);
-      pdata[2] = (unsigned char)((val >> 8) & 0xff);
-      pdata[3] = (unsigned char)((val >> 16) & 0xff);
-      pdata[4] = (unsigned char)((val >> 24) & 0xff);
-
-      if ((pdata[4] != 0) || (pdata[3] != 0)) {
-        pdata[0] = BININT;
-        len = 5;
-      } else if (pdata[2] != 0) {
-        pdata[0] = BININT2;
-        len = 3;
+      char pdata[10];
+      if (val < -2147483648LL || val > 2147483647LL) {
+        pdata[0] = LONG1;
+        pdata[1] = 8;
+        for (int i = 0; i < 8; ++i)
+          pdata[2 + i] = (unsigned char)((val >> (8 * i)) & 0xff);
+        len = 10;
       } else {
-        pdata[0] = BININT1;
-        len = 2;
+        pdata[1] = (unsigned char)(val & 0xff);
+        pdata[2] = (unsigned char)((val >> 8) & 0xff);
+        pdata[3] = (unsigned char)((val >> 16) & 0xff);
+        pdata[4] = (unsigned char)((val >> 24) & 0xff);
+
+        if ((pdata[4] != 0) || (pdata[3] != 0)) {
+          pdata[0] = BININT;
+          len = 5;
+        } else if (pdata[2] != 0) {
+          pdata[0] = BININT2;
+          len = 3;
+        } else {
+          pdata[0] = BININT1;
+          len = 2;
+        }
       }
       write_data(pdata, len);
     }
@@ -587,6 +678,16 @@ public:
     write_char(NONE);
   }
 
+  void parse_bool(char first) {
+    const char *rest = first == 'T' ? "rue" : "alse";
+    for (; *rest; ++rest)
+      if (*rest != read_next_char()) {
+        parse_error("expected True or False", first);
+        return;
+      }
+    write_char(first == 'T' ? NEWTRUE : NEWFALSE);
+  }
+
   ParseRes parse() {
     int c;
     bool had_one_item = false;
@@ -620,6 +721,9 @@ public:
       } else if (c == 'N') {
         parse_none(c);
         had_one_item = true;
+      } else if (c == 'T' || c == 'F') {
+        parse_bool(c);
+        had_one_item = true;
       } else
         // some unexpected char
         break;
@@ -630,17 +734,88 @@ public:
 };
 
 #ifdef LIB
-extern "C" int py_to_pickle(const char *in, size_t in_len, char *out,
-                            size_t out_len) {
+// *written is set to the full output length for ITEM_OK and OUT_TOO_SMALL
+extern "C" int py_to_pickle_ex(const char *in, size_t in_len, char *out,
+                               size_t out_len, size_t *written) {
   MemReader reader(in, in_len);
   MemWriter writer(out, out_len);
   Parser parser(&reader, &writer);
-  parser.full_pass();
+  try {
+    parser.full_pass();
+  } catch (...) {
+    // e.g. std::bad_alloc, must not unwind into the caller
+    return PARSE_ERROR;
+  }
+  if (written)
+    *written = writer.end;
   if (parser.got_error)
-    return 1;
+    return PARSE_ERROR;
   if (writer.got_error)
-    return 2;
-  return 0;
+    return OUT_TOO_SMALL;
+  return ITEM_OK;
+}
+
+// Converts n inputs one after another into out, the pickle of input i
+// ends at ends[i] (starting at ends[i - 1], or 0). If out is too small,
+// the conversion goes on counting and ends[n - 1] is the size needed.
+// On PARSE_ERROR *failed is the index of the bad input.
+extern "C" int py_to_pickle_batch(size_t n, const char *const *ins,
+                                  const size_t *in_lens, char *out,
+                                  size_t out_len, size_t *ends,
+                                  size_t *failed) {
+  size_t pos = 0;
+  bool overflow = false;
+  for (size_t i = 0; i < n; ++i) {
+    size_t written = 0;
+    bool room = pos < out_len;
+    int res = py_to_pickle_ex(ins[i], in_lens[i], room ? out + pos : out,
+                              room ? out_len - pos : 0, &written);
+    if (res == PARSE_ERROR) {
+      *failed = i;
+      return res;
+    }
+    overflow = overflow || res == OUT_TOO_SMALL;
+    pos += written;
+    ends[i] = pos;
+  }
+  return overflow ? OUT_TOO_SMALL : ITEM_OK;
+}
+
+// Converts the next item of a top-level list starting at in + *pos, the
+// opening '[' must already be skipped. *pos is advanced past the item on
+// ITEM_OK and past the closing ']' on LIST_END. Unless `final`, reaching
+// the end of `in` returns NEED_MORE, so the caller can append the next
+// chunk of the input and call again with the same *pos. On PARSE_ERROR
+// *pos is moved to about where the error was found.
+extern "C" int py_list_next_pickle(const char *in, size_t in_len, int final,
+                                   size_t *pos, char *out, size_t out_len,
+                                   size_t *written) {
+  MemReader reader(in + *pos, in_len - *pos);
+  MemWriter writer(out, out_len);
+  Parser parser(&reader, &writer);
+  size_t consumed = 0;
+  int res;
+  try {
+    res = parser.list_item_pass(&consumed);
+  } catch (...) {
+    return PARSE_ERROR;
+  }
+  if (!final && reader.hit_eof)
+    return NEED_MORE;
+  if (res == PARSE_ERROR) {
+    *pos += reader.pos();
+    return res;
+  }
+  *written = writer.end;
+  if (writer.got_error)
+    return OUT_TOO_SMALL;
+  *pos += consumed;
+  return res;
+}
+
+extern "C" int py_to_pickle(const char *in, size_t in_len, char *out,
+                            size_t out_len) {
+  return py_to_pickle_ex(in, in_len, out, out_len, NULL);
 }
 
 #else // LIB
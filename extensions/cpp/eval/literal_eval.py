@@ -1,20 +1,38 @@
 import os
-import sys
+import re
+import ast
+import mmap
 import ctypes
+import pickle
 import tempfile
-from typing import Union
+from typing import IO, Any, Union, Optional
 from subprocess import CalledProcessError, check_call
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 
 from extensions.cpp.eval.base import BASE_DIR
+from extensions.cpp.eval.build import ensure_lib
 
-# _CppFilename = "literal_evald.cpp"
 _BinFilename = "literal_eval.bin"
-_LibFilename = "libliteraleval.so"
 
+# py_to_pickle_ex 的返回值, 输出缓冲区不够时 written 为实际需要的长度
+_ITEM_OK = 0
+_OUT_TOO_SMALL = 2
+# py_list_next_pickle 另有的返回值
+_LIST_END = 3
+_NEED_MORE = 4
 
-# def cpp_compile():
-#     check_call(["c++", "-std=c++11", _CppFilename, "-o", _BinFilename])
-#     check_call(["c++", "-std=c++11", "-DLIB", _CppFilename, "-shared", "-fPIC", "-o", _LibFilename])
+_LIST_START = re.compile(rb"\s*\[")
+_ITEM_OUT_SIZE = 64 * 1024
+# mmap 中已转换的部分每隔这么多字节释放一次
+_RELEASE_SIZE = 64 * 1024 * 1024
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class _LibHolder:
+    lib: Optional[ctypes.CDLL] = None
+    error: Optional[OSError] = None
 
 
 def py_to_pickle_tmp(s: Union[str, bytes]) -> bytes:
@@ -39,30 +57,383 @@ def py_to_pickle_tmp(s: Union[str, bytes]) -> bytes:
                     ],
                 )
             except CalledProcessError as exc:
-                print(f"{_BinFilename} returned error code {exc.returncode}")
-                sys.exit(1)
+                raise ValueError(
+                    f"{_BinFilename} returned error code {exc.returncode}",
+                ) from exc
             with open(f_pkl.name, "rb") as f:
                 return f.read()
 
 
-def py_to_pickle(s: Union[str, bytes]) -> bytes:
-    in_bytes = s if isinstance(s, bytes) else s.encode("utf8")
-    in_ = ctypes.create_string_buffer(in_bytes)
-    in_len = len(in_bytes)
-    out_len = (
-        in_len + 1000
-    )  # should always be enough (some buffer len + len of literal Python code)
-    out_ = ctypes.create_string_buffer(out_len)
+def _load_lib() -> ctypes.CDLL:
+    """加载一次共享库并声明参数类型, 之后每次调用复用同一个句柄."""
+    lib = _LibHolder.lib
+    if lib is None:
+        if _LibHolder.error is not None:
+            raise _LibHolder.error
+        try:
+            path = ensure_lib()
+            if path is None:
+                raise OSError("no usable build")
+            lib = _declare(ctypes.CDLL(path))
+        except (OSError, AttributeError) as exc:
+            # 加载失败 (或预编译的库缺少新接口) 也只尝试一次
+            error = OSError(f"libliteraleval.so is not available: {exc}")
+            _LibHolder.error = error
+            raise error from exc
+        _LibHolder.lib = lib
+    return lib
+
 
-    lib = ctypes.CDLL(f"{BASE_DIR.absolute()}/{_LibFilename}")
-    lib.py_to_pickle.argtypes = (
+def _declare(lib: ctypes.CDLL) -> ctypes.CDLL:
+    lib.py_to_pickle_ex.argtypes = (
+        ctypes.c_char_p,
+        ctypes.c_size_t,
+        ctypes.c_char_p,
+        ctypes.c_size_t,
+        ctypes.POINTER(ctypes.c_size_t),
+    )
+    lib.py_to_pickle_ex.restype = ctypes.c_int
+    lib.py_list_next_pickle.argtypes = (
         ctypes.c_char_p,
         ctypes.c_size_t,
+        ctypes.c_int,
+        ctypes.POINTER(ctypes.c_size_t),
         ctypes.c_char_p,
         ctypes.c_size_t,
+        ctypes.POINTER(ctypes.c_size_t),
     )
-    lib.py_to_pickle.restype = ctypes.c_int
+    lib.py_list_next_pickle.restype = ctypes.c_int
+    lib.py_to_pickle_batch.argtypes = (
+        ctypes.c_size_t,
+        ctypes.POINTER(ctypes.c_char_p),
+        ctypes.POINTER(ctypes.c_size_t),
+        ctypes.c_char_p,
+        ctypes.c_size_t,
+        ctypes.POINTER(ctypes.c_size_t),
+        ctypes.POINTER(ctypes.c_size_t),
+    )
+    lib.py_to_pickle_batch.restype = ctypes.c_int
+    return lib
+
+
+def _as_c_buffer(data: Buffer) -> Union[bytes, ctypes.Array]:
+    """bytes 直接传指针; bytearray/可写 mmap 等可写缓冲区按原内存传入.
+
+    只读的 memoryview 无法在 ctypes 中取得指针, 只能复制一次.
+    """
+    if isinstance(data, bytes):
+        return data
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    if view.readonly or not view.c_contiguous:
+        return view.tobytes()
+    view = view.cast("B")
+    return (ctypes.c_char * view.nbytes).from_buffer(view)
+
+
+def py_to_pickle(
+    s: Union[str, Buffer],
+    out_size_hint: Optional[int] = None,
+) -> bytes:
+    """把 Python 字面量转换为 pickle 数据, 结果可直接交给 pickle.loads.
+
+    输出缓冲区按 out_size_hint (默认按输入长度估计) 分配, 不够时库会
+    返回实际需要的长度, 按该长度重新转换一次.
+    """
+    data = s.encode("utf8") if isinstance(s, str) else s
+    in_ = _as_c_buffer(data)
+    in_len = len(in_) if isinstance(in_, bytes) else ctypes.sizeof(in_)
+    lib = _load_lib()
+    written = ctypes.c_size_t()
+    out_len = out_size_hint or in_len + in_len // 2 + 64
+    while True:
+        out = bytearray(out_len)
+        out_ = (ctypes.c_char * out_len).from_buffer(out)
+        res = lib.py_to_pickle_ex(
+            in_,
+            in_len,
+            out_,
+            out_len,
+            ctypes.byref(written),
+        )
+        del out_
+        if res != _OUT_TOO_SMALL:
+            break
+        out_len = written.value
+    if res != _ITEM_OK:
+        raise ValueError(f"malformed python literal: {bytes(data[:80])!r}")
+    return bytes(memoryview(out)[: written.value])
+
+
+def native_available() -> bool:
+    try:
+        _load_lib()
+    except OSError:
+        return False
+    return True
+
+
+def fast_literal_eval(s: Union[str, Buffer]) -> object:
+    """ast.literal_eval 的替代, 由 C++ 转换为 pickle 后 pickle.loads.
+
+    C++ 只支持 str, int, float, bool, list, dict, set, None, 遇到 tuple,
+    bytes 等不支持的输入, 或共享库不可用时退回 ast.literal_eval.
+    """
+    if native_available():
+        try:
+            return pickle.loads(py_to_pickle(s))
+        except ValueError:
+            pass
+    if not isinstance(s, str):
+        s = bytes(s).decode("utf8")
+    return ast.literal_eval(s)
+
+
+class _ListItemConverter:
+    """逐项调用 py_list_next_pickle, 输出缓冲区在各项之间复用."""
+
+    def __init__(self, pos: int) -> None:
+        self.lib = _load_lib()
+        self.out = ctypes.create_string_buffer(_ITEM_OUT_SIZE)
+        self.pos = ctypes.c_size_t(pos)
+        self.written = ctypes.c_size_t()
 
-    res = lib.py_to_pickle(in_, in_len, out_, out_len)
-    assert res == 0, "there was some error in %r" % in_bytes
-    return out_.raw
+    def next(
+        self,
+        in_: ctypes.Array,
+        final: bool,
+    ) -> tuple[int, Optional[bytes]]:
+        while True:
+            res = self.lib.py_list_next_pickle(
+                in_,
+                ctypes.sizeof(in_),
+                final,
+                ctypes.byref(self.pos),
+                self.out,
+                ctypes.sizeof(self.out),
+                ctypes.byref(self.written),
+            )
+            if res != _OUT_TOO_SMALL:
+                break
+            self.out = ctypes.create_string_buffer(self.written.value)
+        if res != _ITEM_OK:
+            return res, None
+        return res, ctypes.string_at(self.out, self.written.value)
+
+
+def _malformed(offset: int) -> ValueError:
+    return ValueError(f"malformed python literal list near byte {offset}")
+
+
+def _iter_mmap(mm: mmap.mmap) -> Iterator[bytes]:
+    match = _LIST_START.match(mm)
+    if match is None:
+        raise _malformed(0)
+    if hasattr(mm, "madvise"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    converter = _ListItemConverter(match.end())
+    in_ = (ctypes.c_char * len(mm)).from_buffer(mm)
+    released = 0
+    try:
+        while True:
+            res, item = converter.next(in_, True)
+            if res == _LIST_END:
+                return
+            if item is None:
+                raise _malformed(converter.pos.value)
+            yield item
+            # 已转换的页不会再读, 及时释放使常驻内存不随文件增长
+            done = converter.pos.value // mmap.PAGESIZE * mmap.PAGESIZE
+            if done - released >= _RELEASE_SIZE and hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_DONTNEED, released, done - released)
+                released = done
+    finally:
+        # 导出的指针释放后 mmap 才能关闭
+        del in_
+
+
+def _iter_stream(f: IO[bytes], buffer_size: int) -> Iterator[bytes]:
+    buf = bytearray()
+    while True:
+        chunk = f.read(buffer_size)
+        buf += chunk
+        match = _LIST_START.match(buf)
+        if match is not None:
+            break
+        if not chunk or buf.strip():
+            raise _malformed(0)
+    converter = _ListItemConverter(match.end())
+    offset = 0  # buf 开头在整个输入中的位置
+    final = False
+    while True:
+        in_ = (ctypes.c_char * len(buf)).from_buffer(buf)
+        res, item = converter.next(in_, final)
+        while item is not None:
+            yield item
+            res, item = converter.next(in_, final)
+        del in_
+        if res == _LIST_END:
+            return
+        if res != _NEED_MORE:
+            raise _malformed(offset + converter.pos.value)
+        # 丢弃已转换的部分, 只保留未转换完的一项再追加下一块
+        pos = converter.pos.value
+        del buf[:pos]
+        offset += pos
+        converter.pos.value = 0
+        # 单项跨越多块时每次都要从头重新转换, 按已缓冲大小加倍读取
+        chunk = f.read(max(buffer_size, len(buf)))
+        buf += chunk
+        final = not chunk
+
+
+def iter_pickled_list(
+    source: Union[str, os.PathLike, mmap.mmap, IO[bytes]],
+    buffer_size: int = 1024 * 1024,
+) -> Iterator[bytes]:
+    """逐项转换顶层为 list 的字面量文件, 每项产出一个完整的 pickle.
+
+    source 为文件路径时 mmap 整个文件, 为二进制文件对象 (如 gzip.open)
+    时按 buffer_size 分块读取, 内存占用只与单项大小有关, 与文件大小无关.
+    可写 (ACCESS_WRITE/ACCESS_COPY) 的 mmap 直接按原内存传入, 只读的 mmap
+    按文件对象分块读取.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        with mm:
+            yield from _iter_mmap(mm)
+    elif isinstance(source, mmap.mmap):
+        # 只读 mmap 无法导出 ctypes 需要的可写指针
+        with memoryview(source) as view:
+            writable = not view.readonly
+        if writable:
+            yield from _iter_mmap(source)
+        else:
+            yield from _iter_stream(source, buffer_size)
+    else:
+        yield from _iter_stream(source, buffer_size)
+
+
+def iter_literal_list(
+    source: Union[str, os.PathLike, mmap.mmap, IO[bytes]],
+    buffer_size: int = 1024 * 1024,
+) -> Iterator[Any]:
+    """同 iter_pickled_list, 逐项产出 Python 对象.
+
+    for record in iter_literal_list(gzip.open("demo.txt.gz")):
+        ...
+    """
+    for item in iter_pickled_list(source, buffer_size):
+        yield pickle.loads(item)
+
+
+def _convert_shard(
+    ins: Sequence[Union[bytes, int]],
+    lengths: Sequence[int],
+    start: int,
+) -> list[bytes]:
+    """一次调用转换一个分片, 转换全程在 C 中执行, 期间不持有 GIL.
+
+    ins 的每项为 bytes 或输入的地址.
+    """
+    n = len(ins)
+    ins_ = (ctypes.c_char_p * n)(*ins)
+    in_lens = (ctypes.c_size_t * n)(*lengths)
+    ends = (ctypes.c_size_t * n)()
+    failed = ctypes.c_size_t()
+    out_len = sum(lengths) * 3 // 2 + 64 * n
+    while True:
+        out = ctypes.create_string_buffer(out_len)
+        res = _load_lib().py_to_pickle_batch(
+            n,
+            ins_,
+            in_lens,
+            out,
+            out_len,
+            ends,
+            ctypes.byref(failed),
+        )
+        if res != _OUT_TOO_SMALL:
+            break
+        out_len = ends[n - 1]
+    if res != _ITEM_OK:
+        index = start + failed.value
+        raise ValueError(f"malformed python literal at index {index}")
+    view = memoryview(out).cast("B")
+    ends_ = ends[:]
+    return [
+        view[begin:end].tobytes()
+        for begin, end in zip([0, *ends_[:-1]], ends_)
+    ]
+
+
+def _convert_sharded(
+    ins: Sequence[Union[bytes, int]],
+    lengths: Sequence[int],
+    max_workers: Optional[int],
+) -> list[bytes]:
+    workers = max_workers or os.cpu_count() or 1
+    size = -(-len(ins) // workers)  # 向上取整
+    if workers == 1 or len(ins) <= 1:
+        return _convert_shard(ins, lengths, 0) if ins else []
+    with ThreadPoolExecutor(workers) as executor:
+        shards = executor.map(
+            lambda start: _convert_shard(
+                ins[start : start + size],
+                lengths[start : start + size],
+                start,
+            ),
+            range(0, len(ins), size),
+        )
+        return [item for shard in shards for item in shard]
+
+
+def py_to_pickle_many(
+    items: Sequence[Union[str, Buffer]],
+    max_workers: Optional[int] = None,
+    use_bin: bool = False,
+) -> list[bytes]:
+    """批量转换, 结果与输入顺序一致.
+
+    输入按线程数切分为连续的分片, 每个分片只调用一次共享库; ctypes 调用
+    期间释放 GIL, 各分片在线程池中并行转换. use_bin 时每项启动一个
+    literal_eval.bin 子进程, 同样由线程池并行等待.
+    """
+    if use_bin:
+        with ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(py_to_pickle_tmp, items))
+    bufs = [
+        _as_c_buffer(s.encode("utf8") if isinstance(s, str) else s)
+        for s in items
+    ]
+    return _convert_sharded(
+        [b if isinstance(b, bytes) else ctypes.addressof(b) for b in bufs],
+        [len(buf) for buf in bufs],
+        max_workers,
+    )
+
+
+def py_to_pickle_ranges(
+    data: Buffer,
+    ranges: Sequence[tuple[int, int]],
+    max_workers: Optional[int] = None,
+) -> list[bytes]:
+    """批量转换同一缓冲区 (如整个文件的 mmap) 中的 [start, end) 片段.
+
+    bytes 与可写缓冲区不会复制, 只读缓冲区先整体复制一次.
+    """
+    buf = _as_c_buffer(data)
+    size = len(buf)
+    for start, end in ranges:
+        if not 0 <= start <= end <= size:
+            raise ValueError(f"range ({start}, {end}) out of buffer")
+    base = (
+        ctypes.cast(ctypes.c_char_p(buf), ctypes.c_void_p).value
+        if isinstance(buf, bytes)
+        else ctypes.addressof(buf)
+    )
+    return _convert_sharded(
+        [base + start for start, _ in ranges],
+        [end - start for start, end in ranges],
+        max_workers,
+    )
@@ -7,17 +7,116 @@ import pickle
 import timeit
 import marshal
 import argparse
+import resource
+from unittest import mock
 from subprocess import check_call
 
 from extensions.cpp.eval.base import BASE_DIR
-from extensions.cpp.eval.literal_eval import py_to_pickle
+from extensions.cpp.eval.literal_eval import (
+    py_to_pickle,
+    fast_literal_eval,
+    iter_literal_list,
+    py_to_pickle_many,
+    py_to_pickle_ranges,
+)
+
+
+def bench_call_sites(number: int = 20000) -> None:
+    """服务中的调用点: common.loguru.serialize 解析 json=True 的日志."""
+    from loguru import logger
+
+    from common.utils import datetime_now
+    from common.loguru import serialize
+
+    message = str(
+        {
+            "uri": "/v1/accounts?page=1",
+            "method": "GET",
+            "status": 200,
+            "success": True,
+            "cost": 0.0123,
+            "headers": {"user-agent": "python-requests/2.31", "x-id": None},
+            "roles": ["admin", "user"],
+        },
+    )
+    record = {
+        "name": __name__,
+        "level": logger.level("INFO"),
+        "time": datetime_now(),
+        "message": message,
+        "extra": {"json": True},
+        "function": "bench_call_sites",
+        "line": 1,
+    }
+    print("Log message size:", len(message))
+    for name, func in (
+        ("ast.literal_eval", ast.literal_eval),
+        ("fast_literal_eval", fast_literal_eval),
+    ):
+        with mock.patch("common.loguru.fast_literal_eval", func):
+            cost = timeit.timeit(lambda: serialize(record), number=number)
+        print(f"serialize ({name}): {cost / number * 1e6:.2f} us")
+
+
+def bench_stream(txt_fn_gz: str) -> None:
+    """逐项转换, 峰值内存不随文件大小增长 (需单独运行, 不与全量转换混用)."""
+    t = time.time()
+    count = sum(1 for _ in iter_literal_list(gzip.open(txt_fn_gz, "rb")))
+    print("iter_literal_list (gzip stream):", time.time() - t)
+    print("Items:", count)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("Max RSS (KiB):", max_rss)
+
+
+def bench_workers(txt: bytes) -> None:
+    """按行切分 demo 数据后批量转换, 报告相对单线程的加速比."""
+    ranges = []
+    start = txt.index(b"\n") + 1
+    while True:
+        end = txt.find(b",\n", start)
+        if end < 0:
+            break
+        ranges.append((start, end))
+        start = end + 2
+    items = [txt[start:end] for start, end in ranges]
+    print("Items:", len(items), "CPUs:", os.cpu_count())
+    funcs = {
+        "py_to_pickle_many": lambda w: py_to_pickle_many(items, w),
+        "py_to_pickle_ranges": lambda w: py_to_pickle_ranges(txt, ranges, w),
+    }
+    py_to_pickle_many(items, 1)  # 预热
+    workers = 1
+    baseline = {}
+    while workers <= max(os.cpu_count() or 1, 2) * 2:
+        for name, func in funcs.items():
+            cost = min(
+                timeit.repeat(
+                    # 绑定本轮的 func 与 workers
+                    lambda func=func, workers=workers: func(workers),
+                    number=1,
+                    repeat=3,
+                ),
+            )
+            baseline.setdefault(name, cost)
+            print(
+                f"{name} workers={workers}: {cost:.3f}s, "
+                f"speedup {baseline[name] / cost:.2f}x",
+            )
+        workers *= 2
 
 
 def main() -> None:
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument("--only-py-to-pickle", action="store_true")
+    arg_parser.add_argument("--call-sites", action="store_true")
+    arg_parser.add_argument("--stream", action="store_true")
+    arg_parser.add_argument("--workers", action="store_true")
     args = arg_parser.parse_args()
 
+    if args.call_sites:
+        bench_call_sites()
+        return
+
     txt_fn_gz = "demo.txt.gz"  # use the generate script
 
     if not os.path.exists(txt_fn_gz):
@@ -29,12 +128,22 @@ def main() -> None:
             ],
         )
 
+    if args.stream:
+        bench_stream(txt_fn_gz)
+        return
+
     t = time.time()
     txt = gzip.open(txt_fn_gz, "rb").read().decode("utf8")
     print("Gunzip + read time:", time.time() - t)
     print("Size:", len(txt))
 
+    if args.workers:
+        bench_workers(txt.encode("utf8"))
+        return
+
     print("py_to_pickle:", timeit.timeit(lambda: py_to_pickle(txt), number=1))
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("Max RSS (KiB):", max_rss)
     print(
         "pickle.loads+py_to_pickle:",
         timeit.timeit(lambda: pickle.loads(py_to_pickle(txt)), number=1),
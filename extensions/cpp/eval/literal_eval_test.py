@@ -24,22 +24,22 @@ def assert_equal(a: Any, b: Any, _msg: str = "") -> None:
         assert a == b, f"{a!r} != {b!r} in {_msg}"
 
 
-def check(s: Union[str, bytes]) -> None:
+def check(s: Union[str, bytes], *, native_only: bool = False) -> None:
     print("Check:", repr(s) if len(s) <= 80 else repr(s[:70]) + "...")
     a = eval(s)
     b = ast.literal_eval(s if isinstance(s, str) else s.decode("utf8"))
     assert_equal(a, b)
 
     c_bin = py_to_pickle(s)
-    c_bin2 = py_to_pickle_tmp(s)
-    c_bin = c_bin[: len(c_bin2)]
-    assert_equal(c_bin, c_bin2)
+    if not native_only:
+        c_bin2 = py_to_pickle_tmp(s)
+        assert_equal(c_bin, c_bin2)
 
     c = pickle.loads(c_bin)
     assert_equal(b, c)
 
 
-def tests(*, fast: bool = True) -> None:
+def tests(*, fast: bool = True, native_only: bool = False) -> None:
     checks = [
         "0",
         "1",
@@ -61,9 +61,15 @@ def tests(*, fast: bool = True) -> None:
         "{1,2,3}",
         "None",
         "{'a': None, 'b':1, 'c':None, 'd':'d'}",
+        "-1",
+        "3000000000",
+        ".5",
+        "1e-3",
+        "[True, False]",
+        "{1,}",
     ]
     for s in checks:
-        check(s)
+        check(s, native_only=native_only)
 
     if fast:
         return
@@ -71,7 +77,7 @@ def tests(*, fast: bool = True) -> None:
     txt_fn_gz = "demo.txt.gz"  # use the generate script
     if os.path.exists(txt_fn_gz):
         txt = gzip.open(txt_fn_gz, "rb").read()
-        check(txt)
+        check(txt, native_only=native_only)
     else:
         print(f"({txt_fn_gz} does not exist)")
 
@@ -79,8 +85,10 @@ def tests(*, fast: bool = True) -> None:
 def main() -> None:
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument("--fast", action="store_true")
+    # 只校验共享库, 不与 literal_eval.bin 的输出比对 (编译后校验时使用)
+    arg_parser.add_argument("--native-only", action="store_true")
     args = arg_parser.parse_args()
-    tests(fast=args.fast)
+    tests(fast=args.fast, native_only=args.native_only)
     print("All passed!")
 
 
@@ -0,0 +1,182 @@
+"""对比 BaseHTTPMiddleware 上下文中间件与 ContextPureMiddleware.
+
+直接调用 ASGI 应用, 不经过网络:
+python -m scripts.benchmark.context_middleware --number 2000
+"""
+import time
+import asyncio
+import argparse
+from collections.abc import AsyncIterator
+
+from loguru import logger
+from starlette.routing import Route
+from starlette_context import request_cycle_context
+from starlette.requests import Request
+from starlette.responses import Response, JSONResponse, StreamingResponse
+from starlette.applications import Starlette
+from starlette.middleware.base import (
+    BaseHTTPMiddleware,
+    RequestResponseEndpoint,
+)
+
+from common.context import (
+    RequestIdPlugin,
+    RequestProcessInfoPlugin,
+    RequestStartTimestampPlugin,
+)
+from core.middlewares import ContextPureMiddleware
+from common.decorators import SingletonDecorator
+
+STREAM_CHUNKS = 100
+
+
+async def legacy_context_middleware(
+    request: Request,
+    call_next: RequestResponseEndpoint,
+) -> Response:
+    """替换前的实现, 每个请求都重新定义 ContextMiddleware."""
+
+    @SingletonDecorator
+    class ContextMiddleware:
+        def __init__(self, plugins: list) -> None:
+            self.plugins = plugins
+
+        async def __call__(
+            self,
+            request: Request,
+            call_next: RequestResponseEndpoint,
+        ) -> Response:
+            context = {
+                plugin.key: await plugin.process_request(request)
+                for plugin in self.plugins
+            }
+            with request_cycle_context(context), logger.contextualize(
+                request_id=context.get(RequestIdPlugin.key),
+            ):
+                response = await call_next(request)
+                for plugin in self.plugins:
+                    await plugin.enrich_response(response)
+                return response
+
+    return await ContextMiddleware(
+        plugins=[
+            RequestStartTimestampPlugin(),
+            RequestIdPlugin(),
+            RequestProcessInfoPlugin(),
+        ],
+    )(request, call_next)
+
+
+async def json_endpoint(request: Request) -> Response:
+    return JSONResponse({"code": 0, "data": "ok"})
+
+
+async def stream_endpoint(request: Request) -> Response:
+    async def body() -> AsyncIterator[bytes]:
+        for _ in range(STREAM_CHUNKS):
+            yield b"x" * 1024
+
+    return StreamingResponse(body())
+
+
+def build_app(pure: bool) -> Starlette:
+    app = Starlette(
+        routes=[
+            Route("/json", json_endpoint),
+            Route("/stream", stream_endpoint),
+        ],
+    )
+    if pure:
+        app.add_middleware(ContextPureMiddleware)
+    else:
+        app.add_middleware(
+            BaseHTTPMiddleware,
+            dispatch=legacy_context_middleware,
+        )
+    return app
+
+
+async def call(app: Starlette, path: str) -> list[dict]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 10000),
+        "server": ("bench", 80),
+    }
+    messages = []
+    received = False
+
+    async def receive() -> dict:
+        nonlocal received
+        if received:
+            # 与真实服务器一致, 请求体读完后阻塞到断开连接
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def body(messages: list[dict]) -> bytes:
+    return b"".join(
+        m.get("body", b"")
+        for m in messages
+        if m["type"] == "http.response.body"
+    )
+
+
+async def measure(app: Starlette, path: str, number: int) -> float:
+    for _ in range(50):
+        await call(app, path)
+    start = time.perf_counter()
+    for _ in range(number):
+        await call(app, path)
+    return (time.perf_counter() - start) / number
+
+
+def report(name: str, before: float, after: float) -> None:
+    print(
+        f"{name:<7} before: {before * 1e6:8.1f} us/req  "
+        f"after: {after * 1e6:8.1f} us/req  "
+        f"speedup: {before / after:.2f}x",
+    )
+
+
+async def run(number: int) -> None:
+    legacy, pure = build_app(pure=False), build_app(pure=True)
+    for path in ("/json", "/stream"):
+        legacy_messages = await call(legacy, path)
+        pure_messages = await call(pure, path)
+        headers = dict(pure_messages[0]["headers"])
+        assert b"x-request-id" in headers and b"x-process-time" in headers
+        assert body(pure_messages) == body(legacy_messages)
+        report(
+            path.strip("/"),
+            await measure(legacy, path, number),
+            await measure(pure, path, number),
+        )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--number", type=int, default=2000)
+    args = arg_parser.parse_args()
+    # 插件每个请求都会写一条访问日志, 压测时关闭
+    logger.remove()
+    asyncio.run(run(args.number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""对比 PageResp 的默认序列化和快速序列化.
+
+python -m scripts.benchmark.serialize_response --size 1000
+"""
+import json
+import uuid
+import timeit
+import argparse
+from datetime import datetime
+
+from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+
+from common.utils import datetime_now
+from common.responses import PageInfo, PageResp
+from common.serializer import dumps, to_jsonable
+
+
+class Item(BaseModel):
+    id: uuid.UUID
+    username: str
+    nickname: str
+    remark: str
+    status: str
+    created_at: datetime
+    updated_at: datetime
+
+
+def build_page(size: int) -> PageResp[Item]:
+    now = datetime_now()
+    return PageResp[Item](
+        data=[
+            Item(
+                id=uuid.uuid4(),
+                username=f"user{i}",
+                nickname=f"昵称{i}",
+                remark="remark" * 10,
+                status="enable",
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(size)
+        ],
+        page_info=PageInfo(
+            total_page=1,
+            total_count=size,
+            size=size,
+            page=1,
+        ),
+    )
+
+
+def default_serialize(page: PageResp) -> bytes:
+    content = jsonable_encoder(
+        page.dict(),
+        custom_encoder=page.Config.json_encoders,
+    )
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def fast_serialize(page: PageResp) -> bytes:
+    return dumps(to_jsonable(page, page.Config.json_encoders))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--size", type=int, default=1000)
+    arg_parser.add_argument("--number", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    page = build_page(args.size)
+    assert json.loads(default_serialize(page)) == json.loads(
+        fast_serialize(page),
+    )
+    default = timeit.timeit(
+        lambda: default_serialize(page),
+        number=args.number,
+    )
+    fast = timeit.timeit(lambda: fast_serialize(page), number=args.number)
+    print(f"PageResp with {args.size} items, {args.number} runs")
+    print(f"default: {default / args.number * 1000:.2f} ms/op")
+    print(f"fast:    {fast / args.number * 1000:.2f} ms/op")
+    print(f"speedup: {default / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
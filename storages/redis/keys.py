@@ -19,3 +19,20 @@ class RedisCacheKey(str, Enum):
     RedisLockKey = RedisKeyPrefix + "RedisLock:{unique_key}"
     TaskPramsKey = RedisKeyPrefix + "TaskPrams:{task_id}:{param_id}"
     CaptchaCodeKey = RedisKeyPrefix + "CaptchaCode:{unique_key}"
+    # 权限缓存版本号, Role/Permission/Resource 变更时自增
+    PermissionVersionKey = RedisKeyPrefix + "Permission:Version"
+    # hash, field: {account_id}:{role_id}, value: 权限码json列表
+    PermissionSetKey = RedisKeyPrefix + "Permission:Set:{version}"
+    # 账户快照版本号, Account/Role 变更时自增
+    AccountVersionKey = RedisKeyPrefix + "Account:Version"
+    AccountSnapshotKey = (
+        RedisKeyPrefix + "Account:Snapshot:{version}:{account_id}"
+    )
+    # CURDGenerator 列表总数缓存版本号, 通过生成的路由写入时自增
+    CountVersionKey = RedisKeyPrefix + "Count:Version:{table}"
+    # NgramSearchBackend 索引版本号, 通过生成的路由写入时自增
+    SearchIndexVersionKey = RedisKeyPrefix + "SearchIndex:Version:{table}"
+    # 第三方 GET 接口响应缓存, digest 由请求参数生成
+    ThirdResponseCacheKey = (
+        RedisKeyPrefix + "Third:Response:{third}:{api}:{digest}"
+    )
@@ -1,10 +1,19 @@
 import json
-from datetime import timedelta
+import uuid
+from enum import Enum
+from typing import Union, Optional
+from datetime import datetime, timedelta
+
+import ujson
+from tortoise.models import Model
 
 from conf.config import local_configs
+from common.cache import LRUCache, get_cache_version, bump_cache_version
 from common.types import JwtPayload
 from common.utils import datetime_now, flatten_list
 from common.encrypt import Jwt
+from storages.redis import AsyncRedisUtil
+from storages.redis.keys import RedisCacheKey
 from storages.relational.models import Role, System, Account
 from storages.relational.pydantic.system import SystemListWithRoles
 from storages.relational.pydantic.account import (
@@ -50,3 +59,137 @@ async def get_permissions(account: Account, role: Role) -> set:
     #     for resource in await role.resources.all():
     #         permission_set |= set(await resource.permissions.all().values_list("code", flat=True))
     return permission_set  # noqa
+
+
+# 权限集合二级缓存: 进程内 LRU -> redis hash -> 数据库
+_permission_lru = LRUCache(
+    maxsize=local_configs.CACHE.PERMISSION_LRU_SIZE,
+    ttl=local_configs.CACHE.PERMISSION_TTL,
+)
+
+
+async def invalidate_permission_cache() -> None:
+    """Role/Permission/Resource 变更后调用, 使全部权限缓存失效."""
+    await bump_cache_version(RedisCacheKey.PermissionVersionKey.value)
+    _permission_lru.clear()
+
+
+async def get_cached_permissions(account: Account, role: Role) -> set:
+    version = await get_cache_version(
+        RedisCacheKey.PermissionVersionKey.value,
+    )
+    field = f"{account.id}:{role.id}"
+    lru_key = (version, field)
+
+    permissions = _permission_lru.get(lru_key)
+    if permissions is not None:
+        return permissions
+
+    redis_key = RedisCacheKey.PermissionSetKey.format(version=version)
+    value = await AsyncRedisUtil.hget(redis_key, field)
+    if value is not None:
+        permissions = set(ujson.loads(value))
+    else:
+        permissions = await get_permissions(account, role)
+        await AsyncRedisUtil.hset(
+            redis_key,
+            field,
+            ujson.dumps([i for i in permissions if i]),
+            exp_of_none=local_configs.CACHE.PERMISSION_TTL,
+        )
+    _permission_lru.set(lru_key, permissions)
+    return permissions
+
+
+# 账户快照二级缓存: 进程内 LRU -> redis -> 数据库
+# 快照不包含密码, 还原出的实例标记为 partial, 不可直接 save
+_account_snapshot_lru = LRUCache(
+    maxsize=local_configs.CACHE.ACCOUNT_SNAPSHOT_LRU_SIZE,
+    ttl=local_configs.CACHE.ACCOUNT_SNAPSHOT_TTL,
+)
+ACCOUNT_SNAPSHOT_EXCLUDE_FIELDS = {"password"}
+
+
+def _snapshot_value(value: object) -> object:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _dump_instance(obj: Model, exclude: set[str] = frozenset()) -> dict:
+    return {
+        name: _snapshot_value(getattr(obj, name))
+        for name in obj._meta.fields_db_projection
+        if name not in exclude
+    }
+
+
+def _load_instance(model: type[Model], data: dict) -> Model:
+    obj = model(**data)
+    obj._saved_in_db = True
+    obj._partial = True
+    return obj
+
+
+def dump_account_snapshot(account: Account) -> dict:
+    """账户及其角色(需已 prefetch)的紧凑快照."""
+    return {
+        "account": _dump_instance(
+            account,
+            exclude=ACCOUNT_SNAPSHOT_EXCLUDE_FIELDS,
+        ),
+        "roles": [_dump_instance(role) for role in account.roles],
+    }
+
+
+def load_account_snapshot(data: dict) -> Account:
+    account = _load_instance(Account, data["account"])
+    account.roles._set_result_for_query(
+        [_load_instance(Role, role) for role in data["roles"]],
+    )
+    return account
+
+
+async def invalidate_account_snapshot() -> None:
+    """Account/Role 变更后调用, 使全部账户快照失效."""
+    await bump_cache_version(RedisCacheKey.AccountVersionKey.value)
+    _account_snapshot_lru.clear()
+
+
+async def get_account_snapshot(
+    account_id: Union[str, uuid.UUID],
+) -> Optional[Account]:
+    """获取账户及其角色, 命中缓存时不访问数据库."""
+    version = await get_cache_version(RedisCacheKey.AccountVersionKey.value)
+    lru_key = (version, str(account_id))
+
+    snapshot = _account_snapshot_lru.get(lru_key)
+    if snapshot is None:
+        redis_key = RedisCacheKey.AccountSnapshotKey.format(
+            version=version,
+            account_id=account_id,
+        )
+        value = await AsyncRedisUtil.get(redis_key)
+        if value is not None:
+            snapshot = ujson.loads(value)
+        else:
+            account: Optional[Account] = (
+                await Account.filter(id=account_id)
+                .prefetch_related("roles")
+                .first()
+            )
+            if not account:
+                return None
+            snapshot = dump_account_snapshot(account)
+            await AsyncRedisUtil.set(
+                redis_key,
+                ujson.dumps(snapshot),
+                exp=local_configs.CACHE.ACCOUNT_SNAPSHOT_TTL,
+            )
+        _account_snapshot_lru.set(lru_key, snapshot)
+    # 每次还原新实例, 避免请求间共享可变对象
+    return load_account_snapshot(snapshot)
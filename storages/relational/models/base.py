@@ -1,3 +1,4 @@
+import asyncio
 from typing import TypeVar, Optional
 from datetime import datetime, timedelta
 
@@ -74,14 +75,15 @@ class BaseModel(UUIDPrimaryKeyModel, TimeStampModel):
         **kwargs: any,
     ) -> tuple[PageInfo, list[BaseModelType]]:
         queryset = cls.filter(*args, **kwargs)
-        page_info = generate_page_info(await queryset.count(), pager)
-        data = (
-            await queryset.limit(pager.limit)
+        # 总数和分页数据在不同连接上并发查询
+        total, data = await asyncio.gather(
+            queryset.count(),
+            queryset.limit(pager.limit)
             .offset(pager.offset)
             .select_related(*cls.get_select_related_fields())
-            .prefetch_related(*cls.get_prefetch_related_fields())
+            .prefetch_related(*cls.get_prefetch_related_fields()),
         )
-        return page_info, data
+        return generate_page_info(total, pager), data
 
     # @classmethod
     # def get_select_related_fields(cls) -> List[str]:
@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI, APIRouter
+from tortoise import Tortoise
+from starlette_context.middleware import RawContextMiddleware
+
+from common import cache
+from storages.redis import AsyncRedisUtil
+from common.exceptions import ApiException, api_exception_handler
+
+
+class FakeRedis:
+    """AsyncRedisUtil 中用到的接口的内存实现."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    async def set(self, key, value, exp=None):
+        self.data[key] = value
+
+    async def hget(self, name, key, default=None):
+        return self.data.get(name, {}).get(key, default)
+
+    async def hset(self, name, key, value, exp_of_none=None):
+        self.data.setdefault(name, {})[key] = value
+
+    async def incrby(self, name, value=1, exp_of_none=None):
+        self.data[name] = int(self.data.get(name, 0)) + value
+        return self.data[name]
+
+
+class DBTestCase(unittest.TestCase):
+    """sqlite 内存库 + 内存 redis, 用于路由级测试."""
+
+    # 除 storages.relational.models 外需要注册的模型模块
+    modules: tuple[str, ...] = ()
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch.multiple(
+            AsyncRedisUtil,
+            get=self.redis.get,
+            set=self.redis.set,
+            hget=self.redis.hget,
+            hset=self.redis.hset,
+            incrby=self.redis.incrby,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache._version_lru.clear()
+        self.addCleanup(cache._version_lru.clear)
+
+    def run_with_db(self, func):
+        async def run():
+            # storages.relational.models 导入时已注册 master app
+            await Tortoise.init(
+                db_url="sqlite://:memory:",
+                modules={
+                    "master": ["storages.relational.models", *self.modules],
+                },
+            )
+            await Tortoise.generate_schemas()
+            try:
+                await func()
+            finally:
+                await Tortoise.close_connections()
+
+        asyncio.run(run())
+
+    @staticmethod
+    def client(*routers: APIRouter) -> httpx.AsyncClient:
+        app = FastAPI()
+        # 非成功响应会写入请求上下文
+        app.add_middleware(RawContextMiddleware)
+        # 其他异常直接抛出到测试中
+        app.add_exception_handler(ApiException, api_exception_handler)
+        for router in routers:
+            app.include_router(router)
+        return httpx.AsyncClient(app=app, base_url="http://test")
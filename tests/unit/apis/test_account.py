@@ -0,0 +1,249 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import ujson
+
+from conf.config import local_configs
+from common.cache import get_cache_version
+from common.enums import ResponseCodeEnum
+from common.utils import datetime_now
+from common.encrypt import Jwt
+from storages.enums import StatusEnum
+from storages.redis.keys import RedisCacheKey
+from tests.unit.apis.base import DBTestCase
+from storages.relational.curd import account as account_curd
+from storages.relational.models import Role, Account, Permission
+from apis.http.routes.v1.account.views import router
+
+
+class AccountCacheTestCase(DBTestCase):
+    def setUp(self):
+        super().setUp()
+        for lru in (
+            account_curd._permission_lru,
+            account_curd._account_snapshot_lru,
+        ):
+            lru.clear()
+            self.addCleanup(lru.clear)
+
+    async def create_account(self, *permission_codes):
+        account = await Account.create(
+            username="user",
+            nickname="用户",
+            password="secret",
+            last_login_at=datetime_now() - timedelta(days=1),
+            status=StatusEnum.disable,
+        )
+        role = await Role.create(code="admin", label="管理员")
+        await account.roles.add(role)
+        for code in permission_codes:
+            permission = await Permission.create(code=code, label=code)
+            await role.permissions.add(permission)
+        return account, role
+
+
+class TestPermissionCache(AccountCacheTestCase):
+    def test_lru_redis_db(self):
+        async def run():
+            account, role = await self.create_account("GET:/role")
+            with mock.patch.object(
+                account_curd,
+                "get_permissions",
+                wraps=account_curd.get_permissions,
+            ) as get_permissions:
+                permissions = await account_curd.get_cached_permissions(
+                    account,
+                    role,
+                )
+                self.assertEqual(permissions, {"GET:/role"})
+                self.assertEqual(get_permissions.call_count, 1)
+
+                # 进程内 LRU 命中
+                await account_curd.get_cached_permissions(account, role)
+                self.assertEqual(get_permissions.call_count, 1)
+
+                # 其他 worker: LRU 未命中时读 redis
+                account_curd._permission_lru.clear()
+                permissions = await account_curd.get_cached_permissions(
+                    account,
+                    role,
+                )
+                self.assertEqual(permissions, {"GET:/role"})
+                self.assertEqual(get_permissions.call_count, 1)
+
+                # 失效后重新查询数据库
+                await role.permissions.add(
+                    await Permission.create(code="PUT:/role", label="PUT"),
+                )
+                await account_curd.invalidate_permission_cache()
+                permissions = await account_curd.get_cached_permissions(
+                    account,
+                    role,
+                )
+                self.assertEqual(permissions, {"GET:/role", "PUT:/role"})
+                self.assertEqual(get_permissions.call_count, 2)
+
+        self.run_with_db(run)
+
+
+class TestAccountSnapshot(AccountCacheTestCase):
+    def test_round_trip(self):
+        async def run():
+            account, role = await self.create_account()
+            account = (
+                await Account.filter(id=account.id)
+                .prefetch_related("roles")
+                .first()
+            )
+            snapshot = ujson.loads(
+                ujson.dumps(account_curd.dump_account_snapshot(account)),
+            )
+            self.assertNotIn("password", snapshot["account"])
+
+            loaded = account_curd.load_account_snapshot(snapshot)
+            self.assertEqual(loaded.id, account.id)
+            self.assertEqual(loaded.last_login_at, account.last_login_at)
+            self.assertEqual(loaded.created_at, account.created_at)
+            self.assertIs(loaded.status, StatusEnum.disable)
+            self.assertEqual(loaded.days_from_last_login(), 1)
+            self.assertEqual([r.id for r in loaded.roles], [role.id])
+            self.assertEqual(loaded.roles[0].created_at, role.created_at)
+
+        self.run_with_db(run)
+
+    def test_lru_redis_db(self):
+        async def run():
+            account, role = await self.create_account()
+            with mock.patch.object(
+                account_curd.Account,
+                "filter",
+                wraps=Account.filter,
+            ) as filter_:
+                loaded = await account_curd.get_account_snapshot(account.id)
+                self.assertEqual(loaded.username, "user")
+                self.assertEqual(filter_.call_count, 1)
+
+                await account_curd.get_account_snapshot(account.id)
+                account_curd._account_snapshot_lru.clear()
+                loaded = await account_curd.get_account_snapshot(account.id)
+                # LRU 与 redis 命中均不访问数据库
+                self.assertEqual(filter_.call_count, 1)
+                self.assertEqual(loaded.roles[0].label, "管理员")
+
+                await account_curd.invalidate_account_snapshot()
+                await account_curd.get_account_snapshot(account.id)
+                self.assertEqual(filter_.call_count, 2)
+
+            missing = await account_curd.get_account_snapshot(uuid.uuid4())
+            self.assertIsNone(missing)
+
+        self.run_with_db(run)
+
+
+class TestInvalidators(AccountCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            local_configs.CACHE,
+            "ACCOUNT_SNAPSHOT_ENABLED",
+            True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def headers(account, role):
+        token = Jwt(local_configs.JWT.SECRET).get_jwt(
+            {
+                "id": str(account.id),
+                "username": account.username,
+                "is_super_admin": False,
+                "expired_at": (
+                    datetime_now() + timedelta(minutes=5)
+                ).isoformat(),
+            },
+        )
+        return {"Authorization": f"Bearer {token}", "X-Role-Id": str(role.id)}
+
+    @staticmethod
+    async def versions():
+        return [
+            await get_cache_version(key.value)
+            for key in (
+                RedisCacheKey.PermissionVersionKey,
+                RedisCacheKey.AccountVersionKey,
+            )
+        ]
+
+    def test_role_and_permission_changes(self):
+        async def run():
+            account, role = await self.create_account("GET:/role")
+            permission = await Permission.get(code="GET:/role")
+            permission_path = f"/permission/{permission.id}"
+            for code in (f"PUT:/role/{role.id}", f"PUT:{permission_path}"):
+                await role.permissions.add(
+                    await Permission.create(code=code, label=code),
+                )
+
+            headers = self.headers(account, role)
+            async with self.client(router) as client:
+
+                async def code_of(method, path, **kwargs):
+                    response = await client.request(
+                        method,
+                        path,
+                        headers=headers,
+                        **kwargs,
+                    )
+                    return response.json()["code"]
+
+                self.assertEqual(
+                    await code_of("GET", "/role"),
+                    ResponseCodeEnum.success.value,
+                )
+                # 绕过路由直接修改数据库, 缓存中的权限仍然有效
+                await role.permissions.remove(permission)
+                self.assertEqual(
+                    await code_of("GET", "/role"),
+                    ResponseCodeEnum.success.value,
+                )
+
+                # 经过路由修改角色, 权限与账户快照同时失效
+                versions = await self.versions()
+                self.assertEqual(
+                    await code_of(
+                        "PUT",
+                        f"/role/{role.id}",
+                        params={"id": str(role.id)},
+                        json={"label": "新名称"},
+                    ),
+                    ResponseCodeEnum.success.value,
+                )
+                new_versions = await self.versions()
+                self.assertTrue(
+                    all(n > o for n, o in zip(new_versions, versions)),
+                )
+                self.assertEqual(
+                    await code_of("GET", "/role"),
+                    ResponseCodeEnum.forbidden.value,
+                )
+                snapshot = await account_curd.get_account_snapshot(account.id)
+                self.assertEqual(snapshot.roles[0].label, "新名称")
+
+                # 修改权限同样使两者失效
+                self.assertEqual(
+                    await code_of(
+                        "PUT",
+                        permission_path,
+                        params={"id": str(permission.id)},
+                        json={"label": "列表"},
+                    ),
+                    ResponseCodeEnum.success.value,
+                )
+                versions, new_versions = new_versions, await self.versions()
+                self.assertTrue(
+                    all(n > o for n, o in zip(new_versions, versions)),
+                )
+
+        self.run_with_db(run)
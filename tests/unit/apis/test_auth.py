@@ -0,0 +1,46 @@
+import uuid
+
+from common.enums import ResponseCodeEnum
+from apis.http.curd import get_related_objects
+from common.exceptions import ApiException
+from tests.unit.apis.base import DBTestCase
+from storages.relational.models import Role, Account
+from apis.http.routes.v1.auth.views import router
+
+
+class TestRegister(DBTestCase):
+    def test_missing_roles(self):
+        async def run():
+            role = await Role.create(code="admin", label="管理员")
+            missing = sorted(str(uuid.uuid4()) for _ in range(2))
+            with self.assertRaises(ApiException) as cm:
+                await get_related_objects(Role, [role.id, *missing])
+            # 一次查询, 列出全部缺失的 id
+            self.assertIn(", ".join(missing), cm.exception.message)
+
+            account = {
+                "username": "user",
+                "nickname": "user",
+                "password": "password",
+            }
+            async with self.client(router) as client:
+                response = await client.post(
+                    "/register",
+                    json={**account, "roles": [str(role.id), *missing]},
+                )
+                self.assertEqual(response.status_code, 200)
+                body = response.json()
+                self.assertEqual(body["code"], ResponseCodeEnum.failed.value)
+                self.assertEqual(body["message"], cm.exception.message)
+                self.assertIsNone(body["data"])
+                self.assertFalse(await Account.exists())
+
+                response = await client.post(
+                    "/register",
+                    json={**account, "roles": [str(role.id)]},
+                )
+            body = response.json()
+            self.assertEqual(body["code"], ResponseCodeEnum.success.value)
+            self.assertEqual(body["data"]["roles"][0]["code"], "admin")
+
+        self.run_with_db(run)
@@ -0,0 +1,113 @@
+import enum
+import asyncio
+import unittest
+
+from tortoise import Tortoise, fields
+from tortoise.models import Model
+
+from apis.http.curd import (
+    keyset_q,
+    plan_rows,
+    decode_cursor,
+    encode_cursor,
+    is_nulls_last,
+    cursor_ordering,
+    approximate_count,
+)
+
+
+class Color(str, enum.Enum):
+    red = "red"
+    blue = "blue"
+
+
+class CursorItem(Model):
+    id = fields.IntField(pk=True)
+    score = fields.IntField(null=True)
+    color = fields.CharEnumField(Color, max_length=8)
+
+
+class TestCursor(unittest.TestCase):
+    def test_enum_cursor(self):
+        ordering = cursor_ordering({"color"})
+        cursor = encode_cursor("next", ordering, [Color.blue, 1], CursorItem)
+        _, values = decode_cursor(cursor, ordering, CursorItem)
+        self.assertEqual(values, [Color.blue, 1])
+
+    def test_keyset_with_nulls(self):
+        async def pages(ordering, limit=2):
+            nulls_last = is_nulls_last(CursorItem)
+            ids, values = [], None
+            while True:
+                queryset = CursorItem.all()
+                if values is not None:
+                    queryset = queryset.filter(
+                        keyset_q(ordering, values, nulls_last),
+                    )
+                items = await queryset.order_by(*ordering).limit(limit)
+                ids += [item.id for item in items]
+                if len(items) < limit:
+                    return ids
+                values = [getattr(items[-1], f.lstrip("-")) for f in ordering]
+
+        async def run():
+            # storages.relational.models 导入时已注册 master app
+            await Tortoise.init(
+                db_url="sqlite://:memory:",
+                modules={
+                    "master": ["storages.relational.models", __name__],
+                },
+            )
+            await Tortoise.generate_schemas()
+            try:
+                for i, score in enumerate([None, 2, None, 1, 2, None, 3]):
+                    await CursorItem.create(
+                        id=i + 1,
+                        score=score,
+                        color=Color.red,
+                    )
+                for order_by in ({"score"}, {"-score"}, {"-score", "-id"}):
+                    ordering = cursor_ordering(order_by)
+                    expected = [
+                        item.id
+                        for item in await CursorItem.all().order_by(*ordering)
+                    ]
+                    self.assertEqual(len(expected), 7)
+                    self.assertEqual(await pages(ordering), expected)
+            finally:
+                await Tortoise.close_connections()
+
+        asyncio.run(run())
+
+
+class TestApproximateCount(unittest.TestCase):
+    def test_plan_rows(self):
+        mysql_plan = [{"id": 1, "rows": 200, "filtered": 50.0}]
+        self.assertEqual(plan_rows("mysql", mysql_plan), 100)
+        self.assertIsNone(plan_rows("mysql", [{"id": 1, "rows": None}]))
+        postgres_plan = [{"QUERY PLAN": '[{"Plan": {"Plan Rows": 42}}]'}]
+        self.assertEqual(plan_rows("postgres", postgres_plan), 42)
+        postgres_plan = [{"QUERY PLAN": [{"Plan": {"Plan Rows": 7}}]}]
+        self.assertEqual(plan_rows("postgres", postgres_plan), 7)
+        self.assertIsNone(plan_rows("postgres", [{"QUERY PLAN": "[]"}]))
+        self.assertIsNone(plan_rows("sqlite", [{"detail": "SCAN"}]))
+        self.assertIsNone(plan_rows("mysql", []))
+
+    def test_fallback_to_count(self):
+        async def run():
+            await Tortoise.init(
+                db_url="sqlite://:memory:",
+                modules={
+                    "master": ["storages.relational.models", __name__],
+                },
+            )
+            await Tortoise.generate_schemas()
+            try:
+                for i in range(5):
+                    await CursorItem.create(score=i, color=Color.red)
+                queryset = CursorItem.filter(score__gte=2)
+                self.assertEqual(await approximate_count(queryset), 3)
+            finally:
+                await Tortoise.close_connections()
+
+        asyncio.run(run())
@@ -0,0 +1,419 @@
+import csv
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import ujson
+from tortoise import fields
+from tortoise.models import Model
+from tortoise.queryset import QuerySet
+from tortoise.contrib.pydantic import pydantic_model_creator
+
+from common.utils import datetime_now
+from apis.http.curd import CURDGenerator, cursor_ordering
+from storages.enums import StatusEnum
+from common.pydantic import optional
+from tests.unit.apis.base import DBTestCase
+from storages.relational.models import Role, Account, Permission
+from storages.relational.pydantic.role import RoleList, RoleCreate
+from storages.relational.pydantic.account import AccountList
+from storages.relational.pydantic.permission import (
+    PermissionList,
+    PermissionCreate,
+    PermissionUpdate,
+)
+
+
+class ExportItem(Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=32)
+    score = fields.IntField(null=True)
+    tags = fields.JSONField(default=list)
+
+    class Meta:
+        table_description = "导出项"
+
+
+ExportItemList = pydantic_model_creator(ExportItem, name="ExportItemList")
+
+
+class RoleWithPermissionsCreate(RoleCreate):
+    permissions: list[uuid.UUID] = []
+
+
+@optional
+class RoleWithPermissionsUpdate(RoleWithPermissionsCreate):
+    pass
+
+
+def permission_router(**kwargs):
+    return CURDGenerator(
+        schema=PermissionList,
+        db_model=Permission,
+        prefix="permission/",
+        create_schema=PermissionCreate,
+        update_schema=PermissionUpdate,
+        **kwargs,
+    )
+
+
+def role_router(**kwargs):
+    return CURDGenerator(
+        schema=RoleList,
+        db_model=Role,
+        prefix="role/",
+        create_schema=RoleWithPermissionsCreate,
+        update_schema=RoleWithPermissionsUpdate,
+        **kwargs,
+    )
+
+
+class TestBulkRoutes(DBTestCase):
+    def bulk_routers(self):
+        return (
+            permission_router(
+                bulk_create_route=True,
+                bulk_upsert_route=True,
+                upsert_key="code",
+                bulk_chunk_size=2,
+            ),
+            role_router(bulk_create_route=True, bulk_update_route=True),
+        )
+
+    async def codes(self):
+        return set(await Permission.all().values_list("code", flat=True))
+
+    def test_create_partial_failure(self):
+        async def run():
+            await Permission.create(code="p0", label="P0")
+            async with self.client(*self.bulk_routers()) as client:
+                response = await client.post(
+                    "/permission/bulk",
+                    json=[
+                        {"code": "p1", "label": "P1"},
+                        {"code": "p0", "label": "duplicated"},
+                        {"code": "p2", "label": "P2"},
+                        {"code": "p3", "label": "P3"},
+                    ],
+                )
+            result = response.json()["data"]
+            self.assertEqual(result["succeeded"], 2)
+            self.assertEqual(result["failed"], 2)
+            # 唯一键冲突时整个分片回滚, p1 也未写入
+            self.assertEqual([e["index"] for e in result["errors"]], [0, 1])
+            self.assertEqual(await self.codes(), {"p0", "p2", "p3"})
+
+        self.run_with_db(run)
+
+    def test_upsert(self):
+        async def run():
+            existing = await Permission.create(code="p0", label="P0")
+            async with self.client(*self.bulk_routers()) as client:
+                response = await client.post(
+                    "/permission/bulk/upsert",
+                    json=[
+                        {"code": "p0", "label": "updated"},
+                        {"code": "p1", "label": "created"},
+                        {"code": "p1", "label": "duplicated"},
+                    ],
+                )
+            result = response.json()["data"]
+            self.assertEqual(result["succeeded"], 2)
+            self.assertEqual([e["index"] for e in result["errors"]], [2])
+            self.assertEqual(await self.codes(), {"p0", "p1"})
+            await existing.refresh_from_db()
+            self.assertEqual(existing.label, "updated")
+            created = await Permission.get(code="p1")
+            self.assertEqual(created.label, "created")
+
+        self.run_with_db(run)
+
+    def test_m2m(self):
+        async def run():
+            a = await Permission.create(code="a", label="A")
+            b = await Permission.create(code="b", label="B")
+            c = await Permission.create(code="c", label="C")
+            missing = uuid.uuid4()
+            async with self.client(*self.bulk_routers()) as client:
+                response = await client.post(
+                    "/role/bulk",
+                    json=[
+                        {
+                            "code": "r1",
+                            "label": "R1",
+                            "permissions": [str(a.id), str(b.id)],
+                        },
+                        {
+                            "code": "r2",
+                            "label": "R2",
+                            "permissions": [str(missing)],
+                        },
+                    ],
+                )
+                result = response.json()["data"]
+                self.assertEqual(result["succeeded"], 1)
+                self.assertEqual(len(result["errors"]), 1)
+                self.assertEqual(result["errors"][0]["index"], 1)
+                self.assertIn(str(missing), result["errors"][0]["message"])
+
+                role = await Role.get(code="r1")
+                updated_at = role.updated_at
+                # 已有的 a 不重复写入, 只新增 c
+                response = await client.put(
+                    "/role/bulk",
+                    json=[
+                        {
+                            "id": str(role.id),
+                            "label": "R1'",
+                            "permissions": [str(a.id), str(c.id)],
+                        },
+                        {"id": str(uuid.uuid4()), "label": "missing"},
+                    ],
+                )
+            result = response.json()["data"]
+            self.assertEqual(result["succeeded"], 1)
+            self.assertEqual([e["index"] for e in result["errors"]], [1])
+            self.assertFalse(await Role.filter(code="r2").exists())
+            await role.refresh_from_db()
+            self.assertEqual(role.label, "R1'")
+            # bulk_update 同时写入 auto_now 字段
+            self.assertGreater(role.updated_at, updated_at)
+            codes = await role.permissions.all().values_list("code", flat=True)
+            self.assertEqual(sorted(codes), ["a", "b", "c"])
+
+        self.run_with_db(run)
+
+
+class TestExportRoute(DBTestCase):
+    modules = (__name__,)
+
+    def export(self, **params):
+        async def request():
+            router = CURDGenerator(
+                schema=ExportItemList,
+                db_model=ExportItem,
+                prefix="item/",
+                export_route=True,
+                export_chunk_size=2,
+            )
+            async with self.client(router) as client:
+                response = await client.get("/item/export", params=params)
+            self.assertEqual(response.status_code, 200)
+            return response.text
+
+        return request()
+
+    async def create_items(self):
+        # 分片大小为 2, NULL 排序值跨越分片边界
+        scores = [None, 2, None, 1, 2, None, 3]
+        for i, score in enumerate(scores):
+            await ExportItem.create(
+                id=i + 1,
+                name=f"item-{i + 1}",
+                score=score,
+                tags=["a", i] if i % 2 else [],
+            )
+
+    async def expected(self, order_by):
+        ordering = cursor_ordering(order_by)
+        return await ExportItem.all().order_by(*ordering).values()
+
+    def test_ndjson(self):
+        async def run():
+            await self.create_items()
+            for order_by in ({"score"}, {"-score"}, {"name", "-score"}):
+                text = await self.export(order_by=sorted(order_by))
+                rows = [ujson.loads(line) for line in text.splitlines()]
+                self.assertEqual(rows, await self.expected(order_by))
+
+        self.run_with_db(run)
+
+    def test_csv(self):
+        async def run():
+            await self.create_items()
+            text = await self.export(format="csv", order_by=["-score"])
+            header, *rows = csv.reader(text.splitlines())
+            self.assertEqual(header, ["id", "name", "score", "tags"])
+            expected = [
+                [
+                    str(item["id"]),
+                    item["name"],
+                    "" if item["score"] is None else str(item["score"]),
+                    ujson.dumps(item["tags"]),
+                ]
+                for item in await self.expected({"-score"})
+            ]
+            self.assertEqual(rows, expected)
+
+        self.run_with_db(run)
+
+    def test_selected_fields(self):
+        async def run():
+            await self.create_items()
+            text = await self.export(selected_fields=["name"])
+            rows = [ujson.loads(line) for line in text.splitlines()]
+            expected = (
+                await ExportItem.all().order_by("id").values("id", "name")
+            )
+            self.assertEqual(rows, expected)
+
+        self.run_with_db(run)
+
+
+class TestCountCache(DBTestCase):
+    modules = (__name__,)
+
+    def router(self, **kwargs):
+        return CURDGenerator(
+            schema=ExportItemList,
+            db_model=ExportItem,
+            prefix="item/",
+            search_fields=["name"],
+            **kwargs,
+        )
+
+    async def create_items(self, count):
+        for i in range(count):
+            await ExportItem.create(name=f"item-{i}", score=i)
+
+    async def page_info(self, client, **params):
+        response = await client.get("/item", params=params)
+        return response.json()["page_info"]
+
+    def test_cache_hit_and_invalidation(self):
+        async def run():
+            await self.create_items(3)
+            router = self.router(count_cache_ttl=60)
+            with mock.patch.object(
+                router,
+                "_count_from_db",
+                wraps=router._count_from_db,
+            ) as count_from_db:
+                async with self.client(router) as client:
+                    info = await self.page_info(client)
+                    self.assertEqual(info["total_count"], 3)
+                    info = await self.page_info(client, page=2, size=2)
+                    self.assertEqual(info["total_count"], 3)
+                    # 分页参数不影响过滤条件, 第二次命中缓存
+                    self.assertEqual(count_from_db.call_count, 1)
+                    # 其他过滤条件使用不同的 key
+                    info = await self.page_info(client, search="item-1")
+                    self.assertEqual(info["total_count"], 1)
+                    self.assertEqual(count_from_db.call_count, 2)
+
+                    # 不经过路由的写入在缓存过期前不可见
+                    await ExportItem.create(name="direct")
+                    info = await self.page_info(client)
+                    self.assertEqual(info["total_count"], 3)
+                    # 经过路由的写入自增版本号, 旧缓存失效
+                    await client.post(
+                        "/item",
+                        json={"name": "created", "score": 9, "tags": []},
+                    )
+                    info = await self.page_info(client)
+                    self.assertEqual(info["total_count"], 5)
+                    self.assertEqual(count_from_db.call_count, 3)
+
+        self.run_with_db(run)
+
+    def test_count_mode(self):
+        async def run():
+            await self.create_items(3)
+            for count_mode, total in (
+                ("exact", 3),
+                ("approximate", 3),
+                ("none", None),
+            ):
+                router = self.router(count_mode=count_mode)
+                async with self.client(router) as client:
+                    info = await self.page_info(client, size=2)
+                self.assertEqual(info["total_count"], total, count_mode)
+                self.assertEqual(
+                    info["total_page"],
+                    None if total is None else 2,
+                )
+
+        self.run_with_db(run)
+
+
+class TestFetchProjection(DBTestCase):
+    def rows(self, **params):
+        async def request():
+            router = CURDGenerator(
+                schema=AccountList,
+                db_model=Account,
+                prefix="account/",
+            )
+            with mock.patch.object(
+                QuerySet,
+                "values_list",
+                autospec=True,
+                side_effect=QuerySet.values_list,
+            ) as values_list:
+                async with self.client(router) as client:
+                    response = await client.get("/account", params=params)
+            self.assertEqual(response.status_code, 200)
+            return response.json()["data"], values_list.called
+
+        return request()
+
+    async def create_accounts(self):
+        await Account.create(
+            username="a",
+            nickname="A",
+            password="secret",
+            last_login_at=datetime_now() - timedelta(days=3),
+        )
+        await Account.create(
+            username="b",
+            nickname="B",
+            password="secret",
+            status=StatusEnum.disable,
+        )
+
+    def assert_projection(self, data, full, fields):
+        expected = [
+            {k: v for k, v in item.items() if k in {"id", *fields}}
+            for item in full
+        ]
+        self.assertEqual(data, expected)
+
+    def test_db_fields(self):
+        async def run():
+            await self.create_accounts()
+            full, projected = await self.rows(order_by=["username"])
+            self.assertFalse(projected)
+            # 日期、枚举与 uuid 列与完整查询的输出一致
+            fields = ["username", "status", "last_login_at", "created_at"]
+            data, projected = await self.rows(
+                order_by=["username"],
+                selected_fields=fields,
+            )
+            self.assertTrue(projected)
+            self.assert_projection(data, full, fields)
+
+            # 响应模型排除的列不会被查询出来
+            data, projected = await self.rows(
+                order_by=["username"],
+                selected_fields=["username", "password"],
+            )
+            self.assertTrue(projected)
+            self.assert_projection(data, full, ["username"])
+
+        self.run_with_db(run)
+
+    def test_computed_fields(self):
+        async def run():
+            await self.create_accounts()
+            full, _ = await self.rows(order_by=["username"])
+            fields = ["username", "days_from_last_login", "status_display"]
+            data, projected = await self.rows(
+                order_by=["username"],
+                selected_fields=fields,
+            )
+            # 计算字段退回完整查询
+            self.assertFalse(projected)
+            self.assert_projection(data, full, fields)
+            self.assertEqual(data[0]["days_from_last_login"], 3)
+
+        self.run_with_db(run)
@@ -0,0 +1,175 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from tortoise import Tortoise, fields
+from tortoise.models import Model
+
+from apis.http.curd.search import NgramSearchBackend, FullTextSearchBackend
+
+
+class SearchItem(Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=32)
+
+
+class SearchTestCase(unittest.TestCase):
+    def run_with_db(self, func):
+        async def run():
+            # storages.relational.models 导入时已注册 master app
+            await Tortoise.init(
+                db_url="sqlite://:memory:",
+                modules={
+                    "master": ["storages.relational.models", __name__],
+                },
+            )
+            await Tortoise.generate_schemas()
+            try:
+                for i in range(7):
+                    await SearchItem.create(id=i + 1, name=f"item-{i + 1}")
+                await func()
+            finally:
+                await Tortoise.close_connections()
+
+        asyncio.run(run())
+
+    def bind(self, backend):
+        backend.bind(
+            SimpleNamespace(db_model=SearchItem, search_fields={"name"}),
+        )
+        return backend
+
+    async def ids(self, queryset):
+        return sorted(await queryset.values_list("id", flat=True))
+
+
+class TestNgramSearchBackend(SearchTestCase):
+    def backend(self, **kwargs):
+        return self.bind(NgramSearchBackend(**kwargs))
+
+    def test_build_in_batches(self):
+        async def run():
+            backend = self.backend(batch_size=2)
+            await backend._build()
+            self.assertEqual(backend.search_ids("item"), set("1234567"))
+            self.assertEqual(backend.search_ids("m-7"), {"7"})
+
+        self.run_with_db(run)
+
+    def test_fallback_when_too_many_rows(self):
+        async def run():
+            backend = self.backend(max_rows=5)
+            await backend._build()
+            self.assertIsNone(backend._texts)
+
+        self.run_with_db(run)
+
+    def test_cap_matches(self):
+        async def run():
+            backend = self.backend(max_matches=3)
+            queryset, capped = await backend.filter(SearchItem.all(), "item")
+            self.assertTrue(capped)
+            self.assertEqual(await self.ids(queryset), [1, 2, 3])
+            queryset, capped = await backend.filter(SearchItem.all(), "m-7")
+            self.assertFalse(capped)
+            self.assertEqual(await self.ids(queryset), [7])
+
+        with mock.patch(
+            "apis.http.curd.search.get_cache_version",
+            mock.AsyncMock(return_value=1),
+        ):
+            self.run_with_db(run)
+
+    def test_rebuild_interval(self):
+        version = mock.AsyncMock(return_value=1)
+
+        async def run():
+            backend = self.backend(rebuild_interval=3600)
+            await backend.filter(SearchItem.all(), "item")
+            await SearchItem.create(id=8, name="item-8")
+            version.return_value = 2
+            # 间隔内不重建, 沿用旧索引
+            with mock.patch.object(backend, "_build") as build:
+                queryset, _ = await backend.filter(SearchItem.all(), "m-8")
+                build.assert_not_called()
+            self.assertEqual(await self.ids(queryset), [])
+            backend.rebuild_interval = 0
+            queryset, _ = await backend.filter(SearchItem.all(), "m-8")
+            self.assertEqual(await self.ids(queryset), [8])
+
+        with mock.patch("apis.http.curd.search.get_cache_version", version):
+            self.run_with_db(run)
+
+
+class FakeConnection:
+    def __init__(self, dialect, ids):
+        self.capabilities = SimpleNamespace(dialect=dialect)
+        self.ids = ids
+        self.queries = []
+
+    async def execute_query(self, sql, params):
+        self.queries.append((sql, params))
+        return len(self.ids), [{"id": pk} for pk in self.ids]
+
+
+class TestFullTextSearchBackend(SearchTestCase):
+    def backend(self, **kwargs):
+        return self.bind(FullTextSearchBackend(**kwargs))
+
+    def test_fallback_to_contains(self):
+        async def run():
+            backend = self.backend()
+            queryset, capped = await backend.filter(SearchItem.all(), "M-7")
+            self.assertFalse(capped)
+            self.assertEqual(await self.ids(queryset), [7])
+
+        self.run_with_db(run)
+
+    def test_match_query(self):
+        async def run():
+            backend = self.backend(max_matches=2)
+            for dialect, ids, expected in (
+                ("mysql", [3], "MATCH(`name`) AGAINST"),
+                ("postgres", [5, 4], "plainto_tsquery('simple', $1)"),
+            ):
+                connection = FakeConnection(dialect, ids)
+                # queryset 创建时绑定连接, 需在替换 db 之前创建
+                queryset = SearchItem.all()
+                # MetaInfo.db 是 property, 只能在类上替换
+                with mock.patch.object(
+                    type(SearchItem._meta),
+                    "db",
+                    new_callable=mock.PropertyMock,
+                    return_value=connection,
+                ):
+                    queryset, capped = await backend.filter(queryset, "item")
+                sql, params = connection.queries[0]
+                self.assertIn(expected, sql)
+                self.assertIn("LIMIT 2", sql)
+                self.assertIn("item", params)
+                self.assertEqual(capped, len(ids) >= 2)
+                self.assertEqual(await self.ids(queryset), sorted(ids))
+
+        self.run_with_db(run)
+
+    def test_migration_sql(self):
+        upgrade, downgrade = FullTextSearchBackend.migration_sql(
+            "item",
+            ("name", "code"),
+            "mysql",
+        )
+        self.assertIn("FULLTEXT INDEX `ftx_item` (`name`, `code`)", upgrade)
+        self.assertIn("WITH PARSER ngram", upgrade)
+        self.assertEqual(
+            downgrade, "ALTER TABLE `item` DROP INDEX `ftx_item`;"
+        )
+        upgrade, downgrade = FullTextSearchBackend.migration_sql(
+            "item",
+            ("name",),
+            "postgresql",
+        )
+        self.assertIn(
+            "USING GIN (to_tsvector('simple', coalesce(\"name\"", upgrade
+        )
+        self.assertEqual(downgrade, 'DROP INDEX IF EXISTS "ftx_item";')
@@ -0,0 +1,87 @@
+import os
+import json
+import select
+import tempfile
+import unittest
+from unittest import mock
+
+from loguru import logger
+
+from common.loguru import BatchedJsonSink, json_log, serialize
+
+
+class TestBatchedJsonSink(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "app.log")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def add_sink(self, **kwargs):
+        sink = BatchedJsonSink(path=self.path, **kwargs)
+        return sink, logger.add(sink, format="{message}")
+
+    def read_logs(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_json_log_payload(self):
+        _, handler_id = self.add_sink()
+        with mock.patch("common.loguru.fast_literal_eval") as literal_eval:
+            json_log({"uri": "/", "codes": [1, 2]}, name="request")
+            logger.info("plain")
+            logger.remove(handler_id)
+        literal_eval.assert_not_called()
+        payload, plain = self.read_logs()
+        self.assertEqual(payload["message"], {"uri": "/", "codes": [1, 2]})
+        self.assertEqual(payload["name"], "request")
+        self.assertNotIn("payload", payload)
+        self.assertIn(":test_json_log_payload:", payload["location"])
+        self.assertEqual(plain["message"], "plain")
+
+    def test_legacy_json_message(self):
+        message = mock.Mock(
+            record={
+                "name": "m",
+                "level": mock.Mock(name="INFO"),
+                "time": mock.Mock(strftime=lambda _: "t"),
+                "message": "{'a': 1}",
+                "extra": {"json": True},
+                "function": "f",
+                "line": 1,
+            },
+        )
+        self.assertEqual(serialize(message.record)["message"], {"a": 1})
+
+    def test_backpressure(self):
+        # 后台线程不主动写入, 队列只会增长
+        sink, handler_id = self.add_sink(
+            queue_size=10,
+            batch_size=100,
+            flush_interval=60,
+            high_watermark=0.5,
+            overflow="drop",
+        )
+        for i in range(20):
+            logger.info(f"info {i}")
+        logger.error("error")
+        self.assertEqual(len(sink._queue), 6)
+        self.assertEqual(sink.dropped, 15)
+        logger.remove(handler_id)
+        logs = self.read_logs()
+        self.assertEqual(logs[0]["dropped"], 15)
+        self.assertEqual(
+            [log["message"] for log in logs[1:]],
+            [f"info {i}" for i in range(5)] + ["error"],
+        )
+
+    def test_write_chunks(self):
+        sink = BatchedJsonSink(path=self.path)
+        sink._start()
+        self.addCleanup(sink.stop)
+        writes = []
+        with mock.patch.object(sink, "_write_bytes", writes.append):
+            sink._write(["x" * 1000] * 10)
+        self.assertTrue(all(len(w) <= select.PIPE_BUF for w in writes))
+        self.assertEqual(b"".join(writes), (b"x" * 1000 + b"\n") * 10)
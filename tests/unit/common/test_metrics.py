@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from common import metrics
+from conf.config import local_configs
+from common.metrics import Histogram, MetricsStore
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.patcher = mock.patch.object(
+            local_configs.METRICS,
+            "MULTIPROCESS_DIR",
+            self.tmpdir.name,
+        )
+        self.patcher.start()
+        metrics._store_pid = None
+        self.histogram = Histogram(
+            "test_duration_seconds",
+            "test",
+            ("route",),
+            buckets=(0.1, 1.0),
+        )
+
+    def tearDown(self):
+        metrics.REGISTRY.pop(self.histogram.name)
+        metrics.get_store().close()
+        metrics._store_pid = None
+        self.patcher.stop()
+        self.tmpdir.cleanup()
+
+    def worker_store(self, pid):
+        path = os.path.join(self.tmpdir.name, f"metrics_{pid}.db")
+        return MetricsStore(path)
+
+    def observe(self, store, route, value):
+        start = store.slot(self.histogram.name, (route,), 4)
+        store.add(start + (0 if value <= 0.1 else 1 if value <= 1 else 2), 1)
+        store.add(start + 3, value)
+
+    def test_exposition(self):
+        self.histogram.observe(0.05, "/a")
+        self.histogram.observe(0.5, "/a")
+        self.histogram.observe(5, "/a")
+        output = metrics.generate_latest()
+        self.assertIn("# TYPE test_duration_seconds histogram", output)
+        self.assertIn(
+            'test_duration_seconds_bucket{route="/a",le="0.1"} 1',
+            output,
+        )
+        self.assertIn(
+            'test_duration_seconds_bucket{route="/a",le="1"} 2',
+            output,
+        )
+        self.assertIn(
+            'test_duration_seconds_bucket{route="/a",le="+Inf"} 3',
+            output,
+        )
+        self.assertIn('test_duration_seconds_count{route="/a"} 3', output)
+        self.assertIn('test_duration_seconds_sum{route="/a"} 5.55', output)
+
+    def test_aggregate_workers(self):
+        stores = [self.worker_store(pid) for pid in (1, 2)]
+        for store in stores:
+            self.observe(store, "/a", 0.5)
+        self.observe(stores[1], "/b", 0.01)
+        values = metrics.collect()
+        self.assertEqual(values[(self.histogram.name, ("/a",))], [0, 2, 0, 1])
+        self.assertEqual(values[(self.histogram.name, ("/b",))][0], 1)
+
+        stores[0].close()
+        metrics.mark_process_dead(1)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.tmpdir.name, "metrics_1.db")),
+        )
+        self.observe(stores[1], "/a", 0.5)
+        values = metrics.collect()
+        self.assertEqual(
+            values[(self.histogram.name, ("/a",))],
+            [0, 3, 0, 1.5],
+        )
+        stores[1].close()
+
+    def test_store_grow_and_reopen(self):
+        store = self.worker_store(3)
+        routes = [f"/route/{i}" for i in range(2000)]
+        for route in routes:
+            self.observe(store, route, 0.01)
+        self.assertGreater(len(store._buf), metrics.INITIAL_SIZE)
+        store.close()
+
+        store = self.worker_store(3)
+        self.observe(store, routes[-1], 0.01)
+        entries = dict(store.entries())
+        self.assertEqual(len(entries), len(routes))
+        self.assertEqual(
+            entries[f'["{self.histogram.name}", ["{routes[-1]}"]]'][0],
+            2,
+        )
+        store.close()
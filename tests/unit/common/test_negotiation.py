@@ -0,0 +1,115 @@
+import gzip
+import asyncio
+import unittest
+from unittest import mock
+
+import msgpack
+from fastapi import FastAPI
+from starlette_context import request_cycle_context
+from starlette.responses import Response
+from starlette.testclient import TestClient
+
+from conf.config import Project, local_configs
+from common.context import ContextKeyEnum
+from common.fastapi import RespSchemaAPIRouter
+from common.responses import MsgPackAesResponse
+from common.negotiation import (
+    COMPRESSORS,
+    THREADPOOL_COMPRESS_MIN_SIZE,
+    accepts_msgpack,
+    select_encoding,
+    compress_response,
+    parse_quality_values,
+)
+
+
+class TestNegotiation(unittest.TestCase):
+    def test_parse_quality_values(self):
+        self.assertEqual(
+            parse_quality_values("application/json;q=0.5, */*;q=bad, gzip"),
+            {"application/json": 0.5, "*/*": 0.0, "gzip": 1.0},
+        )
+        self.assertEqual(parse_quality_values(None), {})
+
+    def test_accepts_msgpack(self):
+        self.assertFalse(accepts_msgpack(None))
+        self.assertFalse(accepts_msgpack("*/*"))
+        self.assertTrue(accepts_msgpack("application/msgpack"))
+        self.assertTrue(accepts_msgpack("application/x-msgpack, */*;q=0.1"))
+        self.assertTrue(
+            accepts_msgpack("application/msgpack, application/json"),
+        )
+        self.assertFalse(
+            accepts_msgpack("application/msgpack;q=0.5, application/json"),
+        )
+        self.assertFalse(accepts_msgpack("application/msgpack;q=0"))
+
+    def test_select_encoding(self):
+        self.assertIsNone(select_encoding(None))
+        self.assertIsNone(select_encoding("identity"))
+        self.assertEqual(select_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(select_encoding("*"), next(iter(COMPRESSORS)))
+        self.assertIsNone(select_encoding("gzip;q=0"))
+
+    def test_compress_response(self):
+        body = b'{"data": "' + b"x" * 2048 + b'"}'
+        response = Response(body, media_type="application/json")
+        compress_response(response, "gzip")
+        self.assertEqual(gzip.decompress(response.body), body)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(
+            response.headers["content-length"],
+            str(len(response.body)),
+        )
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+
+    def test_msgpack_aes_response(self):
+        with request_cycle_context({ContextKeyEnum.request_id.value: "id"}):
+            response = MsgPackAesResponse({"code": 0, "data": [1, "a"]})
+        content = msgpack.unpackb(response.body)
+        self.assertEqual(content["data"], [1, "a"])
+        self.assertEqual(content["trace_id"], "id")
+        self.assertIn("response_time", content)
+        self.assertEqual(response.media_type, "application/msgpack")
+
+
+class TestRouterCompression(unittest.TestCase):
+    def test_disabled_by_default(self):
+        self.assertFalse(Project.__fields__["MSGPACK_NEGOTIATION"].default)
+        self.assertIsNone(Project.__fields__["COMPRESS_MIN_SIZE"].default)
+
+    def test_large_body_in_threadpool(self):
+        with mock.patch.object(local_configs.PROJECT, "COMPRESS_MIN_SIZE", 64):
+            app = FastAPI()
+            app.router.route_class = RespSchemaAPIRouter
+
+            @app.get("/items")
+            async def items(size: int):
+                return {"data": "x" * size}
+
+        in_event_loop = []
+
+        def record(response, encoding):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                in_event_loop.append(False)
+            else:
+                in_event_loop.append(True)
+            compress_response(response, encoding)
+
+        client = TestClient(app)
+        with mock.patch("common.fastapi.compress_response", record):
+            for size in (8, 1024, THREADPOOL_COMPRESS_MIN_SIZE):
+                response = client.get(
+                    "/items",
+                    params={"size": size},
+                    headers={"Accept-Encoding": "gzip"},
+                )
+                self.assertEqual(response.json(), {"data": "x" * size})
+                self.assertEqual(
+                    response.headers.get("content-encoding"),
+                    None if size == 8 else "gzip",
+                )
+        # 小响应体在事件循环中压缩, 大响应体在线程池中压缩
+        self.assertEqual(in_event_loop, [True, False])
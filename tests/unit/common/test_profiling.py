@@ -0,0 +1,139 @@
+import os
+import asyncio
+import tempfile
+import unittest
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from common import profiling
+from conf.config import BASE_DIR, local_configs
+from common.profiling import StackAggregator
+
+
+def identifier(function, path, line_no, class_name=None):
+    value = f"{function}\x00{path}\x00{line_no}"
+    if class_name:
+        value += f"\x01c{class_name}"
+    return value + "\x01l10"
+
+
+LOOP = identifier("run_forever", "/usr/lib/asyncio/base_events.py", 1)
+MIDDLEWARE = identifier("__call__", f"{BASE_DIR}/core/middlewares.py", 2, "M")
+VIEW = identifier("view", f"{BASE_DIR}/apis/views.py", 3)
+QUERY = identifier("query", "/site-packages/tortoise/queryset.py", 4)
+
+
+def session(*records):
+    return SimpleNamespace(
+        start_call_stack=[LOOP, MIDDLEWARE],
+        frame_records=list(records),
+    )
+
+
+class TestStackAggregator(unittest.TestCase):
+    def test_frame_name(self):
+        self.assertEqual(
+            profiling._frame_name(MIDDLEWARE),
+            "M.__call__ (core/middlewares.py:2)",
+        )
+        self.assertEqual(
+            profiling._frame_name(QUERY),
+            "query (tortoise/queryset.py:4)",
+        )
+
+    def test_add(self):
+        aggregator = StackAggregator(max_stacks=10)
+        aggregator.add(
+            "/items/{pk}",
+            session(
+                ([LOOP, MIDDLEWARE, VIEW], 0.001),
+                ([LOOP, MIDDLEWARE, VIEW, QUERY], 0.002),
+            ),
+        )
+        aggregator.add(
+            "/items/{pk}",
+            session(([LOOP, MIDDLEWARE, VIEW], 0.003)),
+        )
+        self.assertEqual(
+            profiling.format_collapsed(aggregator.stacks),
+            "/items/{pk};view (apis/views.py:3) 4000\n"
+            "/items/{pk};view (apis/views.py:3);"
+            "query (tortoise/queryset.py:4) 2000\n",
+        )
+
+    def test_max_stacks(self):
+        aggregator = StackAggregator(max_stacks=1)
+        aggregator.add("/a", session(([LOOP, MIDDLEWARE, VIEW], 0.001)))
+        aggregator.add("/a", session(([LOOP, MIDDLEWARE, QUERY], 0.001)))
+        self.assertIn(
+            f"/a;{profiling.TRUNCATED_FRAME}",
+            aggregator.stacks,
+        )
+        self.assertEqual(len(aggregator.stacks), 2)
+
+
+class TestSampling(unittest.TestCase):
+    def test_route_sample_rate(self):
+        with mock.patch.multiple(
+            local_configs.PROFILING,
+            SAMPLE_RATE=0.01,
+            ROUTE_SAMPLE_RATES={"/hot": 0.5},
+        ):
+            self.assertEqual(profiling.max_sample_rate(), 0.5)
+            self.assertEqual(profiling.sample_rate("/hot"), 0.5)
+            self.assertEqual(profiling.sample_rate("/other"), 0.01)
+            with mock.patch("random.random", return_value=0.1):
+                self.assertTrue(profiling.should_start())
+                self.assertTrue(profiling.should_keep("/hot"))
+                # 0.1 * 0.5 >= 0.01
+                self.assertFalse(profiling.should_keep("/other"))
+
+    def test_collect_workers(self):
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(
+            local_configs.PROFILING,
+            "SAMPLE_DIR",
+            tmpdir,
+        ):
+            with open(os.path.join(tmpdir, "profile_1.folded"), "w") as f:
+                f.write("/a;view 10\n/b;view 5\n")
+            profiling._aggregator_for.cache_clear()
+            aggregator = profiling.get_aggregator()
+            aggregator.add("/a", session(([LOOP, MIDDLEWARE, VIEW], 0.001)))
+            output = profiling.collect_collapsed()
+            self.assertIn("/a;view 10\n", output)
+            self.assertIn("/a;view (apis/views.py:3) 1000\n", output)
+            self.assertEqual(profiling.collect_collapsed("/b"), "/b;view 5\n")
+            profiling._aggregator_for.cache_clear()
+
+    def test_record_flush_off_loop(self):
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(
+            local_configs.PROFILING,
+            "SAMPLE_DIR",
+            tmpdir,
+        ):
+            profiling._aggregator_for.cache_clear()
+            aggregator = profiling.get_aggregator()
+            aggregator._flushed_at -= profiling.FLUSH_INTERVAL
+            write = aggregator.write
+            threads = []
+
+            def write_in_thread(stacks):
+                threads.append(threading.get_ident())
+                write(stacks)
+
+            async def run():
+                with mock.patch.object(aggregator, "write", write_in_thread):
+                    profiling.record(
+                        "/a",
+                        session(([LOOP, MIDDLEWARE, VIEW], 0.001)),
+                    )
+                return threading.get_ident()
+
+            loop_thread = asyncio.run(run())
+            self.assertEqual(len(threads), 1)
+            self.assertNotEqual(threads[0], loop_thread)
+            path = os.path.join(tmpdir, f"profile_{os.getpid()}.folded")
+            with open(path) as f:
+                self.assertIn("/a;view (apis/views.py:3) 1000\n", f.read())
+            profiling._aggregator_for.cache_clear()
@@ -0,0 +1,31 @@
+import unittest
+
+from pydantic import BaseModel
+
+from common.pydantic import sub_fields_model, derived_model_cache_stats
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    label: str
+
+
+class TestSubFieldsModel(unittest.TestCase):
+    def test_sub_fields(self):
+        model = sub_fields_model(Item, ["id", "name"])
+        self.assertEqual(set(model.__fields__), {"id", "name"})
+
+    def test_memoized(self):
+        hits = derived_model_cache_stats()["hits"]
+        model = sub_fields_model(Item, ["id", "label"])
+        self.assertIs(model, sub_fields_model(Item, {"label", "id"}))
+        # 不存在的字段不影响缓存 key
+        self.assertIs(model, sub_fields_model(Item, ["id", "label", "x"]))
+        self.assertEqual(derived_model_cache_stats()["hits"], hits + 2)
+
+    def test_same_fields_hit(self):
+        sub_fields_model(Item, ["name", "label"])
+        hits = derived_model_cache_stats()["hits"]
+        sub_fields_model(Item, ["name", "label"])
+        self.assertEqual(derived_model_cache_stats()["hits"], hits + 1)
@@ -0,0 +1,63 @@
+import enum
+import uuid
+import unittest
+from typing import Optional
+from decimal import Decimal
+from datetime import date, datetime
+
+from pydantic import Field, BaseModel
+from fastapi.encoders import jsonable_encoder
+
+from common.pydantic import DateTimeFormatConfig
+from common.serializer import to_jsonable
+
+
+class Color(str, enum.Enum):
+    red = "red"
+
+
+class Item(BaseModel):
+    id: uuid.UUID
+    color: Color
+    price: Decimal
+    created_at: datetime
+    birthday: date
+    tags: set[str]
+    item_name: str = Field(alias="name")
+    extra: Optional[dict] = None
+
+
+class Page(BaseModel):
+    data: list[Item]
+    total: int
+
+    class Config(DateTimeFormatConfig):
+        ...
+
+
+class TestToJsonable(unittest.TestCase):
+    def test_same_as_jsonable_encoder(self):
+        page = Page(
+            data=[
+                Item(
+                    id=uuid.uuid4(),
+                    color=Color.red,
+                    price=Decimal("1.5"),
+                    created_at=datetime(2023, 1, 1, 8, 0, 0),
+                    birthday=date(2000, 1, 1),
+                    tags={"a"},
+                    name="item",
+                    extra={"k": [1, 2]},
+                ),
+            ],
+            total=1,
+        )
+        encoders = Page.Config.json_encoders
+        self.assertEqual(
+            to_jsonable(page, encoders),
+            jsonable_encoder(page.dict(), custom_encoder=encoders),
+        )
+        self.assertEqual(
+            to_jsonable(page, encoders)["data"][0]["created_at"],
+            "2023-01-01 08:00:00",
+        )
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from common.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_coalesce_concurrent_calls(self):
+        async def run():
+            singleflight = SingleFlight()
+            calls = 0
+
+            async def func():
+                nonlocal calls
+                calls += 1
+                await asyncio.sleep(0.01)
+                return calls
+
+            results = await asyncio.gather(
+                *[singleflight.do("key", func) for _ in range(5)],
+            )
+            self.assertEqual(results, [1] * 5)
+            self.assertEqual(calls, 1)
+            self.assertEqual(singleflight.metrics["shared"], 4)
+            self.assertEqual(singleflight.metrics["inflight"], 0)
+
+        asyncio.run(run())
+
+    def test_share_exception(self):
+        async def run():
+            singleflight = SingleFlight()
+
+            async def func():
+                await asyncio.sleep(0.01)
+                raise ValueError("error")
+
+            results = await asyncio.gather(
+                *[singleflight.do("key", func) for _ in range(3)],
+                return_exceptions=True,
+            )
+            for result in results:
+                self.assertIsInstance(result, ValueError)
+
+        asyncio.run(run())
+
+    def test_different_keys_not_coalesced(self):
+        async def run():
+            singleflight = SingleFlight()
+
+            async def func():
+                await asyncio.sleep(0.01)
+                return 1
+
+            await asyncio.gather(
+                singleflight.do("a", func),
+                singleflight.do("b", func),
+            )
+            self.assertEqual(singleflight.metrics["calls"], 2)
+
+        asyncio.run(run())
+
+    def test_cancelled_leader_not_cancel_followers(self):
+        async def run():
+            singleflight = SingleFlight()
+
+            async def func():
+                await asyncio.sleep(0.05)
+                return 1
+
+            leader = asyncio.ensure_future(singleflight.do("key", func))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(singleflight.do("key", func))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            self.assertEqual(await follower, 1)
+            self.assertTrue(leader.cancelled())
+            self.assertEqual(singleflight.metrics["calls"], 1)
+            self.assertEqual(singleflight.metrics["inflight"], 0)
+
+        asyncio.run(run())
@@ -0,0 +1,36 @@
+import unittest
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from conf.config import EnvironmentEnum
+from core.factory import setup_metrics_app
+
+
+class TestMetricsApp(unittest.TestCase):
+    def client(self, token, environment=EnvironmentEnum.production):
+        app = FastAPI()
+        settings = SimpleNamespace(
+            PROJECT=SimpleNamespace(ENVIRONMENT=environment.value),
+            METRICS=SimpleNamespace(PATH="/metrics", TOKEN=token),
+        )
+        setup_metrics_app(app, settings)
+        return TestClient(app)
+
+    def test_token_required(self):
+        client = self.client("token")
+        self.assertEqual(client.get("/metrics").status_code, 401)
+        response = client.get(
+            "/metrics",
+            headers={"Authorization": "Bearer token"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_token(self):
+        # 非开发环境未设置 TOKEN 时不挂载
+        for environment in (EnvironmentEnum.production, EnvironmentEnum.test):
+            client = self.client(None, environment)
+            self.assertEqual(client.get("/metrics").status_code, 404)
+        client = self.client(None, EnvironmentEnum.development)
+        self.assertEqual(client.get("/metrics").status_code, 200)
@@ -0,0 +1,162 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from starlette.routing import Route
+from starlette_context import context
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.testclient import TestClient
+from starlette.applications import Starlette
+
+from conf.config import local_configs
+from common.enums import ContextKeyEnum, ResponseHeaderKeyEnum
+from common.fastapi import RespSchemaAPIRouter
+from common.metrics import REQUEST_DURATION
+from core.middlewares import (
+    MetricsMiddleware,
+    ContextPureMiddleware,
+    SamplingProfilerMiddleware,
+)
+
+
+async def context_endpoint(request):
+    return JSONResponse(
+        {"request_id": context.get(ContextKeyEnum.request_id.value)},
+    )
+
+
+async def stream_endpoint(request):
+    async def body():
+        for i in range(3):
+            yield str(i).encode()
+
+    return StreamingResponse(body())
+
+
+class TestContextPureMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.app = Starlette(
+            routes=[
+                Route("/context", context_endpoint),
+                Route("/stream", stream_endpoint),
+            ],
+        )
+        self.app.add_middleware(ContextPureMiddleware)
+
+    def test_context_and_headers(self):
+        response = TestClient(self.app).get("/context")
+        request_id = response.headers[ResponseHeaderKeyEnum.request_id.value]
+        self.assertEqual(response.json()["request_id"], request_id)
+        self.assertIn(
+            ResponseHeaderKeyEnum.process_time.value,
+            response.headers,
+        )
+
+    def test_streaming_not_buffered(self):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/stream",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+        }
+        messages = []
+        received = asyncio.Event()
+
+        async def receive():
+            if received.is_set():
+                # 请求体读完后阻塞, 直到响应结束被取消
+                await asyncio.Event().wait()
+            received.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.app(scope, receive, send))
+        starts = [m for m in messages if m["type"] == "http.response.start"]
+        bodies = [
+            m["body"] for m in messages if m["type"] == "http.response.body"
+        ]
+        self.assertEqual(len(starts), 1)
+        self.assertEqual(bodies[:3], [b"0", b"1", b"2"])
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def test_route_template(self):
+        sub_app = FastAPI()
+        sub_app.router.route_class = RespSchemaAPIRouter
+
+        @sub_app.get("/items/{pk}")
+        async def item(pk: int):
+            return JSONResponse({"pk": pk})
+
+        app = Starlette()
+        app.mount("/sub", sub_app)
+        app.add_middleware(MetricsMiddleware)
+        app.add_middleware(ContextPureMiddleware)
+
+        with mock.patch.object(REQUEST_DURATION, "observe") as observe:
+            client = TestClient(app)
+            client.get("/sub/items/1")
+            client.get("/sub/missing/2")
+        self.assertEqual(
+            [c.args[1:] for c in observe.call_args_list],
+            [
+                ("GET", "/sub/items/{pk}", "200", ""),
+                ("GET", "/sub/*", "404", ""),
+            ],
+        )
+
+
+class TestSamplingProfilerMiddleware(unittest.TestCase):
+    def test_record_route(self):
+        app = FastAPI()
+        app.router.route_class = RespSchemaAPIRouter
+
+        @app.get("/items/{pk}")
+        async def item(pk: int):
+            await asyncio.sleep(0.01)
+            return JSONResponse({"pk": pk})
+
+        app.add_middleware(SamplingProfilerMiddleware)
+        with mock.patch.object(
+            local_configs.PROFILING,
+            "SAMPLE_RATE",
+            1,
+        ), mock.patch("core.middlewares.record") as record:
+            response = TestClient(app).get("/items/1")
+        self.assertEqual(response.json(), {"pk": 1})
+        route, session = record.call_args.args
+        self.assertEqual(route, "/items/{pk}")
+        self.assertTrue(session.frame_records)
+
+    def test_skip_when_request_profiled(self):
+        app = FastAPI()
+
+        @app.get("/items")
+        async def items():
+            return JSONResponse({})
+
+        app.add_middleware(SamplingProfilerMiddleware)
+        app.add_middleware(ContextPureMiddleware)
+        with mock.patch.object(
+            local_configs.PROFILING,
+            "SAMPLE_RATE",
+            1,
+        ), mock.patch.object(
+            local_configs.PROFILING,
+            "SECRET",
+            "secret",
+        ), mock.patch(
+            "core.middlewares.record",
+        ) as record:
+            response = TestClient(app).get(
+                "/items",
+                params={"profile": 1, "secret": "secret"},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/html", response.headers["content-type"])
+        record.assert_not_called()
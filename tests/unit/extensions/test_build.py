@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from extensions.cpp.eval import build
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        environ = {k: v for k, v in os.environ.items() if k != build.LIB_ENV}
+        environ[build.BUILD_DIR_ENV] = self.tmpdir.name
+        patcher = mock.patch.dict(os.environ, environ, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_no_compiler(self):
+        with mock.patch.object(
+            build,
+            "find_compiler",
+            return_value=None,
+        ), mock.patch.object(build, "PREBUILT", Path("/nonexistent.so")):
+            with self.assertLogs(build.logger, "WARNING") as logs:
+                self.assertIsNone(build.ensure_lib())
+        self.assertIn("no C++ compiler found", logs.output[0])
+
+    def test_broken_compiler(self):
+        os.environ["CXX"] = "false"
+        with mock.patch.object(build, "PREBUILT", Path("/nonexistent.so")):
+            with self.assertLogs(build.logger, "WARNING") as logs:
+                self.assertIsNone(build.ensure_lib())
+        self.assertIn("build failed", logs.output[0])
+
+    @unittest.skipUnless(build.find_compiler(), "no C++ compiler")
+    def test_build_and_cache(self):
+        path = build.ensure_lib()
+        self.assertEqual(Path(path).parent, Path(self.tmpdir.name))
+        with mock.patch.object(build, "verify") as verify:
+            self.assertEqual(build.ensure_lib(), path)
+        verify.assert_not_called()
+
+    @unittest.skipUnless(build.find_compiler(), "no C++ compiler")
+    def test_cache_key(self):
+        compiler = build.find_compiler()
+        self.assertNotEqual(
+            build.cache_key(compiler, build.CXXFLAGS),
+            build.cache_key(compiler, [*build.CXXFLAGS, "-march=native"]),
+        )
@@ -0,0 +1,174 @@
+import io
+import ast
+import mmap
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from subprocess import CalledProcessError
+
+from extensions.cpp.eval import literal_eval
+from extensions.cpp.eval.literal_eval import (
+    py_to_pickle,
+    fast_literal_eval,
+    iter_literal_list,
+    py_to_pickle_many,
+    py_to_pickle_ranges,
+)
+
+CASES = [
+    "0",
+    "-1",
+    "3000000000",
+    "-9223372036854775809",
+    ".5",
+    "1e5",
+    "1e400",
+    "'a\\u00e9\\n'",
+    "'a\\\nb'",
+    "'a\nb'",
+    '"a\rb"',
+    "[1, 'a', None, {'k': [1.0]}]",
+    "{'a': True, 'b': False}",
+    "{1, 2}",
+    "{1,}",
+    "(1, 2)",
+    "b'x'",
+]
+INVALID = ["010", "[,]", "{:}", "{1:}", "1 2", "1-2", "Truex", "[1,"]
+
+
+def literal_eval_or_error(s):
+    try:
+        return ast.literal_eval(s)
+    except (ValueError, SyntaxError) as exc:
+        return type(exc)
+
+
+class TestFastLiteralEval(unittest.TestCase):
+    def assert_same(self, s, data=None):
+        expected = literal_eval_or_error(s)
+        data = s if data is None else data
+        if isinstance(expected, type):
+            self.assertRaises(expected, fast_literal_eval, data)
+        else:
+            result = fast_literal_eval(data)
+            self.assertEqual(result, expected)
+            self.assertEqual(type(result), type(expected))
+
+    def test_cases(self):
+        for s in CASES + INVALID:
+            with self.subTest(s=s):
+                self.assert_same(s)
+                self.assert_same(s, s.encode())
+
+    def test_fallback_without_lib(self):
+        with mock.patch.object(
+            literal_eval,
+            "native_available",
+            return_value=False,
+        ):
+            for s in CASES + INVALID:
+                with self.subTest(s=s):
+                    self.assert_same(s)
+
+    def test_bin_error(self):
+        with mock.patch.object(
+            literal_eval,
+            "check_call",
+            side_effect=CalledProcessError(1, "literal_eval.bin"),
+        ):
+            self.assertRaises(ValueError, literal_eval.py_to_pickle_tmp, "[1,")
+
+
+@unittest.skipUnless(literal_eval.native_available(), "no libliteraleval.so")
+class TestPyToPickle(unittest.TestCase):
+    def test_buffers(self):
+        for data in (
+            b"[1, 2]",
+            bytearray(b"[1, 2]"),
+            memoryview(b"xx[1, 2]")[2:],
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(pickle.loads(py_to_pickle(data)), [1, 2])
+
+    def test_grow_output(self):
+        s = "[" + "1.0," * 1000 + "]"
+        result = py_to_pickle(s, out_size_hint=1)
+        self.assertEqual(result, py_to_pickle(s))
+        self.assertEqual(pickle.loads(result), [1.0] * 1000)
+
+    def test_invalid(self):
+        for s in INVALID:
+            with self.subTest(s=s):
+                self.assertRaises(ValueError, py_to_pickle, s)
+
+
+@unittest.skipUnless(literal_eval.native_available(), "no libliteraleval.so")
+class TestBatch(unittest.TestCase):
+    def test_many(self):
+        items = ["0", "-1", "{'a': [1.5, None]}", bytearray(b"[1]")] * 3
+        expected = [py_to_pickle(s) for s in items]
+        for max_workers in (1, 3, 32):
+            with self.subTest(max_workers=max_workers):
+                self.assertEqual(
+                    py_to_pickle_many(items, max_workers),
+                    expected,
+                )
+        self.assertEqual(py_to_pickle_many([], 4), [])
+
+    def test_ranges(self):
+        data = b"[1] {2} 'x' " * 10
+        ranges = [(i, i + 3) for i in range(0, len(data), 4)]
+        result = py_to_pickle_ranges(bytearray(data), ranges, max_workers=4)
+        self.assertEqual(
+            [pickle.loads(item) for item in result],
+            [[1], {2}, "x"] * 10,
+        )
+        self.assertRaises(
+            ValueError,
+            py_to_pickle_ranges,
+            data,
+            [(0, len(data) + 1)],
+        )
+
+    def test_invalid_index(self):
+        with self.assertRaisesRegex(ValueError, "index 5"):
+            py_to_pickle_many(["1"] * 5 + ["[,]"], max_workers=2)
+
+
+@unittest.skipUnless(literal_eval.native_available(), "no libliteraleval.so")
+class TestIterLiteralList(unittest.TestCase):
+    DATA = (
+        b" [\n"
+        + b"".join(
+            b"{'seq': %d, 'text': '%s', 'cost': 1.5},\n" % (i, b"x" * i)
+            for i in range(50)
+        )
+        + b"] \n"
+    )
+
+    def test_stream(self):
+        expected = ast.literal_eval(self.DATA.decode())
+        for buffer_size in (1, 7, 1024):
+            with self.subTest(buffer_size=buffer_size):
+                items = iter_literal_list(
+                    io.BytesIO(self.DATA),
+                    buffer_size=buffer_size,
+                )
+                self.assertEqual(list(items), expected)
+
+    def test_mmap(self):
+        expected = ast.literal_eval(self.DATA.decode())
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(self.DATA)
+            f.flush()
+            self.assertEqual(list(iter_literal_list(f.name)), expected)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.assertEqual(list(iter_literal_list(mm)), expected)
+
+    def test_invalid(self):
+        for data in (b"", b"{}", b"[1,", b"[,]", b"[1 2]", b"[1] x"):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    list(iter_literal_list(io.BytesIO(data), buffer_size=2))
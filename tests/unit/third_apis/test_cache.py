@@ -0,0 +1,123 @@
+import time
+import asyncio
+import unittest
+
+from third_apis.cache import ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, data, success=True):
+        self.success = success
+        self.status_code = 200
+        self.data = data
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_fresh_hit(self):
+        async def run():
+            cache = ResponseCache(ttl=60)
+            calls = 0
+
+            async def fetch():
+                nonlocal calls
+                calls += 1
+                return FakeResponse(calls)
+
+            for _ in range(3):
+                response = await cache.get_or_fetch(
+                    "key",
+                    fetch,
+                    lambda entry: FakeResponse(entry["data"]),
+                )
+                self.assertEqual(response.data, 1)
+            self.assertEqual(calls, 1)
+            self.assertEqual(cache.metrics["hits"], 2)
+
+        asyncio.run(run())
+
+    def test_failed_response_not_cached(self):
+        async def run():
+            cache = ResponseCache(ttl=60)
+
+            async def fetch():
+                return FakeResponse(None, success=False)
+
+            for _ in range(2):
+                await cache.get_or_fetch("key", fetch, FakeResponse)
+            self.assertEqual(cache.metrics["misses"], 2)
+
+        asyncio.run(run())
+
+    def test_coalesce_concurrent_misses(self):
+        async def run():
+            cache = ResponseCache(ttl=60)
+            calls = 0
+
+            async def fetch():
+                nonlocal calls
+                calls += 1
+                await asyncio.sleep(0.01)
+                return FakeResponse(calls)
+
+            results = await asyncio.gather(
+                *[
+                    cache.get_or_fetch("key", fetch, FakeResponse)
+                    for _ in range(5)
+                ],
+            )
+            self.assertEqual([r.data for r in results], [1] * 5)
+            self.assertEqual(calls, 1)
+            self.assertEqual(cache.metrics["coalesced"], 4)
+
+        asyncio.run(run())
+
+    def test_stale_while_revalidate(self):
+        async def run():
+            cache = ResponseCache(ttl=60, stale_ttl=60)
+            calls = 0
+
+            async def fetch():
+                nonlocal calls
+                calls += 1
+                await asyncio.sleep(0.01)
+                return FakeResponse(calls)
+
+            def build(entry):
+                return FakeResponse(entry["data"])
+
+            await cache.get_or_fetch("key", fetch, build)
+            # 模拟缓存已过 ttl, 但仍在 stale_ttl 内
+            cache._lru.get("key")["stored_at"] = time.time() - 90
+            responses = await asyncio.gather(
+                *[cache.get_or_fetch("key", fetch, build) for _ in range(3)],
+            )
+            self.assertEqual([r.data for r in responses], [1] * 3)
+            self.assertEqual(cache.metrics["stale_hits"], 3)
+            await asyncio.gather(*cache._tasks)
+            self.assertEqual(calls, 2)
+            response = await cache.get_or_fetch("key", fetch, build)
+            self.assertEqual(response.data, 2)
+
+        asyncio.run(run())
+
+    def test_key_vary_on_per_call_headers(self):
+        cache = ResponseCache(ttl=60)
+        key = cache.make_key("third", "api", {"a": 1})
+        self.assertEqual(
+            key,
+            cache.make_key("third", "api", {"a": 1}, vary={"headers": None}),
+        )
+        self.assertNotEqual(
+            cache.make_key(
+                "third",
+                "api",
+                {"a": 1},
+                vary={"headers": {"Authorization": "a"}},
+            ),
+            cache.make_key(
+                "third",
+                "api",
+                {"a": 1},
+                vary={"headers": {"Authorization": "b"}},
+            ),
+        )
@@ -0,0 +1,192 @@
+import time
+import asyncio
+import unittest
+
+import httpx
+
+from third_apis import Third, Response, RequestMethodEnum
+from third_apis.resilience import (
+    IDEMPOTENT_METHODS,
+    Bulkhead,
+    RetryPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    BulkheadFullError,
+)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_retry_idempotent_method_only(self):
+        policy = RetryPolicy(max_attempts=3)
+        started_at = time.monotonic()
+        self.assertTrue(
+            policy.should_retry("get", 1, started_at, status_code=503),
+        )
+        self.assertFalse(
+            policy.should_retry("post", 1, started_at, status_code=503),
+        )
+
+    def test_idempotent_methods(self):
+        # 只包含 API 可声明的方法中的 GET/PUT/DELETE
+        self.assertEqual(IDEMPOTENT_METHODS, {"get", "put", "delete"})
+        self.assertLessEqual(
+            IDEMPOTENT_METHODS,
+            {m.value for m in RequestMethodEnum},
+        )
+        policy = RetryPolicy(max_attempts=3)
+        started_at = time.monotonic()
+        for method in RequestMethodEnum:
+            self.assertEqual(
+                policy.should_retry(
+                    method.value.upper(),
+                    1,
+                    started_at,
+                    status_code=503,
+                ),
+                method.value in IDEMPOTENT_METHODS,
+            )
+
+    def test_retry_transport_error_only(self):
+        policy = RetryPolicy(max_attempts=3)
+        started_at = time.monotonic()
+        self.assertTrue(
+            policy.should_retry(
+                "get",
+                1,
+                started_at,
+                exc=httpx.ConnectError("error"),
+            ),
+        )
+        self.assertFalse(
+            policy.should_retry("get", 1, started_at, exc=ValueError()),
+        )
+        self.assertFalse(
+            policy.should_retry("get", 1, started_at, status_code=400),
+        )
+
+    def test_give_up_after_max_attempts(self):
+        policy = RetryPolicy(max_attempts=2)
+        started_at = time.monotonic()
+        self.assertFalse(
+            policy.should_retry("get", 2, started_at, status_code=503),
+        )
+        self.assertEqual(policy.metrics["give_ups"], 1)
+
+    def test_backoff_bounded(self):
+        policy = RetryPolicy(backoff=0.1, max_backoff=0.5)
+        for attempt in range(1, 10):
+            self.assertLessEqual(policy.backoff_seconds(attempt), 0.5)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_after_failure_rate_exceeded(self):
+        breaker = CircuitBreaker(
+            failure_rate_threshold=0.5,
+            window_size=4,
+            min_calls=4,
+        )
+        for success in [True, False, True, False]:
+            breaker.before_call()
+            breaker.record(success)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        self.assertEqual(breaker.metrics["rejected"], 1)
+
+    def test_half_open_recovery(self):
+        breaker = CircuitBreaker(
+            window_size=2,
+            min_calls=2,
+            recovery_timeout=0.05,
+        )
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        time.sleep(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestBulkhead(unittest.TestCase):
+    def test_reject_when_full(self):
+        async def run():
+            bulkhead = Bulkhead(max_concurrent=1, max_wait=0.01)
+            async with bulkhead:
+                with self.assertRaises(BulkheadFullError):
+                    async with bulkhead:
+                        pass
+            self.assertEqual(bulkhead.metrics["active"], 0)
+            self.assertEqual(bulkhead.metrics["rejected"], 1)
+
+        asyncio.run(run())
+
+
+class TestThirdSend(unittest.TestCase):
+    def half_open_breaker(self):
+        breaker = CircuitBreaker(
+            window_size=1,
+            min_calls=1,
+            recovery_timeout=0,
+        )
+        breaker.before_call()
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        return breaker
+
+    def third(self, handler):
+        third = Third(
+            name="test",
+            protocol="http",
+            host="example.com",
+            response_cls=Response,
+            bulkhead=Bulkhead(max_concurrent=1),
+        )
+        third._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler),
+        )
+        return third
+
+    def test_cancelled_probe_released(self):
+        async def handler(request):
+            await asyncio.sleep(10)
+
+        async def run():
+            breaker = self.half_open_breaker()
+            third = self.third(handler)
+            task = asyncio.ensure_future(
+                third._send(breaker, method="get", url="http://example.com"),
+            )
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(third.bulkhead.metrics["active"], 0)
+            # 探测名额已归还, 熔断器不会卡在半开状态
+            breaker.before_call()
+            breaker.record(True)
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        asyncio.run(run())
+
+    def test_non_http_error_probe_released(self):
+        def handler(request):
+            raise ValueError("error")
+
+        async def run():
+            breaker = self.half_open_breaker()
+            third = self.third(handler)
+            with self.assertRaises(ValueError):
+                await third._send(
+                    breaker,
+                    method="get",
+                    url="http://example.com",
+                )
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            breaker.before_call()
+
+        asyncio.run(run())
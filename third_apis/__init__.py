@@ -1,34 +1,35 @@
 from __future__ import annotations
 
 import abc
-import enum
+import json
+import time
 import string
 import asyncio
+import weakref
 from typing import TypeVar
 from functools import partial
+from collections.abc import Awaitable
 
 import httpx
 from loguru import logger
 
+from common.loguru import json_log
 from common.regexes import validate_ip_or_host, only_alphabetic_numeric
+from third_apis.cache import ResponseCache
+from third_apis.enums import RequestMethodEnum
+from common.http_client import DEFAULT_LIMITS, create_async_client
+from common.singleflight import SingleFlight
+from third_apis.resilience import (
+    IDEMPOTENT_METHODS,
+    Bulkhead,
+    RetryPolicy,
+    CircuitBreaker,
+)
 
 DATA_SEND_WAYS = ["auto", "json", "params", "data"]
 PROTOCOLS = ["http", "https"]
 
 
-@enum.unique
-class RequestMethodEnum(enum.Enum):
-    GET = "get"
-    POST = "post"
-    PUT = "put"
-    PATCH = "patch"
-    DELETE = "delete"
-    # OPTIONS = "options"
-    # HEAD = "head"
-    # CONNECT = "connect"
-    # TRACE = "trace"
-
-
 class Response:
     success: bool = False
     status_code: int = None
@@ -148,6 +149,9 @@ class APIBaseConfig:
 class API(APIBaseConfig):
     method: str
     uri: str  # /xx
+    retry: RetryPolicy | None
+    circuit_breaker: CircuitBreaker | None
+    cache: ResponseCache | None
 
     def __init__(
         self,
@@ -164,15 +168,25 @@ class API(APIBaseConfig):
         data: dict = None,
         json: dict = None,
         timeout: int = None,
+        retry: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        cache: ResponseCache | None = None,
     ) -> None:
         assert name, "name cannot be empty"
         method = method.lower()
         assert method in [
             m.value for m in RequestMethodEnum
         ], f"invalid request method: {method}"
+        assert (
+            not cache or method == RequestMethodEnum.GET.value
+        ), "only GET API can be cached"
         self.method = method
         assert uri and uri.startswith("/"), "URI string must starts with '/'"
         self.uri = uri
+        # 未设置时使用 Third 上的默认策略
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.cache = cache
         super().__init__(
             name=name,
             protocol=protocol,
@@ -194,6 +208,14 @@ class Third(APIBaseConfig):
     # _request = requests.request
     api_key: str | None = None
     sign_key: str | None = None
+    limits: httpx.Limits
+    http2: bool
+    retry: RetryPolicy | None
+    circuit_breaker: CircuitBreaker | None
+    bulkhead: Bulkhead | None
+    _singleflight: SingleFlight
+    _client: httpx.AsyncClient | None = None
+    _instances: weakref.WeakSet[Third] = weakref.WeakSet()
 
     def __init__(
         self,
@@ -209,6 +231,11 @@ class Third(APIBaseConfig):
         json: dict = None,
         cookies: dict = None,
         timeout: int = 6,
+        limits: httpx.Limits | None = None,
+        http2: bool = False,
+        retry: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        bulkhead: Bulkhead | None = None,
         # request: Optional[Callable] = None,
     ) -> None:
         assert all(
@@ -228,6 +255,14 @@ class Third(APIBaseConfig):
             timeout=timeout,
         )
         self.name = name
+        self.limits = limits or DEFAULT_LIMITS
+        self.http2 = http2
+        self.retry = retry
+        # Third 上的熔断器被未单独设置熔断器的 API 共享
+        self.circuit_breaker = circuit_breaker
+        self.bulkhead = bulkhead
+        self._singleflight = SingleFlight()
+        self._instances.add(self)
         if apis:
             self.apis = set(apis)
             for api in apis:
@@ -266,14 +301,85 @@ class Third(APIBaseConfig):
         self.apis.add(api)
         setattr(self, api.name, partial(self.request, api=api))
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """延迟创建的长连接 client, 复用 TCP/TLS 连接."""
+        if self._client is None or self._client.is_closed:
+            self._client = create_async_client(
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """关闭全部 Third 实例的连接池, 在应用退出时调用."""
+        for third in list(cls._instances):
+            await third.close()
+
+    @property
+    def metrics(self) -> dict:
+        """容错策略指标."""
+        apis = {}
+        for api in self.apis:
+            retry = api.retry or self.retry
+            breaker = api.circuit_breaker or self.circuit_breaker
+            apis[api.name] = {
+                "retry": retry.metrics if retry else None,
+                "circuit_breaker": breaker.metrics if breaker else None,
+                "cache": api.cache.metrics if api.cache else None,
+            }
+        return {
+            "bulkhead": self.bulkhead.metrics if self.bulkhead else None,
+            "singleflight": self._singleflight.metrics,
+            "apis": apis,
+        }
+
+    async def _send(
+        self,
+        circuit_breaker: CircuitBreaker | None,
+        **request_kwargs,
+    ) -> httpx.Response:
+        # 先进入舱壁再占用熔断器的探测名额, 排队等待不会占住半开状态
+        if self.bulkhead:
+            async with self.bulkhead:
+                return await self._call(circuit_breaker, **request_kwargs)
+        return await self._call(circuit_breaker, **request_kwargs)
+
+    async def _call(
+        self,
+        circuit_breaker: CircuitBreaker | None,
+        **request_kwargs,
+    ) -> httpx.Response:
+        if circuit_breaker:
+            circuit_breaker.before_call()
+        try:
+            raw_response = await self.client.request(**request_kwargs)
+        except httpx.HTTPError:
+            if circuit_breaker:
+                circuit_breaker.record(False)
+            raise
+        except BaseException:
+            # 取消等非 HTTP 异常不计入成败, 但要归还探测名额
+            if circuit_breaker:
+                circuit_breaker.release()
+            raise
+        if circuit_breaker:
+            circuit_breaker.record(raw_response.status_code < 500)
+        return raw_response
+
     def update_dict(self, attr_name: str, api: API, _d: dict) -> dict:
-        data = getattr(self, attr_name) or {}
-        api_data = getattr(api, attr_name)
-        if api_data:
-            data.update(api_data)
-        if _d:
-            data.update(_d)
-        return data
+        # 返回新的 dict, 不修改 Third/API 上共享的默认值
+        return {
+            **(getattr(self, attr_name) or {}),
+            **(getattr(api, attr_name) or {}),
+            **(_d or {}),
+        }
 
     async def request(
         self,
@@ -321,7 +427,7 @@ class Third(APIBaseConfig):
             "data": request_data,
             "json": request_json,
             "headers": request_headers,
-            "cookies": request_cookies,
+            "cookies": request_cookies or None,
             "timeout": timeout,
             **kwargs,
         }
@@ -336,46 +442,146 @@ class Third(APIBaseConfig):
             "cookies": request_cookies,
             "kwargs": kwargs,
         }
-        try:
-            async with httpx.AsyncClient() as client:
-                raw_response: httpx.Response = await client.request(
-                    **request_kwargs,
-                )
-        except Exception as e:
-            logger.bind(json=True).error(
-                {
-                    "Trigger": f"Third-{self.name}",
-                    "request_context": request_context,
-                    "request_error": repr(e),
-                    "raw_response": None,
-                },
-            )
-            return response_cls(
-                success=False,
-                status_code=None,
-                data=None,
-                request_context=request_context,
+        if api.cache:
+            return await api.cache.get_or_fetch(
+                api.cache.make_key(
+                    self.name,
+                    api.name,
+                    request_params,
+                    # 单次调用的 headers/cookies 可能带鉴权信息, 参与 key 的计算
+                    vary={"headers": headers, "cookies": cookies},
+                ),
+                partial(
+                    self._request,
+                    api,
+                    request_kwargs,
+                    request_context,
+                    response_cls,
+                ),
+                lambda entry: response_cls(
+                    success=entry["success"],
+                    status_code=entry["status_code"],
+                    data=entry["data"],
+                    request_context=request_context,
+                    cached=True,
+                ),
             )
-        else:
+        return await self._request(
+            api,
+            request_kwargs,
+            request_context,
+            response_cls,
+        )
+
+    async def _request(
+        self,
+        api: API,
+        request_kwargs: dict,
+        request_context: dict,
+        response_cls: type[Response],
+    ) -> ResponseType:
+        retry = api.retry or self.retry
+        circuit_breaker = api.circuit_breaker or self.circuit_breaker
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
             try:
-                response = raw_response.json()
-            except Exception:
-                response = raw_response.text
-
-            logger.debug(
-                {
-                    "Trigger": f"Third-{self.name}",
-                    "request_context": request_context,
-                    "response": response,
-                },
-            )
+                raw_response: httpx.Response = await self._send(
+                    circuit_breaker,
+                    **request_kwargs,
+                )
+            except Exception as e:
+                if retry and retry.should_retry(
+                    api.method,
+                    attempt,
+                    started_at,
+                    exc=e,
+                ):
+                    await asyncio.sleep(retry.backoff_seconds(attempt))
+                    continue
+                json_log(
+                    {
+                        "Trigger": f"Third-{self.name}",
+                        "request_context": request_context,
+                        "request_error": repr(e),
+                        "attempts": attempt,
+                        "raw_response": None,
+                    },
+                    level="ERROR",
+                )
+                return response_cls(
+                    success=False,
+                    status_code=None,
+                    data=None,
+                    request_context=request_context,
+                )
+            if not (
+                retry
+                and retry.should_retry(
+                    api.method,
+                    attempt,
+                    started_at,
+                    status_code=raw_response.status_code,
+                )
+            ):
+                break
+            await asyncio.sleep(retry.backoff_seconds(attempt))
 
-            return self.parse_response(
-                api,
-                request_context,
-                raw_response,
-                response_cls,
+        try:
+            response = raw_response.json()
+        except Exception:
+            response = raw_response.text
+
+        logger.debug(
+            {
+                "Trigger": f"Third-{self.name}",
+                "request_context": request_context,
+                "response": response,
+            },
+        )
+
+        return self.parse_response(
+            api,
+            request_context,
+            raw_response,
+            response_cls,
+        )
+
+    async def gather(
+        self,
+        api: API,
+        kwargs_list: list[dict],
+        concurrency: int = 10,
+        singleflight: bool = False,
+        return_exceptions: bool = True,
+    ) -> list[ResponseType | BaseException]:
+        """并发调用同一个 API, 结果与 kwargs_list 顺序一致.
+
+        单个调用失败不影响其他调用: 请求错误返回 success=False 的 Response,
+        其他异常在 return_exceptions=True 时放在对应位置返回.
+        singleflight=True 时, 参数相同的幂等请求只发送一次并共享同一个 Response 实例.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        coalesce = singleflight and api.method in IDEMPOTENT_METHODS
+
+        async def call(kwargs: dict) -> ResponseType:
+            async with semaphore:
+                return await self.request(api, **kwargs)
+
+        def run(kwargs: dict) -> Awaitable[ResponseType]:
+            if not coalesce:
+                return call(kwargs)
+            key = (
+                api.name,
+                json.dumps(kwargs, sort_keys=True, default=repr),
             )
+            return self._singleflight.do(key, lambda: call(kwargs))
+
+        return await asyncio.gather(
+            *[run(kwargs) for kwargs in kwargs_list],
+            return_exceptions=return_exceptions,
+        )
 
     def parse_response(
         self,
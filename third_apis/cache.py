@@ -0,0 +1,189 @@
+"""第三方 GET 接口的响应缓存, 支持 stale-while-revalidate."""
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, TypeVar, Callable
+from collections.abc import Awaitable
+
+from loguru import logger
+
+from common.cache import LRUCache
+from storages.redis import AsyncRedisUtil
+from common.singleflight import SingleFlight
+from storages.redis.keys import RedisCacheKey
+
+R = TypeVar("R")
+
+CACHE_BACKENDS = ["memory", "redis"]
+
+
+class ResponseCache:
+    """API 级别的响应缓存.
+
+    写入后 ttl 秒内直接返回缓存; 之后 stale_ttl 秒内先返回旧值, 同时在后台刷新;
+    相同 key 的并发未命中和刷新只触发一次上游请求. 只缓存 success=True 的响应,
+    且只保存 success/status_code/data, 命中时由 response_cls 重新构造并带上 cached=True.
+    """
+
+    ttl: float
+    stale_ttl: float
+    backend: str
+    key_func: Callable[[dict], str] | None
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0,
+        backend: str = "memory",
+        maxsize: int = 1024,
+        key_func: Callable[[dict], str] | None = None,
+    ) -> None:
+        assert ttl > 0, "ttl must be positive"
+        assert stale_ttl >= 0, "stale_ttl must >= 0"
+        assert backend in CACHE_BACKENDS, f"invalid cache backend: {backend}"
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        # 默认使用全部请求参数生成 key, 可只取部分参数
+        self.key_func = key_func
+        self._lru = LRUCache(maxsize=maxsize, ttl=ttl + stale_ttl)
+        self._singleflight = SingleFlight()
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _digest(value: dict | None) -> str:
+        return hashlib.md5(
+            json.dumps(value or {}, sort_keys=True, default=str).encode(),
+        ).hexdigest()
+
+    def make_key(
+        self,
+        third_name: str,
+        api_name: str,
+        params: dict,
+        vary: dict | None = None,
+    ) -> str:
+        """vary 为单次调用传入的 headers/cookies 等.
+
+        其值参与 key 的计算, 鉴权头不同的调用方不会共享缓存.
+        """
+        digest = (
+            self.key_func(params) if self.key_func else self._digest(params)
+        )
+        vary = {k: v for k, v in (vary or {}).items() if v}
+        if vary:
+            digest = f"{digest}:{self._digest(vary)}"
+        return RedisCacheKey.ThirdResponseCacheKey.format(
+            third=third_name,
+            api=api_name,
+            digest=digest,
+        )
+
+    async def _get(self, key: str) -> dict | None:
+        if self.backend == "memory":
+            return self._lru.get(key)
+        try:
+            value = await AsyncRedisUtil.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Third response cache get failed: {repr(e)}")
+            return None
+        return json.loads(value) if value else None
+
+    async def _set(self, key: str, entry: dict) -> None:
+        if self.backend == "memory":
+            self._lru.set(key, entry)
+            return
+        try:
+            await AsyncRedisUtil.set(
+                key,
+                json.dumps(entry),
+                exp=int(self.ttl + self.stale_ttl + 0.999),
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Third response cache set failed: {repr(e)}")
+
+    async def _load(self, key: str, fetch: Callable[[], Awaitable[R]]) -> R:
+        response = await fetch()
+        if response.success:
+            await self._set(
+                key,
+                {
+                    "success": response.success,
+                    "status_code": response.status_code,
+                    "data": response.data,
+                    "stored_at": time.time(),
+                },
+            )
+        return response
+
+    async def _refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> None:
+        try:
+            await self._singleflight.do(key, lambda: self._load(key, fetch))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Third response cache refresh failed: {repr(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+    def _revalidate(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, fetch))
+        # 持有引用, 避免后台任务被回收
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[R]],
+        build: Callable[[dict], R],
+    ) -> R:
+        entry = await self._get(key)
+        if entry is not None:
+            age = time.time() - entry["stored_at"]
+            if age < self.ttl:
+                self.hits += 1
+                return build(entry)
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._revalidate(key, fetch)
+                return build(entry)
+        self.misses += 1
+        return await self._singleflight.do(key, lambda: self._load(key, fetch))
+
+    async def invalidate(self, key: str) -> None:
+        if self.backend == "memory":
+            self._lru.delete(key)
+        else:
+            await AsyncRedisUtil.delete(key)
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "upstream_calls": self._singleflight.calls,
+            "coalesced": self._singleflight.shared,
+        }
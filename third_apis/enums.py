@@ -0,0 +1,14 @@
+import enum
+
+
+@enum.unique
+class RequestMethodEnum(enum.Enum):
+    GET = "get"
+    POST = "post"
+    PUT = "put"
+    PATCH = "patch"
+    DELETE = "delete"
+    # OPTIONS = "options"
+    # HEAD = "head"
+    # CONNECT = "connect"
+    # TRACE = "trace"
@@ -0,0 +1,239 @@
+"""第三方调用的容错策略: 重试、熔断、舱壁隔离."""
+from __future__ import annotations
+
+import time
+import random
+import asyncio
+from types import TracebackType
+from collections import deque
+
+import httpx
+
+from third_apis.enums import RequestMethodEnum
+
+# 幂等请求方法, 只有这些方法允许自动重试
+IDEMPOTENT_METHODS = {
+    RequestMethodEnum.GET.value,
+    RequestMethodEnum.PUT.value,
+    RequestMethodEnum.DELETE.value,
+}
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开, 快速失败."""
+
+
+class BulkheadFullError(Exception):
+    """并发已满且等待超时."""
+
+
+class RetryPolicy:
+    """指数退避 + full jitter 的重试策略, 仅用于幂等请求."""
+
+    max_attempts: int
+    backoff: float
+    max_backoff: float
+    max_elapsed: float | None
+    retry_on_status: set[int]
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 2,
+        max_elapsed: float | None = None,
+        retry_on_status: set[int] | None = None,
+    ) -> None:
+        assert max_attempts >= 1, "max_attempts must >= 1"
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # 包含退避等待在内的总耗时上限, 超过后不再重试
+        self.max_elapsed = max_elapsed
+        self.retry_on_status = (
+            {502, 503, 504} if retry_on_status is None else retry_on_status
+        )
+        self.attempts = 0
+        self.retries = 0
+        self.give_ups = 0
+
+    def should_retry(
+        self,
+        method: str,
+        attempt: int,
+        started_at: float,
+        status_code: int | None = None,
+        exc: Exception | None = None,
+    ) -> bool:
+        self.attempts += 1
+        retryable = (
+            isinstance(exc, httpx.TransportError)
+            if exc is not None
+            else status_code in self.retry_on_status
+        )
+        if not retryable or method.lower() not in IDEMPOTENT_METHODS:
+            return False
+        if attempt >= self.max_attempts or (
+            self.max_elapsed is not None
+            and time.monotonic() - started_at >= self.max_elapsed
+        ):
+            self.give_ups += 1
+            return False
+        self.retries += 1
+        return True
+
+    def backoff_seconds(self, attempt: int) -> float:
+        return random.uniform(
+            0,
+            min(self.max_backoff, self.backoff * 2 ** (attempt - 1)),
+        )
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "give_ups": self.give_ups,
+        }
+
+
+class CircuitBreaker:
+    """基于最近 window_size 次调用错误率的熔断器.
+
+    closed -> (错误率超过阈值) open -> (recovery_timeout 后) half_open
+    half_open 下放行 half_open_max_calls 个探测请求, 成功则 closed, 失败则 open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        recovery_timeout: float = 30,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._window: deque[bool] = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == self.OPEN or (
+            state == self.HALF_OPEN
+            and self._half_open_calls >= self.half_open_max_calls
+        ):
+            self.rejected += 1
+            raise CircuitOpenError("circuit breaker is open")
+        if state == self.HALF_OPEN:
+            self._half_open_calls += 1
+        self.calls += 1
+
+    def release(self) -> None:
+        """调用未产生结果时(如被取消)归还 before_call 占用的探测名额."""
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record(self, success: bool) -> None:
+        if not success:
+            self.failures += 1
+        if self._state == self.HALF_OPEN:
+            if success:
+                self._state = self.CLOSED
+                self._window.clear()
+            else:
+                self._open()
+            return
+        self._window.append(success)
+        if len(self._window) < self.min_calls:
+            return
+        failure_rate = self._window.count(False) / len(self._window)
+        if failure_rate >= self.failure_rate_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.opened += 1
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
+
+
+class Bulkhead:
+    """并发舱壁, 限制对单个合作方的并发请求数.
+
+    用法: async with bulkhead: ...
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 50,
+        max_wait: float | None = 1,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.rejected = 0
+
+    async def __aenter__(self) -> Bulkhead:
+        try:
+            await asyncio.wait_for(
+                self._semaphore.acquire(),
+                timeout=self.max_wait,
+            )
+        except asyncio.TimeoutError as e:
+            self.rejected += 1
+            raise BulkheadFullError(
+                f"bulkhead full: {self.max_concurrent} concurrent calls",
+            ) from e
+        self.active += 1
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self.active,
+            "rejected": self.rejected,
+        }